@@ -2,7 +2,7 @@
 Configuración central de la aplicación NutriBox
 """
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import List, Optional
 import os
 
 
@@ -21,8 +21,66 @@ class Settings(BaseSettings):
     # Seguridad
     SECRET_KEY: str = "your-secret-key-change-in-production"
     ALGORITHM: str = "HS256"
-    ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    ACCESS_TOKEN_EXPIRE_MINUTES: int = 5
+    
+    # Sesiones: el refresh token caduca tras SESSION_TIMEOUT_MINUTES sin usarse
+    # y la sesión completa a los REFRESH_TOKEN_EXPIRE_DAYS
     SESSION_TIMEOUT_MINUTES: int = 15
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 7
+    
+    # Segundos entre cargas de las revocaciones hechas por otros procesos
+    REVOCACION_SINCRONIZACION_SEGUNDOS: int = 5
+    # Segundos entre borrados de revocaciones y sesiones expiradas
+    REVOCACION_PURGA_SEGUNDOS: int = 3600
+    
+    # Límite de peticiones (peticiones por ventana de segundos; 0 = sin límite)
+    RATE_LIMIT_HABILITADO: bool = True
+    RATE_LIMIT_REDIS_URL: Optional[str] = None
+    # Proxies inversos de confianza delante de la aplicación (0 = ignorar X-Forwarded-For)
+    RATE_LIMIT_PROXIES_CONFIABLES: int = 0
+    RATE_LIMIT_LOGIN_IP: int = 20
+    RATE_LIMIT_LOGIN_EMAIL: int = 5
+    RATE_LIMIT_LOGIN_VENTANA_SEGUNDOS: int = 60
+    RATE_LIMIT_REFRESH_IP: int = 30
+    RATE_LIMIT_REFRESH_VENTANA_SEGUNDOS: int = 60
+    RATE_LIMIT_ESCRITURA: int = 120
+    RATE_LIMIT_ESCRITURA_VENTANA_SEGUNDOS: int = 60
+    
+    # Pool de hashing de contraseñas (hilos y operaciones pendientes como máximo)
+    HASH_HILOS: int = min(os.cpu_count() or 1, 8)
+    HASH_MAX_PENDIENTES: int = 64
+    
+    # Cache del usuario autenticado (principal) y de tokens decodificados
+    CACHE_PRINCIPAL_TAMANO: int = 10000
+    CACHE_PRINCIPAL_TTL_SEGUNDOS: int = 60
+    
+    # Último acceso: segundos entre volcados a la base de datos y si cuenta
+    # también la actividad (cada petición autenticada) además del login
+    ULTIMO_ACCESO_VOLCADO_SEGUNDOS: int = 30
+    ULTIMO_ACCESO_REGISTRAR_ACTIVIDAD: bool = False
+    
+    # Archivado automático de loncheras vencidas
+    ARCHIVADO_AUTOMATICO: bool = True
+    ARCHIVADO_INTERVALO_MINUTOS: int = 60
+    ARCHIVADO_TAMANO_LOTE: int = 500
+    
+    # Planificador de loncheras (procesos del pool de cálculo)
+    PLANIFICADOR_PROCESOS: int = 2
+    
+    # Cache del detalle de loncheras
+    CACHE_DETALLE_TAMANO: int = 2048
+    CACHE_DETALLE_TTL_SEGUNDOS: int = 300
+    
+    # Instantánea del catálogo de alimentos (segundos de vida máxima)
+    CATALOGO_TTL_SEGUNDOS: int = 60
+    
+    # Cache de reglas de restricciones compiladas por hijo
+    CACHE_RESTRICCIONES_TAMANO: int = 10000
+    CACHE_RESTRICCIONES_TTL_SEGUNDOS: int = 60
+    
+    # Autocompletado de alimentos (segundos entre recálculos de popularidad,
+    # en segundo plano)
+    AUTOCOMPLETADO_TTL_SEGUNDOS: int = 600
     
     # CORS
     ALLOWED_ORIGINS: List[str] = [
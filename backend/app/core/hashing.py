@@ -0,0 +1,141 @@
+"""
+Pool acotado de hilos para el hash y la verificación de contraseñas
+
+bcrypt tarda ~200 ms por operación; ejecutado dentro de un handler async
+bloquea el event loop y todas las demás peticiones esperan. Aquí se ejecuta
+en un pool de hilos dedicado (la extensión de bcrypt libera el GIL, así que
+los hilos escalan con los núcleos). El número de operaciones pendientes está
+acotado: al llenarse, las nuevas se rechazan con 503 en lugar de acumular
+una cola que solo aumentaría la latencia de todos los logins.
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Optional
+
+from fastapi import HTTPException, status
+
+from backend.app.core.config import settings
+from backend.app.core.security import get_password_hash, verify_password
+
+_pool: Optional[ThreadPoolExecutor] = None
+_lock = threading.Lock()
+
+
+class MetricasHashing:
+    """Contadores del pool de hashing"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.pendientes = 0
+        self.max_pendientes_observado = 0
+        self.completadas = 0
+        self.rechazadas = 0
+        self.segundos_espera = 0.0
+        self.segundos_ejecucion = 0.0
+    
+    def reservar(self) -> bool:
+        """Reservar un lugar en el pool; False si está lleno"""
+        with self._lock:
+            if self.pendientes >= settings.HASH_MAX_PENDIENTES:
+                self.rechazadas += 1
+                return False
+            self.pendientes += 1
+            self.max_pendientes_observado = max(self.max_pendientes_observado, self.pendientes)
+            return True
+    
+    def liberar(self, espera: float, ejecucion: float):
+        """Registrar una operación terminada"""
+        with self._lock:
+            self.pendientes -= 1
+            self.completadas += 1
+            self.segundos_espera += espera
+            self.segundos_ejecucion += ejecucion
+    
+    def estadisticas(self) -> dict:
+        """Contadores y promedios (en milisegundos) para dimensionar el pool"""
+        with self._lock:
+            completadas = self.completadas or 1
+            return {
+                "hilos": settings.HASH_HILOS,
+                "max_pendientes": settings.HASH_MAX_PENDIENTES,
+                "pendientes": self.pendientes,
+                "max_pendientes_observado": self.max_pendientes_observado,
+                "completadas": self.completadas,
+                "rechazadas": self.rechazadas,
+                "espera_promedio_ms": round(1000 * self.segundos_espera / completadas, 2),
+                "ejecucion_promedio_ms": round(1000 * self.segundos_ejecucion / completadas, 2)
+            }
+
+
+metricas = MetricasHashing()
+
+
+def obtener_pool() -> ThreadPoolExecutor:
+    """Obtener el pool de hashing, creándolo si hace falta"""
+    global _pool
+    
+    with _lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(
+                max_workers=settings.HASH_HILOS,
+                thread_name_prefix="hashing"
+            )
+        return _pool
+
+
+def cerrar_pool():
+    """Cerrar el pool de hashing (al apagar la aplicación)"""
+    global _pool
+    
+    with _lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+async def _ejecutar(funcion: Callable, *args):
+    """Ejecutar una operación de bcrypt en el pool, con control de admisión"""
+    if not metricas.reservar():
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Servicio de autenticación saturado, intente de nuevo en unos segundos",
+            headers={"Retry-After": "1"}
+        )
+    
+    encolada = time.perf_counter()
+    tiempos = {}
+    
+    def tarea():
+        tiempos["inicio"] = time.perf_counter()
+        try:
+            return funcion(*args)
+        finally:
+            tiempos["fin"] = time.perf_counter()
+    
+    def al_terminar(_futuro: Future):
+        # Se llama cuando el hilo termina (o si se cancela antes de empezar),
+        # no cuando se cancela la petición: bcrypt sigue ocupando el lugar
+        fin = tiempos.get("fin", time.perf_counter())
+        inicio = tiempos.get("inicio", fin)
+        metricas.liberar(espera=inicio - encolada, ejecucion=fin - inicio)
+    
+    try:
+        futuro = obtener_pool().submit(tarea)
+    except BaseException:
+        metricas.liberar(espera=time.perf_counter() - encolada, ejecucion=0.0)
+        raise
+    
+    futuro.add_done_callback(al_terminar)
+    return await asyncio.wrap_future(futuro)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verificar contraseña contra hash sin bloquear el event loop"""
+    return await _ejecutar(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """Generar hash de contraseña sin bloquear el event loop"""
+    return await _ejecutar(get_password_hash, password)
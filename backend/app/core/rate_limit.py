@@ -0,0 +1,138 @@
+"""
+Límite de peticiones por ventana deslizante
+
+Se usa el contador de ventana deslizante: por cada clave (IP, email o
+usuario) se guardan las peticiones de la ventana fija actual y de la
+anterior, y la estimación es `actual + anterior × fracción de la ventana
+anterior que aún se solapa`. Ocupa memoria constante por clave y su error
+frente a un registro exacto de marcas de tiempo es pequeño.
+
+El backend en memoria sirve para un proceso. Con varios workers, cada uno
+contaría por separado; para compartir los contadores se configura
+RATE_LIMIT_REDIS_URL (requiere el paquete `redis`, cliente asíncrono).
+"""
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Tuple
+
+from fastapi import HTTPException, status
+
+from backend.app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class BackendMemoria:
+    """
+    Contadores en un diccionario del proceso
+    
+    El diccionario está ordenado por último uso; al pasar de `max_claves`
+    se descartan las claves usadas hace más tiempo (O(1) por petición,
+    aunque lleguen muchas claves distintas, p. ej. emails aleatorios).
+    """
+    
+    def __init__(self, max_claves: int = 100000):
+        self.max_claves = max_claves
+        # clave -> (índice de ventana, actual, anterior)
+        self._contadores: "OrderedDict[str, Tuple[int, int, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    async def registrar(self, clave: str, limite: int, ventana: int) -> float:
+        """
+        Contar una petición; retorna 0 si se permite o los segundos que
+        faltan para poder reintentar
+        """
+        ahora = time.time()
+        indice = int(ahora // ventana)
+        transcurrido = ahora - indice * ventana
+        
+        with self._lock:
+            indice_guardado, actual, anterior = self._contadores.get(clave, (indice, 0, 0))
+            
+            if indice_guardado == indice - 1:
+                actual, anterior = 0, actual
+            elif indice_guardado < indice - 1:
+                actual, anterior = 0, 0
+            
+            estimado = actual + anterior * (1 - transcurrido / ventana)
+            
+            permitida = estimado < limite
+            self._contadores[clave] = (indice, actual + 1 if permitida else actual, anterior)
+            self._contadores.move_to_end(clave)
+            
+            while len(self._contadores) > self.max_claves:
+                self._contadores.popitem(last=False)
+        
+        return 0.0 if permitida else ventana - transcurrido
+    
+    def __len__(self) -> int:
+        return len(self._contadores)
+
+
+class BackendRedis:
+    """Contadores compartidos entre procesos en Redis (INCR con expiración)"""
+    
+    def __init__(self, url: str):
+        from redis import asyncio as redis_asyncio
+        
+        self._redis = redis_asyncio.Redis.from_url(url)
+    
+    async def registrar(self, clave: str, limite: int, ventana: int) -> float:
+        ahora = time.time()
+        indice = int(ahora // ventana)
+        transcurrido = ahora - indice * ventana
+        
+        clave_actual = f"rl:{clave}:{indice}"
+        async with self._redis.pipeline() as pipe:
+            pipe.incr(clave_actual)
+            pipe.expire(clave_actual, 2 * ventana)
+            pipe.get(f"rl:{clave}:{indice - 1}")
+            actual, _, anterior = await pipe.execute()
+        
+        # El INCR ya contó esta petición
+        estimado = (actual - 1) + int(anterior or 0) * (1 - transcurrido / ventana)
+        
+        if estimado >= limite:
+            return ventana - transcurrido
+        
+        return 0.0
+
+
+def crear_backend():
+    """Backend compartido si hay RATE_LIMIT_REDIS_URL; si no, en memoria"""
+    if settings.RATE_LIMIT_REDIS_URL:
+        try:
+            return BackendRedis(settings.RATE_LIMIT_REDIS_URL)
+        except ImportError:
+            logger.warning("RATE_LIMIT_REDIS_URL configurada sin el paquete redis; se usará memoria")
+    
+    return BackendMemoria()
+
+
+backend = crear_backend()
+
+
+async def limitar(grupo: str, identificador: str, limite: int, ventana: int):
+    """
+    Contar una petición del grupo para el identificador (IP, email, usuario)
+    y rechazarla con 429 si supera `limite` peticiones por `ventana` segundos
+    """
+    if not settings.RATE_LIMIT_HABILITADO or limite <= 0:
+        return
+    
+    try:
+        reintentar = await backend.registrar(f"{grupo}:{identificador}", limite, ventana)
+    except Exception:
+        # Si el backend compartido no responde, no se bloquea el servicio
+        logger.exception("Error en el backend de límite de peticiones")
+        return
+    
+    if reintentar > 0:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Demasiadas solicitudes, intente de nuevo más tarde",
+            headers={"Retry-After": str(max(1, math.ceil(reintentar)))}
+        )
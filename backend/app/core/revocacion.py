@@ -0,0 +1,75 @@
+"""
+Índice en memoria de tokens de acceso revocados
+
+Conjunto de `jti` con su expiración. La consulta es O(1) y no toca la base
+de datos; las entradas se descartan en orden de expiración (un heap), así
+que el índice solo contiene tokens que aún serían válidos. Cada proceso
+carga las revocaciones persistidas al arrancar y las nuevas de otros
+procesos periódicamente (ver tasks/revocaciones.py): las de id mayor a la
+última cargada y, por si una transacción confirmó tarde un id menor, las
+creadas en los últimos segundos.
+"""
+import heapq
+import threading
+import time
+from typing import Dict, List, Tuple
+
+
+class IndiceRevocacion:
+    """Conjunto de jti revocados con descarte por expiración"""
+    
+    def __init__(self):
+        self._expiraciones: Dict[str, float] = {}
+        self._heap: List[Tuple[float, str]] = []
+        self._lock = threading.Lock()
+        
+        # Id de la última revocación persistida que se cargó
+        self.ultimo_id = 0
+    
+    def revocar(self, jti: str, expira: float) -> bool:
+        """
+        Agregar un jti hasta su expiración (timestamp UNIX); retorna False si
+        ya estaba revocado hasta esa fecha o después
+        """
+        if expira <= time.time():
+            return False
+        
+        with self._lock:
+            if self._expiraciones.get(jti, 0) >= expira:
+                return False
+            self._expiraciones[jti] = expira
+            heapq.heappush(self._heap, (expira, jti))
+            return True
+    
+    def esta_revocado(self, jti: str) -> bool:
+        """El token con ese jti fue revocado y aún no expira"""
+        expira = self._expiraciones.get(jti)
+        
+        if expira is None:
+            return False
+        
+        if expira <= time.time():
+            self.purgar()
+            return False
+        
+        return True
+    
+    def purgar(self) -> int:
+        """Descartar las entradas expiradas; retorna cuántas se descartaron"""
+        ahora = time.time()
+        descartadas = 0
+        
+        with self._lock:
+            while self._heap and self._heap[0][0] <= ahora:
+                expira, jti = heapq.heappop(self._heap)
+                if self._expiraciones.get(jti) == expira:
+                    del self._expiraciones[jti]
+                    descartadas += 1
+        
+        return descartadas
+    
+    def __len__(self) -> int:
+        return len(self._expiraciones)
+
+
+indice_revocacion = IndiceRevocacion()
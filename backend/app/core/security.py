@@ -3,9 +3,11 @@ Utilidades de seguridad y autenticación
 """
 from datetime import datetime, timedelta
 from typing import Optional
+import uuid
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from backend.app.core.config import settings
+from backend.app.core.revocacion import indice_revocacion
 
 # Contexto para hash de contraseñas
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -22,7 +24,7 @@ def get_password_hash(password: str) -> str:
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
-    """Crear token JWT de acceso"""
+    """Crear token JWT de acceso (con un `jti` único para poder revocarlo)"""
     to_encode = data.copy()
     
     if expires_delta:
@@ -30,15 +32,26 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     else:
         expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     
+    to_encode.setdefault("jti", uuid.uuid4().hex)
     to_encode.update({"exp": expire})
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
 
 def decode_access_token(token: str) -> Optional[dict]:
-    """Decodificar token JWT"""
+    """Decodificar token JWT (None si es inválido, expiró o fue revocado)"""
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        return payload
     except JWTError:
         return None
+    
+    if esta_revocado(payload):
+        return None
+    
+    return payload
+
+
+def esta_revocado(payload: dict) -> bool:
+    """El token fue revocado (consulta en memoria, sin base de datos)"""
+    jti = payload.get("jti")
+    return jti is not None and indice_revocacion.esta_revocado(jti)
@@ -0,0 +1,54 @@
+"""
+Script de importación del catálogo de alimentos
+Carga un archivo CSV o JSON de un proveedor con inserciones masivas
+
+Uso: python -m backend.app.database.importar_alimentos catalogo.csv [--formato csv]
+"""
+import argparse
+from pathlib import Path
+from backend.app.database.connection import SessionLocal
+from backend.app.services.importacion_service import ImportacionService
+
+
+def importar_alimentos(ruta: str, formato: str = None):
+    """Importar alimentos desde un archivo e imprimir el resultado"""
+    
+    archivo = Path(ruta)
+    formato = formato or archivo.suffix.lstrip(".").lower()
+    
+    if formato not in ImportacionService.FORMATOS:
+        print(f"❌ Formato no soportado: {formato} (use csv o json)")
+        return
+    
+    db = SessionLocal()
+    
+    try:
+        print(f"Importando alimentos desde {archivo.name}...")
+        
+        resultado = ImportacionService.importar(
+            db,
+            ImportacionService.leer(archivo.read_bytes(), formato),
+            origen=archivo.name
+        )
+        
+        print(f"✓ {resultado.creados} alimentos creados de {resultado.total_filas} filas")
+        print(f"  {resultado.duplicados} duplicados omitidos")
+        print(f"  {resultado.con_errores} filas con errores")
+        
+        for error in resultado.errores:
+            print(f"  - Fila {error.fila} ({error.nombre or 'sin nombre'}): {'; '.join(error.errores)}")
+        
+    except Exception as e:
+        print(f"❌ Error al importar alimentos: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Importar catálogo de alimentos")
+    parser.add_argument("ruta", help="Archivo CSV (con encabezados) o JSON")
+    parser.add_argument("--formato", choices=ImportacionService.FORMATOS)
+    args = parser.parse_args()
+    
+    importar_alimentos(args.ruta, args.formato)
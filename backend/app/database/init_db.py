@@ -3,19 +3,22 @@ Script de inicialización de base de datos
 Crea roles, tipos de membresía y datos de prueba
 """
 from sqlalchemy.orm import Session
-from backend.app.database.connection import SessionLocal, engine, Base
+from backend.app.database.connection import SessionLocal, engine
+from backend.app.database.migraciones import migrar
 from backend.app.models.models import (
     Rol, TipoMembresia, Usuario, Alimento,
     RolEnum, TipoMembresiaEnum, EstadoAlimentoEnum
 )
 from backend.app.core.security import get_password_hash
+from backend.app.services.busqueda_alimentos import crear_indice_busqueda
 
 
 def init_db():
     """Inicializar base de datos con datos iniciales"""
     
-    # Crear todas las tablas
-    Base.metadata.create_all(bind=engine)
+    # Crear o migrar todas las tablas
+    migrar(engine)
+    crear_indice_busqueda(engine)
     
     db = SessionLocal()
     
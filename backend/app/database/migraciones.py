@@ -0,0 +1,51 @@
+"""
+Migraciones del esquema con Alembic (alembic.ini y backend/migrations)
+
+create_all solo crea las tablas que faltan: no agrega columnas, índices ni
+restricciones a las tablas existentes. Al arrancar se llama a `migrar`:
+
+- base de datos vacía: se crean todas las tablas y se marca la última
+  revisión (stamp head)
+- base creada antes de las migraciones (sin tabla alembic_version): se marca
+  la revisión del esquema base y se aplican las siguientes
+- en otro caso: alembic upgrade head
+"""
+from pathlib import Path
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import inspect
+from sqlalchemy.engine import Engine
+
+from backend.app.database.connection import Base
+
+RAIZ = Path(__file__).resolve().parents[3]
+
+# Revisión con el esquema que creaba create_all antes de las migraciones
+REVISION_BASE = "0001"
+
+
+def configuracion() -> Config:
+    """Configuración de Alembic del proyecto (independiente del directorio actual)"""
+    config = Config(str(RAIZ / "alembic.ini"))
+    config.set_main_option("script_location", str(RAIZ / "backend" / "migrations"))
+    return config
+
+
+def migrar(engine: Engine):
+    """Llevar el esquema de la base de datos a la última revisión"""
+    config = configuracion()
+    
+    with engine.begin() as conexion:
+        config.attributes["connection"] = conexion
+        tablas = set(inspect(conexion).get_table_names())
+        
+        if not tablas:
+            Base.metadata.create_all(bind=conexion)
+            command.stamp(config, "head")
+            return
+        
+        if "alembic_version" not in tablas:
+            command.stamp(config, REVISION_BASE)
+        
+        command.upgrade(config, "head")
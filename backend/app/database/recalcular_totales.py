@@ -0,0 +1,37 @@
+"""
+Script de mantenimiento de totales nutricionales
+Recalcula en bloque los totales materializados de todas las loncheras y
+reconstruye los resúmenes diarios de estadísticas
+"""
+from backend.app.database.connection import SessionLocal
+from backend.app.services.lonchera_service import LoncheraService
+from backend.app.services.estadistica_service import EstadisticaService
+
+
+def recalcular_totales():
+    """Recalcular los totales nutricionales materializados de las loncheras"""
+    
+    db = SessionLocal()
+    
+    try:
+        print("Recalculando totales nutricionales de loncheras...")
+        
+        actualizadas = LoncheraService.recalcular_totales(db)
+        
+        print(f"✓ {actualizadas} loncheras actualizadas")
+        
+        print("Reconstruyendo resúmenes diarios de estadísticas...")
+        
+        resumenes = EstadisticaService.reconstruir(db)
+        
+        print(f"✓ {resumenes} resúmenes diarios generados")
+        
+    except Exception as e:
+        print(f"❌ Error al recalcular totales: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    recalcular_totales()
@@ -1,7 +1,7 @@
 """
 Modelos de base de datos - NutriBox
 """
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey, Text, Date, Enum
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey, Text, Date, Enum, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from backend.app.database.connection import Base
@@ -159,8 +159,24 @@ class Lonchera(Base):
     estado = Column(String(20), default=EstadoLoncheraEnum.BORRADOR.value)
     es_predeterminada = Column(Boolean, default=False)
     
+    # Totales nutricionales materializados (mantenidos por LoncheraService)
+    total_calorias = Column(Float, nullable=False, default=0.0)
+    total_proteinas = Column(Float, nullable=False, default=0.0)
+    total_carbohidratos = Column(Float, nullable=False, default=0.0)
+    total_grasas = Column(Float, nullable=False, default=0.0)
+    total_fibra = Column(Float, nullable=False, default=0.0)
+    num_alimentos = Column(Integer, nullable=False, default=0)
+    
+    # Se incrementa con cada cambio de la lonchera o de sus alimentos (ETag)
+    version = Column(Integer, nullable=False, default=1)
+    
+    # Momento de la confirmación (se conserva al archivar; cuenta en estadísticas)
+    confirmada_en = Column(DateTime(timezone=True), nullable=True)
+    
     # Clave foránea
     hijo_id = Column(Integer, ForeignKey("hijos.id"), nullable=False)
+    # Lonchera predeterminada de la que se copió (asignación masiva)
+    plantilla_id = Column(Integer, ForeignKey("loncheras.id"), nullable=True, index=True)
     
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -168,6 +184,11 @@ class Lonchera(Base):
     # Relaciones
     hijo = relationship("Hijo", back_populates="loncheras")
     alimentos = relationship("LoncheraAlimento", back_populates="lonchera", cascade="all, delete-orphan")
+    
+    __table_args__ = (
+        # Consultas por hijo y rango de fechas (calendario, fecha específica)
+        Index("ix_loncheras_hijo_fecha", "hijo_id", "fecha_asignacion"),
+    )
 
 
 class LoncheraAlimento(Base):
@@ -183,6 +204,34 @@ class LoncheraAlimento(Base):
     # Relaciones
     lonchera = relationship("Lonchera", back_populates="alimentos")
     alimento = relationship("Alimento", back_populates="loncheras_alimentos")
+    
+    __table_args__ = (
+        # Un alimento aparece una sola vez por lonchera (destino de los upserts)
+        UniqueConstraint("lonchera_id", "alimento_id", name="uq_lonchera_alimento"),
+    )
+
+
+class ResumenDiarioHijo(Base):
+    """Totales nutricionales diarios de las loncheras confirmadas de un hijo"""
+    __tablename__ = "resumenes_diarios_hijo"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    hijo_id = Column(Integer, ForeignKey("hijos.id"), nullable=False)
+    fecha = Column(Date, nullable=False)
+    num_loncheras = Column(Integer, nullable=False, default=0)
+    total_calorias = Column(Float, nullable=False, default=0.0)
+    total_proteinas = Column(Float, nullable=False, default=0.0)
+    total_carbohidratos = Column(Float, nullable=False, default=0.0)
+    total_grasas = Column(Float, nullable=False, default=0.0)
+    total_fibra = Column(Float, nullable=False, default=0.0)
+    num_alimentos = Column(Integer, nullable=False, default=0)
+    distribucion_tipos = Column(Text, nullable=True)  # JSON {tipo: unidades}
+    
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    __table_args__ = (
+        UniqueConstraint("hijo_id", "fecha", name="uq_resumen_diario_hijo_fecha"),
+    )
 
 
 class Direccion(Base):
@@ -311,3 +360,34 @@ class Bitacora(Base):
     ip_address = Column(String(50), nullable=True)
     
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class RefreshToken(Base):
+    """
+    Modelo de Refresh Token (sesiones)
+    
+    Se guarda solo el hash SHA-256 del token. Cada uso lo reemplaza por uno
+    nuevo de la misma familia; reutilizar uno ya usado revoca la familia.
+    """
+    __tablename__ = "refresh_tokens"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    usuario_id = Column(Integer, ForeignKey("usuarios.id"), nullable=False, index=True)
+    token_hash = Column(String(64), unique=True, nullable=False, index=True)
+    familia = Column(String(32), nullable=False, index=True)
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    expira_en = Column(DateTime(timezone=True), nullable=False)
+    familia_expira_en = Column(DateTime(timezone=True), nullable=False)
+    usado_en = Column(DateTime(timezone=True), nullable=True)
+    revocado_en = Column(DateTime(timezone=True), nullable=True)
+
+
+class TokenRevocado(Base):
+    """Modelo de Token de acceso revocado (jti) hasta su expiración"""
+    __tablename__ = "tokens_revocados"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    jti = Column(String(32), unique=True, nullable=False)
+    expira_en = Column(DateTime(timezone=True), nullable=False, index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -1,22 +1,28 @@
 """
 Router de Alimentos
 """
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from typing import List, Optional
+import csv
+import json
 
 from backend.app.database.connection import get_db
-from backend.app.schemas.alimento import Alimento, AlimentoCreate, AlimentoUpdate, AlimentoSimple
+from backend.app.schemas.alimento import (
+    Alimento, AlimentoCreate, AlimentoUpdate, AlimentoSimple, ResultadoImportacion
+)
 from backend.app.services.alimento_service import AlimentoService
+from backend.app.services.importacion_service import ImportacionService
 from backend.app.routers.auth import get_current_user
-from backend.app.models.models import Usuario, RolEnum
+from backend.app.services.principal_service import Principal
 
 router = APIRouter()
 
 
-def require_admin(current_user: Usuario = Depends(get_current_user)):
+def require_admin(current_user: Principal = Depends(get_current_user)):
     """Dependency para requerir rol de administrador"""
-    if current_user.rol.nombre != RolEnum.ADMINISTRADOR.value:
+    if not current_user.es_administrador:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="No tiene permisos de administrador"
@@ -31,7 +37,7 @@ async def listar_alimentos(
     estado: Optional[str] = None,
     tipo: Optional[str] = None,
     db: Session = Depends(get_db),
-    current_user: Usuario = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """
     Listar alimentos con filtros opcionales
@@ -51,7 +57,7 @@ async def listar_alimentos_activos(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
     db: Session = Depends(get_db),
-    current_user: Usuario = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """
     Listar solo alimentos activos
@@ -66,7 +72,7 @@ async def buscar_alimentos(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
     db: Session = Depends(get_db),
-    current_user: Usuario = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """
     Buscar alimentos por nombre o tipo
@@ -75,11 +81,27 @@ async def buscar_alimentos(
     return alimentos
 
 
+@router.get("/autocompletar", response_model=List[AlimentoSimple])
+async def autocompletar_alimentos(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=20),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """
+    Sugerencias de alimentos activos mientras se escribe, por popularidad
+    
+    Cada palabra de `q` se busca como prefijo de las palabras del nombre o
+    tipo, sin distinguir acentos. Se resuelve en memoria, sin consultas.
+    """
+    return AlimentoService.autocompletar(db, texto=q, limit=limit)
+
+
 @router.get("/tipo/{tipo}", response_model=List[Alimento])
 async def listar_por_tipo(
     tipo: str,
     db: Session = Depends(get_db),
-    current_user: Usuario = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """
     Listar alimentos por tipo
@@ -92,12 +114,12 @@ async def listar_por_tipo(
 async def obtener_alimento(
     alimento_id: int,
     db: Session = Depends(get_db),
-    current_user: Usuario = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """
     Obtener un alimento por ID
     """
-    alimento = AlimentoService.get_by_id(db, alimento_id=alimento_id)
+    alimento = AlimentoService.get_del_catalogo(db, alimento_id=alimento_id)
     
     if not alimento:
         raise HTTPException(
@@ -112,7 +134,7 @@ async def obtener_alimento(
 async def crear_alimento(
     alimento: AlimentoCreate,
     db: Session = Depends(get_db),
-    current_user: Usuario = Depends(require_admin)
+    current_user: Principal = Depends(require_admin)
 ):
     """
     Crear nuevo alimento (solo administradores)
@@ -120,12 +142,54 @@ async def crear_alimento(
     return AlimentoService.create(db, alimento=alimento, usuario_id=current_user.id)
 
 
+@router.post("/importar", response_model=ResultadoImportacion)
+async def importar_alimentos(
+    archivo: UploadFile = File(...),
+    formato: Optional[str] = Query(None, pattern="^(csv|json)$"),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(require_admin)
+):
+    """
+    Importar un catálogo de alimentos desde un archivo CSV o JSON (solo administradores)
+    
+    Sin `formato`, se deduce de la extensión del archivo. Los nombres que ya
+    existen o se repiten se omiten y las filas inválidas se reportan con sus
+    errores; el resto se inserta en lotes.
+    """
+    formato = formato or (archivo.filename or "").rsplit(".", 1)[-1].lower()
+    
+    if formato not in ImportacionService.FORMATOS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Formato no soportado (use csv o json)"
+        )
+    
+    contenido = await archivo.read()
+    
+    try:
+        filas = list(ImportacionService.leer(contenido, formato))
+    except (UnicodeDecodeError, json.JSONDecodeError, csv.Error, TypeError) as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Archivo inválido: {e}"
+        )
+    
+    # La inserción tarda segundos en catálogos grandes: fuera del event loop
+    return await run_in_threadpool(
+        ImportacionService.importar,
+        db,
+        filas,
+        usuario_id=current_user.id,
+        origen=archivo.filename or formato
+    )
+
+
 @router.put("/{alimento_id}", response_model=Alimento)
 async def actualizar_alimento(
     alimento_id: int,
     alimento: AlimentoUpdate,
     db: Session = Depends(get_db),
-    current_user: Usuario = Depends(require_admin)
+    current_user: Principal = Depends(require_admin)
 ):
     """
     Actualizar alimento (solo administradores)
@@ -142,7 +206,7 @@ async def actualizar_alimento(
 async def eliminar_alimento(
     alimento_id: int,
     db: Session = Depends(get_db),
-    current_user: Usuario = Depends(require_admin)
+    current_user: Principal = Depends(require_admin)
 ):
     """
     Eliminar alimento - soft delete (solo administradores)
@@ -158,7 +222,7 @@ async def eliminar_alimento(
 async def restaurar_alimento(
     alimento_id: int,
     db: Session = Depends(get_db),
-    current_user: Usuario = Depends(require_admin)
+    current_user: Principal = Depends(require_admin)
 ):
     """
     Restaurar alimento eliminado (solo administradores)
@@ -174,7 +238,7 @@ async def restaurar_alimento(
 async def obtener_historial(
     alimento_id: int,
     db: Session = Depends(get_db),
-    current_user: Usuario = Depends(require_admin)
+    current_user: Principal = Depends(require_admin)
 ):
     """
     Obtener historial de un alimento (solo administradores)
@@ -1,17 +1,20 @@
 """
 Router de Autenticación
 """
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Request
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
-from datetime import timedelta
 
 from backend.app.database.connection import get_db
-from backend.app.schemas.usuario import LoginRequest, Token, Usuario
+from backend.app.schemas.usuario import LoginRequest, Token, Usuario, RefreshRequest
 from backend.app.services.usuario_service import UsuarioService
-from backend.app.core.security import create_access_token, decode_access_token
+from backend.app.services.token_service import TokenService
+from backend.app.core.security import decode_access_token
+from backend.app.core.hashing import metricas as metricas_hashing
 from backend.app.core.config import settings
-from backend.app.models.models import Usuario as UsuarioModel
+from backend.app.core.rate_limit import limitar
+from backend.app.services.registro_accesos import buffer_accesos
+from backend.app.services.principal_service import Principal, obtener_principal, usuario_del_token
 
 router = APIRouter()
 
@@ -21,40 +24,104 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
     db: Session = Depends(get_db)
-) -> UsuarioModel:
-    """Dependency para obtener el usuario actual del token"""
+) -> Principal:
+    """
+    Dependency para obtener el usuario actual del token
+    
+    Retorna el principal en cache (id, rol, membresía e ids de sus hijos),
+    sin consultar la base de datos en cada petición.
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="No se pudo validar las credenciales",
         headers={"WWW-Authenticate": "Bearer"},
     )
     
-    payload = decode_access_token(token)
-    
-    if payload is None:
-        raise credentials_exception
+    user_id = usuario_del_token(token)
     
-    user_id: int = payload.get("sub")
     if user_id is None:
         raise credentials_exception
     
-    usuario = UsuarioService.get_by_id(db, usuario_id=int(user_id))
+    usuario = obtener_principal(db, usuario_id=user_id)
     
     if usuario is None:
         raise credentials_exception
     
+    if not usuario.activo:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Usuario desactivado"
+        )
+    
+    if settings.ULTIMO_ACCESO_REGISTRAR_ACTIVIDAD:
+        buffer_accesos.registrar(usuario.id)
+    
     return usuario
 
 
+def ip_cliente(request: Request) -> str:
+    """
+    IP del cliente
+    
+    Detrás de RATE_LIMIT_PROXIES_CONFIABLES proxies, es la entrada de
+    X-Forwarded-For que agregó el más externo de ellos (contando desde la
+    derecha); las anteriores las envía el cliente y no son confiables.
+    """
+    saltos = settings.RATE_LIMIT_PROXIES_CONFIABLES
+    if saltos > 0:
+        entradas = [
+            entrada.strip()
+            for cabecera in request.headers.getlist("x-forwarded-for")
+            for entrada in cabecera.split(",")
+            if entrada.strip()
+        ]
+        if len(entradas) >= saltos:
+            return entradas[-saltos]
+    
+    return request.client.host if request.client else "desconocida"
+
+
+async def limitar_login(request: Request, email: str):
+    """Límite de intentos de login por IP y por email, antes de consultar o verificar nada"""
+    ventana = settings.RATE_LIMIT_LOGIN_VENTANA_SEGUNDOS
+    await limitar("login-ip", ip_cliente(request), settings.RATE_LIMIT_LOGIN_IP, ventana)
+    await limitar("login-email", email.strip().lower(), settings.RATE_LIMIT_LOGIN_EMAIL, ventana)
+
+
+async def limitar_escritura(request: Request):
+    """
+    Dependency de límite para los métodos de escritura de un router, por
+    usuario (si el token es válido) o por IP
+    """
+    if request.method in ("GET", "HEAD", "OPTIONS"):
+        return
+    
+    autorizacion = request.headers.get("authorization", "")
+    usuario_id = None
+    if autorizacion.lower().startswith("bearer "):
+        usuario_id = usuario_del_token(autorizacion[7:].strip())
+    
+    identificador = f"u{usuario_id}" if usuario_id is not None else ip_cliente(request)
+    await limitar(
+        "escritura",
+        identificador,
+        settings.RATE_LIMIT_ESCRITURA,
+        settings.RATE_LIMIT_ESCRITURA_VENTANA_SEGUNDOS
+    )
+
+
 @router.post("/login", response_model=Token)
 async def login(
     login_data: LoginRequest,
+    request: Request,
     db: Session = Depends(get_db)
 ):
     """
     Endpoint de login
     """
-    usuario = UsuarioService.authenticate(
+    await limitar_login(request, login_data.email)
+    
+    usuario = await UsuarioService.authenticate_async(
         db,
         email=login_data.email,
         password=login_data.password
@@ -67,29 +134,22 @@ async def login(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    # Crear token de acceso
-    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": str(usuario.id)},
-        expires_delta=access_token_expires
-    )
-    
-    return {
-        "access_token": access_token,
-        "token_type": "bearer",
-        "user_info": usuario
-    }
+    # Crear token de acceso y refresh token de la sesión
+    return TokenService.iniciar_sesion(db, usuario)
 
 
 @router.post("/token", response_model=Token)
 async def login_form(
+    request: Request,
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: Session = Depends(get_db)
 ):
     """
     Endpoint de login compatible con OAuth2
     """
-    usuario = UsuarioService.authenticate(
+    await limitar_login(request, form_data.username)
+    
+    usuario = await UsuarioService.authenticate_async(
         db,
         email=form_data.username,
         password=form_data.password
@@ -102,34 +162,70 @@ async def login_form(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": str(usuario.id)},
-        expires_delta=access_token_expires
+    return TokenService.iniciar_sesion(db, usuario)
+
+
+@router.post("/refresh", response_model=Token)
+async def refresh(
+    datos: RefreshRequest,
+    request: Request,
+    db: Session = Depends(get_db)
+):
+    """
+    Renovar el token de acceso con un refresh token
+    
+    El refresh token se reemplaza por uno nuevo en cada uso; presentar uno
+    ya usado cierra la sesión completa.
+    """
+    await limitar(
+        "refresh-ip",
+        ip_cliente(request),
+        settings.RATE_LIMIT_REFRESH_IP,
+        settings.RATE_LIMIT_REFRESH_VENTANA_SEGUNDOS
     )
     
-    return {
-        "access_token": access_token,
-        "token_type": "bearer",
-        "user_info": usuario
-    }
+    return TokenService.refrescar(db, datos.refresh_token)
 
 
 @router.get("/me", response_model=Usuario)
 async def read_users_me(
-    current_user: UsuarioModel = Depends(get_current_user)
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
 ):
     """
     Obtener información del usuario actual
     """
-    return current_user
+    return UsuarioService.get_by_id(db, usuario_id=current_user.id)
 
 
 @router.post("/logout")
 async def logout(
-    current_user: UsuarioModel = Depends(get_current_user)
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
 ):
     """
-    Endpoint de logout (el cliente debe eliminar el token)
+    Endpoint de logout: revoca el token de acceso y los refresh tokens de la sesión
     """
+    payload = decode_access_token(token)
+    
+    if payload:
+        TokenService.cerrar_sesion(db, payload)
+    
     return {"message": "Logout exitoso"}
+
+
+@router.get("/hashing/estadisticas")
+async def estadisticas_hashing(
+    current_user: Principal = Depends(get_current_user)
+):
+    """
+    Métricas del pool de hashing de contraseñas (solo administradores)
+    """
+    if not current_user.es_administrador:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="No tiene permisos de administrador"
+        )
+    
+    return metricas_hashing.estadisticas()
@@ -0,0 +1,106 @@
+"""
+Router de Estadísticas (membresías con estadísticas avanzadas)
+"""
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+from typing import Optional, Tuple
+from datetime import date, timedelta
+
+from backend.app.database.connection import get_db
+from backend.app.schemas.estadistica import (
+    EstadisticasSemanales, TendenciaNutricional, DistribucionTipos
+)
+from backend.app.services.estadistica_service import EstadisticaService
+from backend.app.routers.auth import get_current_user
+from backend.app.services.principal_service import Principal
+
+router = APIRouter()
+
+
+def require_estadisticas_avanzadas(current_user: Principal = Depends(get_current_user)):
+    """Dependency para requerir una membresía con estadísticas avanzadas"""
+    if not current_user.permite_estadisticas_avanzadas:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Esta funcionalidad requiere membresía Premium"
+        )
+    return current_user
+
+
+def validar_consulta(
+    hijo_id: int,
+    fecha_inicio: Optional[date],
+    fecha_fin: Optional[date],
+    current_user: Principal
+) -> Tuple[date, date]:
+    """
+    Verificar que el hijo pertenece al usuario y resolver el rango de fechas
+    (por defecto, las últimas 12 semanas hasta hoy)
+    """
+    if hijo_id not in current_user.hijo_ids:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="No tiene permisos para ver estadísticas de este hijo"
+        )
+    
+    fecha_fin = fecha_fin or date.today()
+    fecha_inicio = fecha_inicio or fecha_fin - timedelta(weeks=12)
+    
+    if fecha_fin < fecha_inicio:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="La fecha final debe ser posterior a la inicial"
+        )
+    
+    if (fecha_fin - fecha_inicio).days >= EstadisticaService.MAX_DIAS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"El rango no puede superar {EstadisticaService.MAX_DIAS} días"
+        )
+    
+    return fecha_inicio, fecha_fin
+
+
+@router.get("/hijo/{hijo_id}/semanal", response_model=EstadisticasSemanales)
+async def estadisticas_semanales(
+    hijo_id: int,
+    fecha_inicio: Optional[date] = None,
+    fecha_fin: Optional[date] = None,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(require_estadisticas_avanzadas)
+):
+    """
+    Promedios diarios por semana y variación de calorías entre semanas
+    """
+    fecha_inicio, fecha_fin = validar_consulta(hijo_id, fecha_inicio, fecha_fin, current_user)
+    return EstadisticaService.semanal(db, hijo_id, fecha_inicio, fecha_fin)
+
+
+@router.get("/hijo/{hijo_id}/tendencia", response_model=TendenciaNutricional)
+async def tendencia_nutricional(
+    hijo_id: int,
+    fecha_inicio: Optional[date] = None,
+    fecha_fin: Optional[date] = None,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(require_estadisticas_avanzadas)
+):
+    """
+    Serie diaria de calorías y proteínas con media móvil de 7 días y pendiente
+    """
+    fecha_inicio, fecha_fin = validar_consulta(hijo_id, fecha_inicio, fecha_fin, current_user)
+    return EstadisticaService.tendencia(db, hijo_id, fecha_inicio, fecha_fin)
+
+
+@router.get("/hijo/{hijo_id}/tipos", response_model=DistribucionTipos)
+async def distribucion_tipos(
+    hijo_id: int,
+    fecha_inicio: Optional[date] = None,
+    fecha_fin: Optional[date] = None,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(require_estadisticas_avanzadas)
+):
+    """
+    Distribución de los alimentos consumidos por tipo
+    """
+    fecha_inicio, fecha_fin = validar_consulta(hijo_id, fecha_inicio, fecha_fin, current_user)
+    return EstadisticaService.tipos(db, hijo_id, fecha_inicio, fecha_fin)
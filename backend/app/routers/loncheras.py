@@ -1,31 +1,47 @@
 """
 Router de Loncheras
 """
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response, Header
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from datetime import date
+from datetime import date, timedelta
 
 from backend.app.database.connection import get_db
 from backend.app.schemas.lonchera import (
     Lonchera, LoncheraCreate, LoncheraUpdate, 
-    LoncheraWithAlimentos, LoncheraAlimentoCreate,
-    ResumenNutricional
+    LoncheraWithAlimentos, LoncheraAlimentoCreate, AlimentoEnLonchera,
+    LoncheraConResumen, ResumenNutricional, ReporteNutricional,
+    LoncheraLoteCreate, LoncheraLoteResultado,
+    PlanificacionRequest, PlanificacionResultado,
+    AsignacionMasivaRequest, AsignacionMasivaResultado, OperacionesAlimentos
 )
-from backend.app.services.lonchera_service import LoncheraService
+from backend.app.services.lonchera_service import LoncheraService, cache_detalle
+from backend.app.services.reporte_service import ReporteService
+from backend.app.services.planificador_service import PlanificadorService
+from backend.app.services.restriccion_service import RestriccionService
+from backend.app.services.exportacion_service import ExportacionService
+from backend.app.schemas.otros import ConflictoRestriccion
 from backend.app.routers.auth import get_current_user
-from backend.app.models.models import Usuario, TipoMembresiaEnum
+from backend.app.routers.alimentos import require_admin
+from backend.app.utils.paginacion import codificar_cursor, decodificar_cursor
+from backend.app.utils.etag import etag_lonchera, coincide, no_modificado
+from backend.app.models.models import TipoMembresiaEnum
+from backend.app.services.principal_service import Principal
 
 router = APIRouter()
 
+# Rango máximo de días que puede abarcar una consulta de calendario
+MAX_DIAS_CALENDARIO = 62
+
 
 def verificar_permisos_membresia(
-    current_user: Usuario,
+    current_user: Principal,
     requiere_premium: bool = False,
     requiere_estandar_o_premium: bool = False
 ):
     """Verificar permisos según membresía"""
-    membresia = current_user.tipo_membresia.nombre
+    membresia = current_user.membresia
     
     if requiere_premium and membresia != TipoMembresiaEnum.PREMIUM.value:
         raise HTTPException(
@@ -40,89 +56,266 @@ def verificar_permisos_membresia(
         )
 
 
-@router.get("/", response_model=List[Lonchera])
+def verificar_acceso_lonchera(db: Session, lonchera_id: int, current_user: Principal):
+    """
+    Comprobar que la lonchera existe y pertenece a un hijo del usuario
+    
+    Una sola consulta por clave primaria (hijo_id, version, padre_id), sin
+    cargar los hijos del usuario; retorna esa fila.
+    """
+    actual = LoncheraService.get_version(db, lonchera_id)
+    
+    if not actual:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Lonchera no encontrada"
+        )
+    
+    # Verificar permisos
+    if actual.padre_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="No tiene permisos para ver esta lonchera"
+        )
+    
+    return actual
+
+
+def respuesta_exportacion(contenido, formato: str, nombre: str) -> StreamingResponse:
+    """Respuesta en streaming para descargar una exportación"""
+    return StreamingResponse(
+        contenido,
+        media_type=ExportacionService.FORMATOS[formato],
+        headers={"Content-Disposition": f'attachment; filename="{nombre}.{formato}"'}
+    )
+
+
+def construir_detalle_lonchera(lonchera) -> LoncheraWithAlimentos:
+    """
+    Preparar respuesta de una lonchera con sus alimentos y resumen nutricional
+    
+    Espera los alimentos ya cargados (LoncheraService.get_detalle) para no
+    disparar cargas perezosas por item.
+    """
+    return LoncheraWithAlimentos(
+        id=lonchera.id,
+        nombre=lonchera.nombre,
+        descripcion=lonchera.descripcion,
+        fecha_asignacion=lonchera.fecha_asignacion,
+        hijo_id=lonchera.hijo_id,
+        estado=lonchera.estado,
+        es_predeterminada=bool(lonchera.es_predeterminada),
+        version=lonchera.version,
+        created_at=lonchera.created_at,
+        updated_at=lonchera.updated_at,
+        alimentos=[
+            AlimentoEnLonchera(
+                id=la.alimento.id,
+                nombre=la.alimento.nombre,
+                tipo=la.alimento.tipo,
+                cantidad=la.cantidad,
+                calorias=la.alimento.calorias,
+                proteinas=la.alimento.proteinas,
+                carbohidratos=la.alimento.carbohidratos,
+                notas=la.notas
+            )
+            for la in lonchera.alimentos
+        ],
+        # Resumen nutricional desde los totales materializados
+        resumen_nutricional=LoncheraService.resumen_de(lonchera)
+    )
+
+
+@router.get("/", response_model=List[LoncheraConResumen])
 async def listar_loncheras(
-    skip: int = Query(0, ge=0),
+    response: Response,
     limit: int = Query(100, ge=1, le=100),
+    cursor: Optional[str] = None,
     hijo_id: Optional[int] = None,
     estado: Optional[str] = None,
+    incluir_resumen: bool = False,
     db: Session = Depends(get_db),
-    current_user: Usuario = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """
-    Listar loncheras del usuario actual
+    Listar loncheras del usuario actual (más recientes primero)
+    
+    La paginación es por cursor: si hay más resultados, la respuesta trae el
+    encabezado `X-Next-Cursor`, que se envía como `cursor` para pedir la
+    siguiente página. Con `incluir_resumen=true` cada lonchera trae su
+    resumen nutricional.
     """
-    loncheras = LoncheraService.get_all(
+    loncheras = LoncheraService.get_por_padre(
         db,
-        skip=skip,
-        limit=limit,
+        padre_id=current_user.id,
+        limit=limit + 1,
+        cursor=decodificar_cursor(cursor) if cursor else None,
         hijo_id=hijo_id,
         estado=estado
     )
     
-    # Filtrar solo las loncheras de los hijos del usuario
-    loncheras_filtradas = [
-        l for l in loncheras 
-        if any(h.id == l.hijo_id for h in current_user.hijos)
-    ]
+    if len(loncheras) > limit:
+        loncheras = loncheras[:limit]
+        ultima = loncheras[-1]
+        response.headers["X-Next-Cursor"] = codificar_cursor(ultima.fecha_asignacion, ultima.id)
+    
+    if not incluir_resumen:
+        return loncheras
     
-    return loncheras_filtradas
+    # Los totales vienen materializados en cada fila, sin consultas extra
+    respuesta = []
+    for l in loncheras:
+        item = LoncheraConResumen.model_validate(l)
+        item.resumen_nutricional = LoncheraService.resumen_de(l)
+        respuesta.append(item)
+    
+    return respuesta
 
 
-@router.get("/{lonchera_id}", response_model=LoncheraWithAlimentos)
-async def obtener_lonchera(
-    lonchera_id: int,
+@router.get("/calendario", response_model=List[LoncheraWithAlimentos])
+async def obtener_calendario(
+    fecha_inicio: date,
+    fecha_fin: date,
+    hijo_ids: Optional[List[int]] = Query(None),
     db: Session = Depends(get_db),
-    current_user: Usuario = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """
-    Obtener una lonchera por ID con sus alimentos
+    Obtener las loncheras (con alimentos y resumen) de varios hijos en un
+    rango de fechas. Sin `hijo_ids` se incluyen todos los hijos del usuario.
     """
-    lonchera = LoncheraService.get_by_id(db, lonchera_id=lonchera_id)
+    if fecha_fin < fecha_inicio:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="La fecha final debe ser posterior a la inicial"
+        )
     
-    if not lonchera:
+    if (fecha_fin - fecha_inicio).days >= MAX_DIAS_CALENDARIO:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Lonchera no encontrada"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"El rango no puede superar {MAX_DIAS_CALENDARIO} días"
         )
     
-    # Verificar permisos
-    if not any(h.id == lonchera.hijo_id for h in current_user.hijos):
+    hijos_usuario = current_user.hijo_ids
+    
+    if hijo_ids is None:
+        hijo_ids = list(hijos_usuario)
+    elif not hijos_usuario.issuperset(hijo_ids):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
-            detail="No tiene permisos para ver esta lonchera"
+            detail="No tiene permisos para ver loncheras de este hijo"
         )
     
-    # Calcular resumen nutricional
-    resumen = LoncheraService.calcular_resumen_nutricional(db, lonchera_id)
-    
-    # Preparar respuesta con alimentos
-    alimentos_detalle = []
-    for la in lonchera.alimentos:
-        alimento_info = {
-            "id": la.alimento.id,
-            "nombre": la.alimento.nombre,
-            "tipo": la.alimento.tipo,
-            "cantidad": la.cantidad,
-            "calorias": la.alimento.calorias,
-            "proteinas": la.alimento.proteinas,
-            "carbohidratos": la.alimento.carbohidratos,
-            "notas": la.notas
-        }
-        alimentos_detalle.append(alimento_info)
+    loncheras = LoncheraService.get_calendario(
+        db,
+        hijo_ids=hijo_ids,
+        fecha_inicio=fecha_inicio,
+        fecha_fin=fecha_fin
+    )
+    
+    return [construir_detalle_lonchera(l) for l in loncheras]
+
+
+@router.get("/exportar")
+async def exportar_historial(
+    formato: str = Query("csv", pattern="^(csv|ndjson)$"),
+    fecha_inicio: Optional[date] = None,
+    fecha_fin: Optional[date] = None,
+    current_user: Principal = Depends(get_current_user)
+):
+    """
+    Exportar el historial de loncheras de todos los hijos del usuario
+    (CSV o NDJSON, en streaming)
+    """
+    return respuesta_exportacion(
+        ExportacionService.exportar(
+            formato,
+            padre_id=current_user.id,
+            fecha_inicio=fecha_inicio,
+            fecha_fin=fecha_fin
+        ),
+        formato,
+        f"loncheras_usuario_{current_user.id}"
+    )
+
+
+@router.get("/auditoria/restricciones", response_model=List[ConflictoRestriccion])
+async def auditar_restricciones(
+    colegio: str,
+    desde: Optional[date] = None,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(require_admin)
+):
+    """
+    Revisar las loncheras próximas de un colegio contra las restricciones
+    alimentarias de cada hijo (solo administradores)
+    """
+    return RestriccionService.auditar_colegio(db, colegio=colegio, desde=desde)
+
+
+@router.get("/cache/estadisticas")
+async def estadisticas_cache(
+    current_user: Principal = Depends(require_admin)
+):
+    """
+    Contadores del cache de detalle de loncheras (solo administradores)
+    """
+    return cache_detalle.estadisticas()
+
+
+@router.get("/{lonchera_id}", response_model=LoncheraWithAlimentos)
+async def obtener_lonchera(
+    lonchera_id: int,
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """
+    Obtener una lonchera por ID con sus alimentos
+    
+    Soporta If-None-Match: si el cliente ya tiene la versión actual se
+    responde 304 sin cargar los alimentos. El cuerpo JSON se guarda en
+    cache por versión.
+    """
+    actual = verificar_acceso_lonchera(db, lonchera_id, current_user)
+    
+    etag = etag_lonchera(lonchera_id, actual.version)
+    if coincide(if_none_match, etag):
+        return no_modificado(etag)
+    
+    # El detalle serializado se reutiliza mientras la versión no cambie
+    cuerpo = cache_detalle.obtener(lonchera_id, version=actual.version)
+    version = actual.version
     
-    response = lonchera.__dict__.copy()
-    response["alimentos"] = alimentos_detalle
-    response["resumen_nutricional"] = resumen.model_dump()
+    if cuerpo is None:
+        lonchera = LoncheraService.get_detalle(db, lonchera_id=lonchera_id)
+        
+        # Pudo borrarse entre la verificación de acceso y la carga del detalle
+        if lonchera is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Lonchera no encontrada"
+            )
+        
+        version = lonchera.version
+        cuerpo = construir_detalle_lonchera(lonchera).model_dump_json()
+        cache_detalle.guardar(lonchera_id, cuerpo, version=version)
     
-    return response
+    return Response(
+        content=cuerpo,
+        media_type="application/json",
+        headers={
+            "ETag": etag_lonchera(lonchera_id, version),
+            "Cache-Control": "private, no-cache"
+        }
+    )
 
 
 @router.post("/", response_model=Lonchera, status_code=status.HTTP_201_CREATED)
 async def crear_lonchera(
     lonchera: LoncheraCreate,
     db: Session = Depends(get_db),
-    current_user: Usuario = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """
     Crear nueva lonchera (Estándar y Premium)
@@ -136,12 +329,79 @@ async def crear_lonchera(
     )
 
 
+@router.post("/lote", response_model=LoncheraLoteResultado)
+async def crear_loncheras_lote(
+    lote: LoncheraLoteCreate,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """
+    Crear varias loncheras en una sola transacción (Estándar y Premium)
+    
+    Pensado para planificar la semana de varios hijos. Cada entrada se
+    reporta por separado: las inválidas no impiden crear las demás.
+    """
+    verificar_permisos_membresia(current_user, requiere_estandar_o_premium=True)
+    
+    resultados = LoncheraService.crear_lote(
+        db,
+        loncheras=lote.loncheras,
+        usuario_id=current_user.id
+    )
+    creadas = sum(1 for r in resultados if r.creada)
+    
+    return {
+        "creadas": creadas,
+        "errores": len(resultados) - creadas,
+        "resultados": resultados
+    }
+
+
+@router.post("/planificar", response_model=PlanificacionResultado)
+async def planificar_loncheras(
+    solicitud: PlanificacionRequest,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """
+    Generar loncheras automáticamente para un hijo (Estándar y Premium)
+    
+    Elige alimentos activos del catálogo que cumplan los rangos de calorías
+    y proteínas, eviten las restricciones del hijo y no se repitan en la
+    semana. Con `guardar=true` las loncheras se crean directamente.
+    """
+    verificar_permisos_membresia(current_user, requiere_estandar_o_premium=True)
+    
+    if solicitud.hijo_id not in current_user.hijo_ids:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="No tiene permisos para crear lonchera para este hijo"
+        )
+    
+    if (solicitud.fecha_fin - solicitud.fecha_inicio).days >= PlanificadorService.MAX_DIAS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"El rango no puede superar {PlanificadorService.MAX_DIAS} días"
+        )
+    
+    resultado = await PlanificadorService.planificar(db, solicitud)
+    
+    if solicitud.guardar and resultado.loncheras:
+        resultado.resultados = LoncheraService.crear_lote(
+            db,
+            loncheras=resultado.loncheras,
+            usuario_id=current_user.id
+        )
+    
+    return resultado
+
+
 @router.put("/{lonchera_id}", response_model=Lonchera)
 async def actualizar_lonchera(
     lonchera_id: int,
     lonchera: LoncheraUpdate,
     db: Session = Depends(get_db),
-    current_user: Usuario = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """
     Actualizar lonchera
@@ -158,7 +418,7 @@ async def actualizar_lonchera(
 async def eliminar_lonchera(
     lonchera_id: int,
     db: Session = Depends(get_db),
-    current_user: Usuario = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """
     Eliminar lonchera
@@ -172,7 +432,7 @@ async def agregar_alimento_a_lonchera(
     lonchera_id: int,
     alimento: LoncheraAlimentoCreate,
     db: Session = Depends(get_db),
-    current_user: Usuario = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """
     Agregar alimento a lonchera (Premium para personalización)
@@ -186,12 +446,34 @@ async def agregar_alimento_a_lonchera(
     )
 
 
+@router.post("/{lonchera_id}/alimentos/lote", response_model=LoncheraWithAlimentos)
+async def operar_alimentos_de_lonchera(
+    lonchera_id: int,
+    solicitud: OperacionesAlimentos,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """
+    Agregar, eliminar o fijar la cantidad de varios alimentos de una lonchera
+    en una sola transacción (Premium). Retorna la lonchera actualizada.
+    """
+    verificar_permisos_membresia(current_user, requiere_premium=True)
+    
+    lonchera = LoncheraService.aplicar_operaciones(
+        db,
+        lonchera_id=lonchera_id,
+        operaciones=solicitud.operaciones,
+        usuario_id=current_user.id
+    )
+    return construir_detalle_lonchera(lonchera)
+
+
 @router.delete("/{lonchera_id}/alimentos/{alimento_id}")
 async def eliminar_alimento_de_lonchera(
     lonchera_id: int,
     alimento_id: int,
     db: Session = Depends(get_db),
-    current_user: Usuario = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """
     Eliminar alimento de lonchera (Premium)
@@ -205,35 +487,39 @@ async def eliminar_alimento_de_lonchera(
 @router.get("/{lonchera_id}/resumen", response_model=ResumenNutricional)
 async def obtener_resumen_nutricional(
     lonchera_id: int,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
     db: Session = Depends(get_db),
-    current_user: Usuario = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """
-    Obtener resumen nutricional de una lonchera
+    Obtener resumen nutricional de una lonchera (soporta If-None-Match)
     """
+    actual = verificar_acceso_lonchera(db, lonchera_id, current_user)
+    
+    etag = etag_lonchera(lonchera_id, actual.version, "-r")
+    if coincide(if_none_match, etag):
+        return no_modificado(etag)
+    
     lonchera = LoncheraService.get_by_id(db, lonchera_id=lonchera_id)
     
-    if not lonchera:
+    # Pudo borrarse entre la verificación de acceso y esta lectura
+    if lonchera is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Lonchera no encontrada"
         )
     
-    # Verificar permisos
-    if not any(h.id == lonchera.hijo_id for h in current_user.hijos):
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="No tiene permisos para ver esta lonchera"
-        )
-    
-    return LoncheraService.calcular_resumen_nutricional(db, lonchera_id)
+    response.headers["ETag"] = etag_lonchera(lonchera.id, lonchera.version, "-r")
+    response.headers["Cache-Control"] = "private, no-cache"
+    return LoncheraService.resumen_de(lonchera)
 
 
 @router.post("/{lonchera_id}/confirmar", response_model=Lonchera)
 async def confirmar_lonchera(
     lonchera_id: int,
     db: Session = Depends(get_db),
-    current_user: Usuario = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """
     Confirmar lonchera (cambiar estado a confirmada)
@@ -245,24 +531,37 @@ async def confirmar_lonchera(
     )
 
 
+@router.post("/{lonchera_id}/asignar", response_model=AsignacionMasivaResultado)
+async def asignar_lonchera_predeterminada(
+    lonchera_id: int,
+    solicitud: AsignacionMasivaRequest,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(require_admin)
+):
+    """
+    Asignar una lonchera predeterminada a todos los hijos que cumplan el filtro
+    (colegio, grado escolar, membresía) en un rango de fechas (solo administradores)
+    """
+    return LoncheraService.asignar_plantilla(db, lonchera_id, solicitud)
+
+
 @router.get("/hijo/{hijo_id}/fecha/{fecha}", response_model=LoncheraWithAlimentos)
 async def obtener_lonchera_por_fecha(
     hijo_id: int,
     fecha: date,
     db: Session = Depends(get_db),
-    current_user: Usuario = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """
     Obtener lonchera de un hijo en una fecha específica
     """
-    # Verificar que el hijo pertenece al usuario
-    if not any(h.id == hijo_id for h in current_user.hijos):
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="No tiene permisos para ver loncheras de este hijo"
-        )
-    
-    lonchera = LoncheraService.get_por_fecha(db, hijo_id=hijo_id, fecha=fecha)
+    # Verifica además que el hijo pertenece al usuario
+    lonchera = LoncheraService.get_detalle_por_fecha(
+        db,
+        hijo_id=hijo_id,
+        fecha=fecha,
+        usuario_id=current_user.id
+    )
     
     if not lonchera:
         raise HTTPException(
@@ -270,26 +569,68 @@ async def obtener_lonchera_por_fecha(
             detail="No hay lonchera asignada para esta fecha"
         )
     
-    # Calcular resumen nutricional
-    resumen = LoncheraService.calcular_resumen_nutricional(db, lonchera.id)
-    
-    # Preparar respuesta con alimentos
-    alimentos_detalle = []
-    for la in lonchera.alimentos:
-        alimento_info = {
-            "id": la.alimento.id,
-            "nombre": la.alimento.nombre,
-            "tipo": la.alimento.tipo,
-            "cantidad": la.cantidad,
-            "calorias": la.alimento.calorias,
-            "proteinas": la.alimento.proteinas,
-            "carbohidratos": la.alimento.carbohidratos,
-            "notas": la.notas
-        }
-        alimentos_detalle.append(alimento_info)
+    return construir_detalle_lonchera(lonchera)
+
+
+@router.get("/hijo/{hijo_id}/reporte", response_model=ReporteNutricional)
+async def obtener_reporte_nutricional(
+    hijo_id: int,
+    periodo: str = Query("semanal", pattern="^(semanal|mensual)$"),
+    fecha: Optional[date] = None,
+    db: Session = Depends(get_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """
+    Reporte nutricional semanal o mensual de un hijo
+    
+    El periodo es la semana (lunes a domingo) o el mes que contiene `fecha`
+    (por defecto, hoy).
+    """
+    if hijo_id not in current_user.hijo_ids:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="No tiene permisos para ver loncheras de este hijo"
+        )
+    
+    fecha = fecha or date.today()
+    
+    if periodo == "semanal":
+        fecha_inicio = fecha - timedelta(days=fecha.weekday())
+        fecha_fin = fecha_inicio + timedelta(days=6)
+    else:
+        fecha_inicio = fecha.replace(day=1)
+        siguiente_mes = (fecha_inicio + timedelta(days=32)).replace(day=1)
+        fecha_fin = siguiente_mes - timedelta(days=1)
+    
+    reportes = ReporteService.reporte_periodo(db, [hijo_id], fecha_inicio, fecha_fin)
     
-    response = lonchera.__dict__.copy()
-    response["alimentos"] = alimentos_detalle
-    response["resumen_nutricional"] = resumen.model_dump()
+    return reportes[hijo_id]
+
+
+@router.get("/hijo/{hijo_id}/exportar")
+async def exportar_historial_hijo(
+    hijo_id: int,
+    formato: str = Query("csv", pattern="^(csv|ndjson)$"),
+    fecha_inicio: Optional[date] = None,
+    fecha_fin: Optional[date] = None,
+    current_user: Principal = Depends(get_current_user)
+):
+    """
+    Exportar el historial de loncheras de un hijo (CSV o NDJSON, en streaming)
+    """
+    if hijo_id not in current_user.hijo_ids:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="No tiene permisos para ver loncheras de este hijo"
+        )
     
-    return response
+    return respuesta_exportacion(
+        ExportacionService.exportar(
+            formato,
+            hijo_id=hijo_id,
+            fecha_inicio=fecha_inicio,
+            fecha_fin=fecha_fin
+        ),
+        formato,
+        f"loncheras_hijo_{hijo_id}"
+    )
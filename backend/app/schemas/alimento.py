@@ -2,7 +2,7 @@
 Schemas Pydantic para validación de datos - Alimento
 """
 from pydantic import BaseModel, Field, ConfigDict
-from typing import Optional
+from typing import Optional, List
 from datetime import datetime
 
 
@@ -70,3 +70,20 @@ class AlimentoNutricional(BaseModel):
     fibra: float
     
     model_config = ConfigDict(from_attributes=True)
+
+
+class ErrorImportacion(BaseModel):
+    """Schema para una fila rechazada en la importación del catálogo"""
+    fila: int
+    nombre: Optional[str] = None
+    errores: List[str]
+
+
+class ResultadoImportacion(BaseModel):
+    """Schema del resultado de importar un catálogo de alimentos"""
+    total_filas: int
+    creados: int
+    duplicados: int
+    con_errores: int
+    filas_duplicadas: List[int] = []
+    errores: List[ErrorImportacion] = []
@@ -0,0 +1,58 @@
+"""
+Schemas Pydantic para validación de datos - Estadísticas
+"""
+from pydantic import BaseModel
+from typing import Optional, List
+from datetime import date
+from backend.app.schemas.lonchera import ResumenNutricional
+
+
+class EstadisticaSemana(BaseModel):
+    """Schema para los promedios de una semana (lunes a domingo)"""
+    semana_inicio: date
+    dias_con_loncheras: int
+    num_loncheras: int
+    promedio_diario: ResumenNutricional
+    variacion_calorias: Optional[float] = None
+
+
+class EstadisticasSemanales(BaseModel):
+    """Schema de promedios semanales de un hijo"""
+    hijo_id: int
+    fecha_inicio: date
+    fecha_fin: date
+    semanas: List[EstadisticaSemana] = []
+
+
+class PuntoTendencia(BaseModel):
+    """Schema para un día de la serie de tendencia"""
+    fecha: date
+    calorias: float
+    proteinas: float
+    media_movil_calorias: float
+
+
+class TendenciaNutricional(BaseModel):
+    """Schema de tendencia nutricional de un hijo"""
+    hijo_id: int
+    fecha_inicio: date
+    fecha_fin: date
+    dias: List[PuntoTendencia] = []
+    pendiente_calorias_semanal: Optional[float] = None
+    pendiente_proteinas_semanal: Optional[float] = None
+
+
+class EstadisticaTipo(BaseModel):
+    """Schema para las unidades consumidas de un tipo de alimento"""
+    tipo: str
+    unidades: int
+    porcentaje: float
+
+
+class DistribucionTipos(BaseModel):
+    """Schema de distribución por tipo de alimento de un hijo"""
+    hijo_id: int
+    fecha_inicio: date
+    fecha_fin: date
+    total_unidades: int
+    tipos: List[EstadisticaTipo] = []
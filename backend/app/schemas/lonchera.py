@@ -1,8 +1,8 @@
 """
 Schemas Pydantic para validación de datos - Lonchera
 """
-from pydantic import BaseModel, Field, ConfigDict
-from typing import Optional, List
+from pydantic import BaseModel, Field, ConfigDict, model_validator
+from typing import Optional, List, Literal
 from datetime import date, datetime
 
 
@@ -18,6 +18,19 @@ class LoncheraAlimentoCreate(LoncheraAlimentoBase):
     pass
 
 
+class OperacionAlimento(BaseModel):
+    """Schema para una operación sobre los alimentos de una lonchera"""
+    accion: Literal["agregar", "eliminar", "establecer"]
+    alimento_id: int
+    cantidad: int = Field(default=1, ge=1)
+    notas: Optional[str] = None
+
+
+class OperacionesAlimentos(BaseModel):
+    """Schema para aplicar varias operaciones de alimentos en una petición"""
+    operaciones: List[OperacionAlimento] = Field(..., min_length=1, max_length=200)
+
+
 class LoncheraAlimento(LoncheraAlimentoBase):
     """Schema de Lonchera-Alimento completo"""
     id: int
@@ -26,6 +39,16 @@ class LoncheraAlimento(LoncheraAlimentoBase):
     model_config = ConfigDict(from_attributes=True)
 
 
+class ResumenNutricional(BaseModel):
+    """Schema para resumen nutricional de lonchera"""
+    total_calorias: float = 0.0
+    total_proteinas: float = 0.0
+    total_carbohidratos: float = 0.0
+    total_grasas: float = 0.0
+    total_fibra: float = 0.0
+    num_alimentos: int = 0
+
+
 class LoncheraBase(BaseModel):
     """Schema base de Lonchera"""
     nombre: str = Field(..., min_length=2, max_length=100)
@@ -39,6 +62,11 @@ class LoncheraCreate(LoncheraBase):
     alimentos: List[LoncheraAlimentoCreate] = []
 
 
+class LoncheraLoteCreate(BaseModel):
+    """Schema para crear varias loncheras en una sola petición"""
+    loncheras: List[LoncheraCreate] = Field(..., min_length=1, max_length=500)
+
+
 class LoncheraUpdate(BaseModel):
     """Schema para actualizar Lonchera"""
     nombre: Optional[str] = Field(None, min_length=2, max_length=100)
@@ -53,17 +81,29 @@ class Lonchera(LoncheraBase):
     hijo_id: int
     estado: str
     es_predeterminada: bool
+    version: int = 1
     created_at: datetime
     updated_at: Optional[datetime]
     
     model_config = ConfigDict(from_attributes=True)
 
 
+class AlimentoEnLonchera(BaseModel):
+    """Schema de un alimento dentro del detalle de una lonchera"""
+    id: int
+    nombre: str
+    tipo: str
+    cantidad: int
+    calorias: float
+    proteinas: float
+    carbohidratos: float
+    notas: Optional[str] = None
+
+
 class LoncheraWithAlimentos(Lonchera):
     """Schema de Lonchera con alimentos"""
-    # Simplemente, usa List[dict], ya lo tenías bien
-    alimentos: List[dict] = []
-    resumen_nutricional: Optional[dict] = None
+    alimentos: List[AlimentoEnLonchera] = []
+    resumen_nutricional: Optional[ResumenNutricional] = None
 
 
 class LoncheraSimple(BaseModel):
@@ -76,11 +116,94 @@ class LoncheraSimple(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
-class ResumenNutricional(BaseModel):
-    """Schema para resumen nutricional de lonchera"""
-    total_calorias: float = 0.0
-    total_proteinas: float = 0.0
-    total_carbohidratos: float = 0.0
-    total_grasas: float = 0.0
-    total_fibra: float = 0.0
-    num_alimentos: int = 0
+class LoncheraConResumen(Lonchera):
+    """Schema de Lonchera con resumen nutricional opcional (listados)"""
+    resumen_nutricional: Optional[ResumenNutricional] = None
+
+
+class ResumenDiario(BaseModel):
+    """Schema para los totales nutricionales de un día"""
+    fecha: date
+    num_loncheras: int = 0
+    resumen: ResumenNutricional
+
+
+class ReporteNutricional(BaseModel):
+    """Schema para reporte nutricional de un hijo en un periodo"""
+    hijo_id: int
+    fecha_inicio: date
+    fecha_fin: date
+    dias: List[ResumenDiario] = []
+    total: ResumenNutricional
+    promedio_diario: ResumenNutricional
+
+
+class ResultadoLoncheraLote(BaseModel):
+    """Schema para el resultado de cada entrada de una creación en lote"""
+    indice: int
+    hijo_id: int
+    fecha_asignacion: date
+    creada: bool = False
+    lonchera_id: Optional[int] = None
+    error: Optional[str] = None
+
+
+class LoncheraLoteResultado(BaseModel):
+    """Schema de respuesta de la creación en lote"""
+    creadas: int
+    errores: int
+    resultados: List[ResultadoLoncheraLote]
+
+
+class PlanificacionRequest(BaseModel):
+    """Schema para solicitar la generación automática de loncheras"""
+    hijo_id: int
+    fecha_inicio: date
+    fecha_fin: date
+    calorias_min: float = Field(default=300.0, ge=0)
+    calorias_max: float = Field(default=600.0, ge=0)
+    proteinas_min: float = Field(default=10.0, ge=0)
+    proteinas_max: float = Field(default=35.0, ge=0)
+    alimentos_por_lonchera: int = Field(default=4, ge=1, le=8)
+    incluir_fines_de_semana: bool = False
+    guardar: bool = False
+    
+    @model_validator(mode="after")
+    def validar_rangos(self):
+        if self.fecha_fin < self.fecha_inicio:
+            raise ValueError("La fecha final debe ser posterior a la inicial")
+        if self.calorias_max < self.calorias_min or self.proteinas_max < self.proteinas_min:
+            raise ValueError("Los valores máximos deben ser mayores que los mínimos")
+        return self
+
+
+class PlanificacionResultado(BaseModel):
+    """Schema de respuesta de la planificación"""
+    loncheras: List[LoncheraCreate]
+    resumenes: List[ResumenNutricional] = []
+    resultados: List[ResultadoLoncheraLote] = []
+
+
+class AsignacionMasivaRequest(BaseModel):
+    """Schema para asignar una lonchera predeterminada a muchos hijos"""
+    fecha_inicio: date
+    fecha_fin: date
+    colegio: Optional[str] = None
+    grado_escolar: Optional[str] = None
+    tipo_membresia: Optional[str] = None
+    incluir_fines_de_semana: bool = False
+    
+    @model_validator(mode="after")
+    def validar_fechas(self):
+        if self.fecha_fin < self.fecha_inicio:
+            raise ValueError("La fecha final debe ser posterior a la inicial")
+        return self
+
+
+class AsignacionMasivaResultado(BaseModel):
+    """Schema de respuesta de la asignación masiva"""
+    plantilla_id: int
+    dias: int
+    asignadas: int
+    omitidas_por_restriccion: int
+    duracion_segundos: float
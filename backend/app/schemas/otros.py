@@ -88,6 +88,17 @@ class Restriccion(RestriccionBase):
     model_config = ConfigDict(from_attributes=True)
 
 
+class ConflictoRestriccion(BaseModel):
+    """Schema para un alimento de una lonchera que viola una restricción"""
+    lonchera_id: int
+    hijo_id: int
+    fecha: date
+    alimento_id: int
+    alimento: Optional[str] = None
+    restriccion_id: int
+    restriccion: str
+
+
 # ==================== EXCEPCION ====================
 
 class ExcepcionBase(BaseModel):
@@ -67,10 +67,17 @@ class LoginRequest(BaseModel):
 class Token(BaseModel):
     """Schema para respuesta de token"""
     access_token: str
+    refresh_token: str
     token_type: str = "bearer"
+    expires_in: int
     user_info: Usuario
 
 
+class RefreshRequest(BaseModel):
+    """Schema para renovar el token de acceso"""
+    refresh_token: str
+
+
 class TokenData(BaseModel):
     """Schema para datos del token"""
     user_id: Optional[int] = None
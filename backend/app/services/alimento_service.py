@@ -2,10 +2,15 @@
 Servicio de Alimento - Lógica de negocio
 """
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
 from typing import Optional, List
-from backend.app.models.models import Alimento, HistorialAlimento, EstadoAlimentoEnum
-from backend.app.schemas.alimento import AlimentoCreate, AlimentoUpdate
+from backend.app.models.models import Alimento, HistorialAlimento, LoncheraAlimento, EstadoAlimentoEnum
+from backend.app.schemas.alimento import Alimento as AlimentoSchema, AlimentoCreate, AlimentoUpdate
+from backend.app.services.lonchera_service import LoncheraService
+from backend.app.services.matriz_nutricional import invalidar_matriz
+from backend.app.services.catalogo_alimentos import obtener_catalogo, incrementar_version_catalogo
+from backend.app.services import busqueda_alimentos
+from backend.app.services.autocompletado import obtener_indice
+from backend.app.services.restriccion_service import invalidar_catalogo
 from fastapi import HTTPException, status
 import json
 
@@ -13,11 +18,18 @@ import json
 class AlimentoService:
     """Servicio para gestión de alimentos"""
     
+    CAMPOS_NUTRICIONALES = {"calorias", "proteinas", "carbohidratos", "grasas", "fibra"}
+    
     @staticmethod
     def get_by_id(db: Session, alimento_id: int) -> Optional[Alimento]:
         """Obtener alimento por ID"""
         return db.query(Alimento).filter(Alimento.id == alimento_id).first()
     
+    @staticmethod
+    def get_del_catalogo(db: Session, alimento_id: int) -> Optional[AlimentoSchema]:
+        """Obtener alimento por ID desde la instantánea del catálogo (sin consultas)"""
+        return obtener_catalogo(db).por_id.get(alimento_id)
+    
     @staticmethod
     def get_all(
         db: Session, 
@@ -25,20 +37,13 @@ class AlimentoService:
         limit: int = 100,
         estado: Optional[str] = None,
         tipo: Optional[str] = None
-    ) -> List[Alimento]:
-        """Obtener lista de alimentos con filtros"""
-        query = db.query(Alimento)
-        
-        if estado:
-            query = query.filter(Alimento.estado == estado)
-        
-        if tipo:
-            query = query.filter(Alimento.tipo == tipo)
-        
-        return query.offset(skip).limit(limit).all()
+    ) -> List[AlimentoSchema]:
+        """Obtener lista de alimentos con filtros (desde la instantánea del catálogo)"""
+        alimentos = obtener_catalogo(db).filtrar(estado=estado, tipo=tipo)
+        return list(alimentos[skip:skip + limit])
     
     @staticmethod
-    def get_activos(db: Session, skip: int = 0, limit: int = 100) -> List[Alimento]:
+    def get_activos(db: Session, skip: int = 0, limit: int = 100) -> List[AlimentoSchema]:
         """Obtener solo alimentos activos"""
         return AlimentoService.get_all(
             db, 
@@ -52,17 +57,15 @@ class AlimentoService:
         """Crear nuevo alimento"""
         db_alimento = Alimento(**alimento.model_dump())
         
+        # Registrar en historial (en la misma transacción)
+        db_alimento.historial.append(
+            AlimentoService.nuevo_historial(accion="Creado", usuario_id=usuario_id)
+        )
+        
         db.add(db_alimento)
         db.commit()
         db.refresh(db_alimento)
-        
-        # Registrar en historial
-        AlimentoService._registrar_historial(
-            db, 
-            alimento_id=db_alimento.id,
-            accion="Creado",
-            usuario_id=usuario_id
-        )
+        AlimentoService.catalogo_modificado()
         
         return db_alimento
     
@@ -98,6 +101,20 @@ class AlimentoService:
         
         db.commit()
         db.refresh(db_alimento)
+        AlimentoService.catalogo_modificado()
+        
+        # Los totales materializados de las loncheras dependen de los nutrientes;
+        # cualquier otro cambio solo invalida su versión (ETag del detalle)
+        if update_data.keys() & AlimentoService.CAMPOS_NUTRICIONALES:
+            LoncheraService.recalcular_totales(
+                db,
+                AlimentoService._loncheras_con_alimento(db, alimento_id)
+            )
+        elif update_data:
+            LoncheraService.incrementar_versiones(
+                db,
+                AlimentoService._loncheras_con_alimento(db, alimento_id)
+            )
         
         # Registrar en historial
         AlimentoService._registrar_historial(
@@ -132,6 +149,7 @@ class AlimentoService:
         db_alimento.estado = EstadoAlimentoEnum.INACTIVO.value
         db.commit()
         db.refresh(db_alimento)
+        AlimentoService.catalogo_modificado()
         
         # Registrar en historial
         AlimentoService._registrar_historial(
@@ -158,6 +176,7 @@ class AlimentoService:
         db_alimento.estado = EstadoAlimentoEnum.ACTIVO.value
         db.commit()
         db.refresh(db_alimento)
+        AlimentoService.catalogo_modificado()
         
         # Registrar en historial
         AlimentoService._registrar_historial(
@@ -183,23 +202,37 @@ class AlimentoService:
         query: str, 
         skip: int = 0, 
         limit: int = 100
-    ) -> List[Alimento]:
-        """Buscar alimentos por nombre o tipo"""
-        return db.query(Alimento).filter(
-            or_(
-                Alimento.nombre.ilike(f"%{query}%"),
-                Alimento.tipo.ilike(f"%{query}%")
-            ),
-            Alimento.estado == EstadoAlimentoEnum.ACTIVO.value
-        ).offset(skip).limit(limit).all()
+    ) -> List[AlimentoSchema]:
+        """
+        Buscar alimentos activos por nombre, tipo o descripción (sin distinguir
+        acentos), ordenados por relevancia
+        """
+        return busqueda_alimentos.buscar(db, query, skip=skip, limit=limit)
     
     @staticmethod
-    def get_por_tipo(db: Session, tipo: str) -> List[Alimento]:
-        """Obtener alimentos por tipo"""
-        return db.query(Alimento).filter(
-            Alimento.tipo == tipo,
-            Alimento.estado == EstadoAlimentoEnum.ACTIVO.value
-        ).all()
+    def autocompletar(db: Session, texto: str, limit: int = 10) -> List[AlimentoSchema]:
+        """Sugerencias para búsqueda mientras se escribe (índice de prefijos en memoria)"""
+        return obtener_indice(db).buscar(texto, limit=limit)
+    
+    @staticmethod
+    def get_por_tipo(db: Session, tipo: str) -> List[AlimentoSchema]:
+        """Obtener alimentos activos por tipo (desde la instantánea del catálogo)"""
+        return list(obtener_catalogo(db).activos_por_tipo.get(tipo, ()))
+    
+    @staticmethod
+    def catalogo_modificado():
+        """Descartar las estructuras en memoria derivadas del catálogo"""
+        invalidar_matriz()
+        invalidar_catalogo()
+        incrementar_version_catalogo()
+    
+    @staticmethod
+    def _loncheras_con_alimento(db: Session, alimento_id: int) -> List[int]:
+        """Obtener ids de las loncheras que contienen un alimento"""
+        filas = db.query(LoncheraAlimento.lonchera_id).filter(
+            LoncheraAlimento.alimento_id == alimento_id
+        ).distinct().all()
+        return [fila.lonchera_id for fila in filas]
     
     @staticmethod
     def _registrar_historial(
@@ -211,13 +244,28 @@ class AlimentoService:
         motivo: str = None
     ):
         """Registrar acción en historial de alimentos"""
-        historial = HistorialAlimento(
-            alimento_id=alimento_id,
+        historial = AlimentoService.nuevo_historial(
             accion=accion,
-            usuario_accion=str(usuario_id) if usuario_id else None,
+            usuario_id=usuario_id,
             datos_anteriores=datos_anteriores,
             motivo=motivo
         )
+        historial.alimento_id = alimento_id
         
         db.add(historial)
         db.commit()
+    
+    @staticmethod
+    def nuevo_historial(
+        accion: str,
+        usuario_id: int = None,
+        datos_anteriores: str = None,
+        motivo: str = None
+    ) -> HistorialAlimento:
+        """Construir (sin persistir) una entrada del historial de alimentos"""
+        return HistorialAlimento(
+            accion=accion,
+            usuario_accion=str(usuario_id) if usuario_id else None,
+            datos_anteriores=datos_anteriores,
+            motivo=motivo
+        )
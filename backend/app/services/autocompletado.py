@@ -0,0 +1,178 @@
+"""
+Índice de prefijos en memoria para el autocompletado de alimentos
+
+Las palabras normalizadas (sin acentos, en minúsculas) del nombre y el tipo
+de cada alimento activo se guardan en un arreglo ordenado; los alimentos
+cuyo nombre o tipo tiene una palabra que empieza por el prefijo ocupan un
+rango contiguo que se encuentra con bisect. Para los prefijos de una o dos
+letras, que abarcan gran parte del catálogo, los mejores resultados se
+precalculan.
+
+Los resultados se ordenan por popularidad (número de loncheras que incluyen
+el alimento). El índice se reconstruye en la petición solo cuando cambia la
+versión del catálogo (sin consultar la base de datos: reutiliza la
+popularidad anterior). La popularidad se recalcula en segundo plano cada
+AUTOCOMPLETADO_TTL_SEGUNDOS (ver tasks/popularidad.py), y con ella el índice,
+que así también recoge los cambios del catálogo hechos en otros procesos.
+"""
+import heapq
+import threading
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from backend.app.models.models import LoncheraAlimento
+from backend.app.schemas.alimento import Alimento as AlimentoSchema
+from backend.app.services.busqueda_alimentos import MAX_TERMINOS
+from backend.app.services.catalogo_alimentos import CatalogoAlimentos, obtener_catalogo
+from backend.app.utils.texto import palabras
+
+# Prefijos con resultados precalculados (hasta este largo)
+LARGO_PRECALCULADO = 2
+
+# Resultados como máximo por consulta
+MAX_RESULTADOS = 20
+
+# Mayor que cualquier carácter: cierra el rango de claves con un prefijo
+_FIN = chr(0x10FFFF)
+
+
+class IndicePrefijos:
+    """Palabras de los alimentos activos en un arreglo ordenado"""
+    
+    def __init__(self, catalogo: CatalogoAlimentos, popularidad: Dict[int, int]):
+        self.catalogo = catalogo
+        self.version = catalogo.version
+        self.popularidad = popularidad
+        
+        self.palabras = {
+            a.id: frozenset(palabras(f"{a.nombre} {a.tipo}"))
+            for a in catalogo.activos
+        }
+        
+        pares = sorted(
+            (palabra, alimento_id)
+            for alimento_id, del_alimento in self.palabras.items()
+            for palabra in del_alimento
+        )
+        self.claves = [palabra for palabra, _ in pares]
+        self.ids = [alimento_id for _, alimento_id in pares]
+        
+        # Más popular primero; a igual popularidad, el nombre más corto
+        self.orden = {
+            a.id: (-popularidad.get(a.id, 0), len(a.nombre), a.id)
+            for a in catalogo.activos
+        }
+        
+        cortos: Dict[str, set] = {}
+        for palabra, alimento_id in pares:
+            for largo in range(1, min(LARGO_PRECALCULADO, len(palabra)) + 1):
+                cortos.setdefault(palabra[:largo], set()).add(alimento_id)
+        
+        self.precalculados = {
+            prefijo: tuple(heapq.nsmallest(MAX_RESULTADOS, ids, key=self.orden.__getitem__))
+            for prefijo, ids in cortos.items()
+        }
+    
+    def _candidatos(self, prefijo: str) -> set:
+        """Alimentos con alguna palabra que empieza por el prefijo"""
+        inicio = bisect_left(self.claves, prefijo)
+        fin = bisect_right(self.claves, prefijo + _FIN, lo=inicio)
+        return set(self.ids[inicio:fin])
+    
+    def buscar(self, texto: str, limit: int = 10) -> List[AlimentoSchema]:
+        """
+        Alimentos en los que cada palabra del texto es prefijo de alguna
+        palabra de su nombre o tipo, los más populares primero
+        """
+        prefijos = palabras(texto)[:MAX_TERMINOS]
+        
+        if not prefijos:
+            return []
+        
+        limit = min(limit, MAX_RESULTADOS)
+        
+        if len(prefijos) == 1 and len(prefijos[0]) <= LARGO_PRECALCULADO:
+            ids = self.precalculados.get(prefijos[0], ())[:limit]
+        else:
+            # El prefijo más largo es el más selectivo
+            principal = max(prefijos, key=len)
+            candidatos = [
+                alimento_id for alimento_id in self._candidatos(principal)
+                if all(
+                    any(palabra.startswith(p) for palabra in self.palabras[alimento_id])
+                    for p in prefijos
+                )
+            ]
+            ids = heapq.nsmallest(limit, candidatos, key=self.orden.__getitem__)
+        
+        por_id = self.catalogo.por_id
+        return [por_id[alimento_id] for alimento_id in ids]
+    
+    def vigente(self, catalogo: CatalogoAlimentos) -> bool:
+        """
+        El índice es de la versión actual del catálogo
+        
+        No se compara el objeto instantánea: se recarga al expirar
+        (CATALOGO_TTL_SEGUNDOS) aunque no haya cambiado nada.
+        """
+        return self.version == catalogo.version
+
+
+def consultar_popularidad(db: Session) -> Dict[int, int]:
+    """Número de loncheras que incluyen cada alimento (una consulta agregada)"""
+    return dict(
+        db.query(
+            LoncheraAlimento.alimento_id,
+            func.count(LoncheraAlimento.id)
+        ).group_by(LoncheraAlimento.alimento_id).all()
+    )
+
+
+# ==================== CACHE DEL ÍNDICE ====================
+
+_indice: Optional[IndicePrefijos] = None
+_lock = threading.Lock()
+
+
+def obtener_indice(db: Session) -> IndicePrefijos:
+    """
+    Obtener el índice vigente, reconstruyéndolo si cambió la versión del
+    catálogo (con la popularidad ya calculada, sin consultar lonchera_alimento)
+    """
+    global _indice
+    
+    catalogo = obtener_catalogo(db)
+    
+    indice = _indice
+    if indice is not None and indice.vigente(catalogo):
+        return indice
+    
+    with _lock:
+        if _indice is None or not _indice.vigente(catalogo):
+            popularidad = _indice.popularidad if _indice is not None else {}
+            _indice = IndicePrefijos(catalogo, popularidad)
+        return _indice
+
+
+def refrescar_popularidad(db: Session) -> IndicePrefijos:
+    """Reconstruir el índice con la popularidad actual (tarea en segundo plano)"""
+    global _indice
+    
+    popularidad = consultar_popularidad(db)
+    indice = IndicePrefijos(obtener_catalogo(db), popularidad)
+    
+    with _lock:
+        _indice = indice
+    
+    return indice
+
+
+def invalidar_indice():
+    """Descartar el índice (se reconstruye en la siguiente consulta)"""
+    global _indice
+    
+    with _lock:
+        _indice = None
@@ -0,0 +1,227 @@
+"""
+Índice de búsqueda de texto completo del catálogo de alimentos
+
+Reemplaza el ILIKE '%q%' (que no puede usar índices) por un índice sobre
+nombre, tipo y descripción, insensible a mayúsculas y acentos ("platano"
+encuentra "Plátano"), con resultados ordenados por relevancia:
+
+- SQLite: tabla virtual FTS5 de contenido externo (tokenizador unicode61 con
+  remove_diacritics) sincronizada con triggers sobre `alimentos`.
+- PostgreSQL: índice GIN sobre un tsvector ponderado del texto sin acentos
+  (unaccent) y un índice de trigramas sobre el nombre para coincidencias
+  parciales y errores de tipeo.
+
+Los triggers y los índices por expresión se mantienen solos en cada
+escritura del catálogo, también en inserciones masivas con SQL.
+"""
+import logging
+from typing import List, Optional
+
+from sqlalchemy import or_, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from backend.app.models.models import Alimento, EstadoAlimentoEnum
+from backend.app.schemas.alimento import Alimento as AlimentoSchema
+from backend.app.services.catalogo_alimentos import obtener_catalogo
+from backend.app.utils.texto import palabras
+
+logger = logging.getLogger(__name__)
+
+# Motor de búsqueda disponible en la base de datos ("fts5", "postgresql" o None)
+_motor: Optional[str] = None
+
+# Términos como máximo por consulta
+MAX_TERMINOS = 8
+
+SQLITE_ESQUEMA = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS alimentos_busqueda USING fts5(
+        nombre, tipo, descripcion,
+        content='alimentos', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS alimentos_busqueda_ai AFTER INSERT ON alimentos BEGIN
+        INSERT INTO alimentos_busqueda(rowid, nombre, tipo, descripcion)
+        VALUES (new.id, new.nombre, new.tipo, new.descripcion);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS alimentos_busqueda_ad AFTER DELETE ON alimentos BEGIN
+        INSERT INTO alimentos_busqueda(alimentos_busqueda, rowid, nombre, tipo, descripcion)
+        VALUES ('delete', old.id, old.nombre, old.tipo, old.descripcion);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS alimentos_busqueda_au
+    AFTER UPDATE OF nombre, tipo, descripcion ON alimentos BEGIN
+        INSERT INTO alimentos_busqueda(alimentos_busqueda, rowid, nombre, tipo, descripcion)
+        VALUES ('delete', old.id, old.nombre, old.tipo, old.descripcion);
+        INSERT INTO alimentos_busqueda(rowid, nombre, tipo, descripcion)
+        VALUES (new.id, new.nombre, new.tipo, new.descripcion);
+    END
+    """
+]
+
+POSTGRES_ESQUEMA = [
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    # unaccent() no es IMMUTABLE; el envoltorio con diccionario explícito sí
+    # puede usarse en índices por expresión
+    """
+    CREATE OR REPLACE FUNCTION nutribox_normalizar(texto text) RETURNS text
+    LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT AS
+    $$ SELECT lower(public.unaccent('public.unaccent'::regdictionary, texto)) $$
+    """,
+    """
+    CREATE OR REPLACE FUNCTION nutribox_alimento_tsv(nombre text, tipo text, descripcion text)
+    RETURNS tsvector LANGUAGE sql IMMUTABLE PARALLEL SAFE AS
+    $$ SELECT
+        setweight(to_tsvector('simple', coalesce(nutribox_normalizar(nombre), '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(nutribox_normalizar(tipo), '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(nutribox_normalizar(descripcion), '')), 'C') $$
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS ix_alimentos_busqueda_tsv ON alimentos
+    USING gin (nutribox_alimento_tsv(nombre, tipo, descripcion))
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS ix_alimentos_nombre_trgm ON alimentos
+    USING gin (nutribox_normalizar(nombre) gin_trgm_ops)
+    """
+]
+
+# Pesos bm25 de las columnas nombre, tipo y descripción
+SQLITE_BUSQUEDA = text("""
+    SELECT a.id
+    FROM alimentos_busqueda
+    JOIN alimentos a ON a.id = alimentos_busqueda.rowid
+    WHERE alimentos_busqueda MATCH :consulta AND a.estado = :estado
+    ORDER BY bm25(alimentos_busqueda, 10.0, 4.0, 1.0), a.id
+    LIMIT :limit OFFSET :skip
+""")
+
+POSTGRES_BUSQUEDA = text("""
+    SELECT a.id
+    FROM alimentos a, to_tsquery('simple', :consulta) q
+    WHERE a.estado = :estado
+      AND (
+        nutribox_alimento_tsv(a.nombre, a.tipo, a.descripcion) @@ q
+        OR nutribox_normalizar(a.nombre) % :texto
+      )
+    ORDER BY
+        ts_rank_cd(nutribox_alimento_tsv(a.nombre, a.tipo, a.descripcion), q)
+        + similarity(nutribox_normalizar(a.nombre), :texto) DESC,
+        a.id
+    LIMIT :limit OFFSET :skip
+""")
+
+
+def crear_indice_busqueda(engine: Engine):
+    """
+    Crear (si no existen) el índice de búsqueda y sus triggers o funciones
+    
+    Es idempotente; se llama al arrancar después de create_all. Si la base
+    de datos no lo soporta, la búsqueda sigue funcionando con ILIKE.
+    """
+    global _motor
+    
+    dialecto = engine.dialect.name
+    
+    try:
+        if dialecto == "sqlite":
+            with engine.begin() as conn:
+                existia = conn.execute(text(
+                    "SELECT 1 FROM sqlite_master WHERE name = 'alimentos_busqueda'"
+                )).first() is not None
+                
+                for sentencia in SQLITE_ESQUEMA:
+                    conn.execute(text(sentencia))
+                
+                # Indexar el catálogo que ya existía antes del índice
+                if not existia:
+                    conn.execute(text(
+                        "INSERT INTO alimentos_busqueda(alimentos_busqueda) VALUES ('rebuild')"
+                    ))
+            _motor = "fts5"
+        
+        elif dialecto == "postgresql":
+            with engine.begin() as conn:
+                for sentencia in POSTGRES_ESQUEMA:
+                    conn.execute(text(sentencia))
+            _motor = "postgresql"
+    
+    except DBAPIError:
+        logger.exception("No se pudo crear el índice de búsqueda de alimentos; se usará ILIKE")
+        _motor = None
+
+
+def reconstruir_indice(db: Session):
+    """Reindexar todo el catálogo (mantenimiento; solo necesario en SQLite)"""
+    if _motor == "fts5":
+        db.execute(text("INSERT INTO alimentos_busqueda(alimentos_busqueda) VALUES ('rebuild')"))
+        db.commit()
+
+
+def buscar(db: Session, texto: str, skip: int = 0, limit: int = 100) -> List[AlimentoSchema]:
+    """Alimentos activos que coinciden con el texto, del más al menos relevante"""
+    terminos = palabras(texto)[:MAX_TERMINOS]
+    
+    if not terminos:
+        return []
+    
+    parametros = {
+        "estado": EstadoAlimentoEnum.ACTIVO.value,
+        "skip": skip,
+        "limit": limit
+    }
+    
+    if _motor == "fts5":
+        # Cada palabra como prefijo ("plat" encuentra "plátano"); todas deben aparecer
+        parametros["consulta"] = " ".join(f'"{t}"*' for t in terminos)
+        ids = [fila.id for fila in db.execute(SQLITE_BUSQUEDA, parametros)]
+    elif _motor == "postgresql":
+        parametros["consulta"] = " & ".join(f"{t}:*" for t in terminos)
+        parametros["texto"] = " ".join(terminos)
+        ids = [fila.id for fila in db.execute(POSTGRES_BUSQUEDA, parametros)]
+    else:
+        return _buscar_ilike(db, texto, skip, limit)
+    
+    return _desde_catalogo(db, ids)
+
+
+def _desde_catalogo(db: Session, ids: List[int]) -> List[AlimentoSchema]:
+    """Alimentos en el orden de `ids`, desde la instantánea del catálogo"""
+    por_id = obtener_catalogo(db).por_id
+    
+    # Alimentos creados en otro proceso que la instantánea aún no tiene
+    faltantes = [i for i in ids if i not in por_id]
+    extra = {}
+    if faltantes:
+        extra = {
+            a.id: AlimentoSchema.model_validate(a)
+            for a in db.query(Alimento).filter(Alimento.id.in_(faltantes))
+        }
+    
+    return [por_id.get(i) or extra[i] for i in ids if i in por_id or i in extra]
+
+
+def _buscar_ilike(db: Session, texto: str, skip: int, limit: int) -> List[AlimentoSchema]:
+    """
+    Búsqueda sin índice para bases de datos sin FTS5 ni PostgreSQL, sobre
+    los mismos campos que el índice (nombre, tipo y descripción)
+    """
+    patron = f"%{texto}%"
+    filas = db.query(Alimento).filter(
+        or_(
+            Alimento.nombre.ilike(patron),
+            Alimento.tipo.ilike(patron),
+            Alimento.descripcion.ilike(patron)
+        ),
+        Alimento.estado == EstadoAlimentoEnum.ACTIVO.value
+    ).order_by(Alimento.id).offset(skip).limit(limit).all()
+    
+    return [AlimentoSchema.model_validate(a) for a in filas]
@@ -0,0 +1,119 @@
+"""
+Instantánea en memoria del catálogo de alimentos
+
+El catálogo cambia pocas veces por semana y se lee en cada listado y en cada
+alimento que se agrega a una lonchera. Se guarda como una instantánea
+inmutable (tuplas y mappings de solo lectura) que se reconstruye, con una
+sola consulta, cuando cambia el contador de versión del catálogo.
+AlimentoService incrementa el contador tras cada alta, edición, baja o
+restauración.
+
+El contador es por proceso: en un despliegue con varios workers los cambios
+hechos en otro proceso se ven al expirar la instantánea
+(CATALOGO_TTL_SEGUNDOS).
+"""
+import threading
+import time
+from types import MappingProxyType
+from typing import Mapping, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from backend.app.core.config import settings
+from backend.app.models.models import Alimento, EstadoAlimentoEnum
+from backend.app.schemas.alimento import Alimento as AlimentoSchema
+
+
+class CatalogoAlimentos:
+    """Vista de solo lectura del catálogo, con índices por id y por tipo"""
+    
+    def __init__(self, version: int, alimentos: Tuple[AlimentoSchema, ...]):
+        self.version = version
+        self.construido_en = time.monotonic()
+        
+        # Todos los alimentos ordenados por id (el orden de la tabla)
+        self.todos = alimentos
+        self.por_id: Mapping[int, AlimentoSchema] = MappingProxyType(
+            {a.id: a for a in alimentos}
+        )
+        
+        por_estado = {}
+        por_tipo = {}
+        for alimento in alimentos:
+            por_estado.setdefault(alimento.estado, []).append(alimento)
+            por_tipo.setdefault(alimento.tipo, []).append(alimento)
+        
+        self.por_estado: Mapping[str, Tuple[AlimentoSchema, ...]] = MappingProxyType(
+            {estado: tuple(lista) for estado, lista in por_estado.items()}
+        )
+        self.por_tipo: Mapping[str, Tuple[AlimentoSchema, ...]] = MappingProxyType(
+            {tipo: tuple(lista) for tipo, lista in por_tipo.items()}
+        )
+        self.activos = self.por_estado.get(EstadoAlimentoEnum.ACTIVO.value, ())
+        self.activos_por_tipo: Mapping[str, Tuple[AlimentoSchema, ...]] = MappingProxyType({
+            tipo: tuple(a for a in lista if a.estado == EstadoAlimentoEnum.ACTIVO.value)
+            for tipo, lista in self.por_tipo.items()
+        })
+    
+    @classmethod
+    def desde_db(cls, db: Session, version: int) -> "CatalogoAlimentos":
+        """Construir la instantánea con una sola consulta al catálogo"""
+        filas = db.query(Alimento).order_by(Alimento.id).all()
+        
+        return cls(version, tuple(AlimentoSchema.model_validate(f) for f in filas))
+    
+    def vigente(self, version: int) -> bool:
+        """La instantánea corresponde a la versión actual y no ha expirado"""
+        return (
+            self.version == version
+            and time.monotonic() - self.construido_en < settings.CATALOGO_TTL_SEGUNDOS
+        )
+    
+    def filtrar(
+        self,
+        estado: Optional[str] = None,
+        tipo: Optional[str] = None
+    ) -> Tuple[AlimentoSchema, ...]:
+        """Alimentos con el estado y el tipo indicados (ordenados por id)"""
+        if estado and tipo:
+            return tuple(a for a in self.por_tipo.get(tipo, ()) if a.estado == estado)
+        if estado:
+            return self.por_estado.get(estado, ())
+        if tipo:
+            return self.por_tipo.get(tipo, ())
+        return self.todos
+
+
+# ==================== CACHE DEL CATÁLOGO ====================
+
+_version = 0
+_catalogo: Optional[CatalogoAlimentos] = None
+_lock = threading.Lock()
+_lock_version = threading.Lock()
+
+
+def obtener_catalogo(db: Session) -> CatalogoAlimentos:
+    """Obtener la instantánea vigente, reconstruyéndola si cambió la versión"""
+    global _catalogo
+    
+    catalogo = _catalogo
+    if catalogo is not None and catalogo.vigente(_version):
+        return catalogo
+    
+    with _lock:
+        version = _version
+        if _catalogo is None or not _catalogo.vigente(version):
+            # Se etiqueta con la versión leída antes de consultar: si el
+            # catálogo cambia durante la consulta, la siguiente lectura la
+            # reconstruye
+            _catalogo = CatalogoAlimentos.desde_db(db, version)
+        return _catalogo
+
+
+def incrementar_version_catalogo():
+    """Marcar la instantánea como obsoleta (llamar tras cambios en el catálogo)"""
+    global _version
+    
+    # Lock propio: no espera a una reconstrucción en curso
+    with _lock_version:
+        _version += 1
@@ -0,0 +1,345 @@
+"""
+Servicio de Estadísticas - Resúmenes diarios por hijo y estadísticas avanzadas
+"""
+from sqlalchemy import func, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from typing import Dict, Iterable, List, Tuple
+from datetime import date, timedelta
+import json
+from backend.app.models.models import (
+    Lonchera, LoncheraAlimento, Alimento, ResumenDiarioHijo, EstadoLoncheraEnum
+)
+from backend.app.schemas.lonchera import ResumenNutricional
+from backend.app.schemas.estadistica import (
+    EstadisticaSemana, EstadisticasSemanales, PuntoTendencia,
+    TendenciaNutricional, EstadisticaTipo, DistribucionTipos
+)
+from backend.app.services.matriz_nutricional import NUTRIENTES
+
+
+class EstadisticaService:
+    """
+    Servicio para los resúmenes diarios (rollups) y las estadísticas que se
+    calculan a partir de ellos
+    
+    Un resumen diario agrega las loncheras confirmadas de un hijo en un día
+    (también las que ya se archivaron). Las estadísticas solo leen resúmenes:
+    un año escolar son unas 200 filas, sin recorrer lonchera_alimento.
+    """
+    
+    # Pares (hijo_id, fecha) por consulta (límite de variables de SQLite)
+    TAMANO_LOTE_DIAS = 400
+    
+    # Hijos por lote al reconstruir todos los resúmenes
+    TAMANO_LOTE_HIJOS = 500
+    
+    # Rango máximo de días de una consulta de estadísticas
+    MAX_DIAS = 400
+    
+    # Ventana de la media móvil de la tendencia
+    DIAS_MEDIA_MOVIL = 7
+    
+    # Columnas que escribe el upsert de resúmenes diarios
+    COLUMNAS = (
+        "hijo_id", "fecha", "num_loncheras", "total_calorias", "total_proteinas",
+        "total_carbohidratos", "total_grasas", "total_fibra", "num_alimentos",
+        "distribucion_tipos"
+    )
+    
+    @staticmethod
+    def _confirmadas():
+        """Filtro de las loncheras que cuentan en las estadísticas"""
+        return (
+            Lonchera.confirmada_en.isnot(None),
+            Lonchera.estado != EstadoLoncheraEnum.ELIMINADA.value
+        )
+    
+    @staticmethod
+    def _agregar(db: Session, *filtros) -> List[ResumenDiarioHijo]:
+        """
+        Construir (sin persistir) los resúmenes de las loncheras que cumplen
+        los filtros: una consulta de totales y otra de tipos de alimento
+        """
+        resumenes = {}
+        
+        totales = db.query(
+            Lonchera.hijo_id,
+            Lonchera.fecha_asignacion,
+            func.count(Lonchera.id),
+            func.sum(Lonchera.total_calorias),
+            func.sum(Lonchera.total_proteinas),
+            func.sum(Lonchera.total_carbohidratos),
+            func.sum(Lonchera.total_grasas),
+            func.sum(Lonchera.total_fibra),
+            func.sum(Lonchera.num_alimentos)
+        ).filter(
+            *EstadisticaService._confirmadas(), *filtros
+        ).group_by(
+            Lonchera.hijo_id, Lonchera.fecha_asignacion
+        )
+        
+        for hijo_id, fecha, num_loncheras, calorias, proteinas, carbohidratos, grasas, fibra, num_alimentos in totales:
+            resumenes[(hijo_id, fecha)] = ResumenDiarioHijo(
+                hijo_id=hijo_id,
+                fecha=fecha,
+                num_loncheras=num_loncheras,
+                total_calorias=calorias or 0.0,
+                total_proteinas=proteinas or 0.0,
+                total_carbohidratos=carbohidratos or 0.0,
+                total_grasas=grasas or 0.0,
+                total_fibra=fibra or 0.0,
+                num_alimentos=num_alimentos or 0
+            )
+        
+        tipos = db.query(
+            Lonchera.hijo_id,
+            Lonchera.fecha_asignacion,
+            Alimento.tipo,
+            func.sum(LoncheraAlimento.cantidad)
+        ).join(
+            LoncheraAlimento, LoncheraAlimento.lonchera_id == Lonchera.id
+        ).join(
+            Alimento, Alimento.id == LoncheraAlimento.alimento_id
+        ).filter(
+            *EstadisticaService._confirmadas(), *filtros
+        ).group_by(
+            Lonchera.hijo_id, Lonchera.fecha_asignacion, Alimento.tipo
+        )
+        
+        distribuciones: Dict[Tuple[int, date], Dict[str, int]] = {}
+        for hijo_id, fecha, tipo, unidades in tipos:
+            distribuciones.setdefault((hijo_id, fecha), {})[tipo] = int(unidades or 0)
+        
+        for clave, distribucion in distribuciones.items():
+            resumenes[clave].distribucion_tipos = json.dumps(distribucion, ensure_ascii=False)
+        
+        return list(resumenes.values())
+    
+    @staticmethod
+    def refrescar_dias(db: Session, dias: Iterable[Tuple[int, date]]) -> int:
+        """
+        Recalcular los resúmenes de los días (hijo_id, fecha) indicados
+        
+        Se llama cuando cambia una lonchera confirmada. Los resúmenes se
+        escriben con INSERT ... ON CONFLICT (hijo_id, fecha) DO UPDATE, así
+        que dos peticiones que refrescan el mismo día no chocan con la
+        restricción única. Los días sin loncheras confirmadas quedan sin
+        resumen. Retorna el número de resúmenes escritos.
+        """
+        dias = list(set(dias))
+        escritos = 0
+        
+        for inicio in range(0, len(dias), EstadisticaService.TAMANO_LOTE_DIAS):
+            lote = dias[inicio:inicio + EstadisticaService.TAMANO_LOTE_DIAS]
+            
+            resumenes = EstadisticaService._agregar(
+                db, tuple_(Lonchera.hijo_id, Lonchera.fecha_asignacion).in_(lote)
+            )
+            
+            vacios = set(lote) - {(r.hijo_id, r.fecha) for r in resumenes}
+            if vacios:
+                db.query(ResumenDiarioHijo).filter(
+                    tuple_(ResumenDiarioHijo.hijo_id, ResumenDiarioHijo.fecha).in_(vacios)
+                ).delete(synchronize_session=False)
+            
+            if resumenes:
+                db.execute(EstadisticaService._sentencia_upsert(db), [
+                    {columna: getattr(r, columna) for columna in EstadisticaService.COLUMNAS}
+                    for r in resumenes
+                ])
+            escritos += len(resumenes)
+        
+        db.commit()
+        
+        return escritos
+    
+    @staticmethod
+    def _sentencia_upsert(db: Session):
+        """
+        INSERT ... ON CONFLICT (hijo_id, fecha) DO UPDATE de resúmenes
+        diarios, del dialecto en uso (SQLite o PostgreSQL)
+        """
+        dialecto = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+        
+        sentencia = dialecto.insert(ResumenDiarioHijo)
+        
+        return sentencia.on_conflict_do_update(
+            index_elements=[ResumenDiarioHijo.hijo_id, ResumenDiarioHijo.fecha],
+            set_={
+                **{
+                    columna: sentencia.excluded[columna]
+                    for columna in EstadisticaService.COLUMNAS
+                    if columna not in ("hijo_id", "fecha")
+                },
+                "updated_at": func.now()
+            }
+        )
+    
+    @staticmethod
+    def reconstruir(db: Session) -> int:
+        """Reconstruir todos los resúmenes diarios desde las loncheras (mantenimiento)"""
+        db.query(ResumenDiarioHijo).delete(synchronize_session=False)
+        
+        hijo_ids = [fila[0] for fila in db.query(Lonchera.hijo_id).filter(
+            *EstadisticaService._confirmadas()
+        ).distinct().order_by(Lonchera.hijo_id)]
+        
+        escritos = 0
+        for inicio in range(0, len(hijo_ids), EstadisticaService.TAMANO_LOTE_HIJOS):
+            lote = hijo_ids[inicio:inicio + EstadisticaService.TAMANO_LOTE_HIJOS]
+            resumenes = EstadisticaService._agregar(db, Lonchera.hijo_id.in_(lote))
+            db.add_all(resumenes)
+            db.flush()
+            db.expunge_all()
+            escritos += len(resumenes)
+        
+        db.commit()
+        
+        return escritos
+    
+    @staticmethod
+    def _resumenes(
+        db: Session,
+        hijo_id: int,
+        fecha_inicio: date,
+        fecha_fin: date
+    ) -> List[ResumenDiarioHijo]:
+        """Resúmenes diarios de un hijo en un rango (índice hijo_id, fecha)"""
+        return db.query(ResumenDiarioHijo).filter(
+            ResumenDiarioHijo.hijo_id == hijo_id,
+            ResumenDiarioHijo.fecha >= fecha_inicio,
+            ResumenDiarioHijo.fecha <= fecha_fin
+        ).order_by(ResumenDiarioHijo.fecha).all()
+    
+    @staticmethod
+    def semanal(
+        db: Session,
+        hijo_id: int,
+        fecha_inicio: date,
+        fecha_fin: date
+    ) -> EstadisticasSemanales:
+        """Promedio diario por semana (sobre los días con loncheras confirmadas)"""
+        semanas: Dict[date, List[ResumenDiarioHijo]] = {}
+        for resumen in EstadisticaService._resumenes(db, hijo_id, fecha_inicio, fecha_fin):
+            lunes = resumen.fecha - timedelta(days=resumen.fecha.weekday())
+            semanas.setdefault(lunes, []).append(resumen)
+        
+        resultado = []
+        anterior = None
+        for lunes, dias in semanas.items():
+            promedio = ResumenNutricional(
+                **{
+                    f"total_{nutriente}": round(
+                        sum(getattr(d, f"total_{nutriente}") for d in dias) / len(dias), 2
+                    )
+                    for nutriente in NUTRIENTES
+                },
+                num_alimentos=round(sum(d.num_alimentos for d in dias) / len(dias))
+            )
+            
+            resultado.append(EstadisticaSemana(
+                semana_inicio=lunes,
+                dias_con_loncheras=len(dias),
+                num_loncheras=sum(d.num_loncheras for d in dias),
+                promedio_diario=promedio,
+                variacion_calorias=(
+                    round(promedio.total_calorias - anterior.total_calorias, 2)
+                    if anterior else None
+                )
+            ))
+            anterior = promedio
+        
+        return EstadisticasSemanales(
+            hijo_id=hijo_id,
+            fecha_inicio=fecha_inicio,
+            fecha_fin=fecha_fin,
+            semanas=resultado
+        )
+    
+    @staticmethod
+    def tendencia(
+        db: Session,
+        hijo_id: int,
+        fecha_inicio: date,
+        fecha_fin: date
+    ) -> TendenciaNutricional:
+        """
+        Serie diaria de calorías y proteínas con media móvil, y pendiente de
+        la recta de mínimos cuadrados expresada por semana
+        """
+        resumenes = EstadisticaService._resumenes(db, hijo_id, fecha_inicio, fecha_fin)
+        
+        dias = []
+        for i, resumen in enumerate(resumenes):
+            ventana = [
+                r.total_calorias for r in resumenes[max(0, i - EstadisticaService.DIAS_MEDIA_MOVIL + 1):i + 1]
+                if (resumen.fecha - r.fecha).days < EstadisticaService.DIAS_MEDIA_MOVIL
+            ]
+            dias.append(PuntoTendencia(
+                fecha=resumen.fecha,
+                calorias=round(resumen.total_calorias, 2),
+                proteinas=round(resumen.total_proteinas, 2),
+                media_movil_calorias=round(sum(ventana) / len(ventana), 2)
+            ))
+        
+        x = [(r.fecha - fecha_inicio).days for r in resumenes]
+        
+        return TendenciaNutricional(
+            hijo_id=hijo_id,
+            fecha_inicio=fecha_inicio,
+            fecha_fin=fecha_fin,
+            dias=dias,
+            pendiente_calorias_semanal=EstadisticaService._pendiente_semanal(
+                x, [r.total_calorias for r in resumenes]
+            ),
+            pendiente_proteinas_semanal=EstadisticaService._pendiente_semanal(
+                x, [r.total_proteinas for r in resumenes]
+            )
+        )
+    
+    @staticmethod
+    def _pendiente_semanal(x: List[int], y: List[float]):
+        """Pendiente de mínimos cuadrados (por día) multiplicada por 7"""
+        if len(x) < 2:
+            return None
+        
+        media_x = sum(x) / len(x)
+        media_y = sum(y) / len(y)
+        varianza = sum((xi - media_x) ** 2 for xi in x)
+        
+        if varianza == 0:
+            return None
+        
+        covarianza = sum((xi - media_x) * (yi - media_y) for xi, yi in zip(x, y))
+        return round(covarianza / varianza * 7, 2)
+    
+    @staticmethod
+    def tipos(
+        db: Session,
+        hijo_id: int,
+        fecha_inicio: date,
+        fecha_fin: date
+    ) -> DistribucionTipos:
+        """Unidades consumidas por tipo de alimento en el rango"""
+        unidades: Dict[str, int] = {}
+        for resumen in EstadisticaService._resumenes(db, hijo_id, fecha_inicio, fecha_fin):
+            for tipo, cantidad in json.loads(resumen.distribucion_tipos or "{}").items():
+                unidades[tipo] = unidades.get(tipo, 0) + cantidad
+        
+        total = sum(unidades.values())
+        
+        return DistribucionTipos(
+            hijo_id=hijo_id,
+            fecha_inicio=fecha_inicio,
+            fecha_fin=fecha_fin,
+            total_unidades=total,
+            tipos=[
+                EstadisticaTipo(
+                    tipo=tipo,
+                    unidades=cantidad,
+                    porcentaje=round(100.0 * cantidad / total, 2)
+                )
+                for tipo, cantidad in sorted(unidades.items(), key=lambda t: -t[1])
+            ]
+        )
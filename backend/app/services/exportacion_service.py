@@ -0,0 +1,184 @@
+"""
+Servicio de Exportación - Historial de loncheras en CSV o NDJSON
+"""
+from sqlalchemy import select
+from typing import Iterator, Optional
+from datetime import date
+from itertools import groupby
+import csv
+import io
+import json
+from backend.app.database.connection import SessionLocal
+from backend.app.models.models import (
+    Lonchera, LoncheraAlimento, Alimento, Hijo, EstadoLoncheraEnum
+)
+
+
+class ExportacionService:
+    """Servicio para exportar el historial de loncheras en streaming"""
+    
+    # Filas que entrega el cursor del servidor en cada viaje a la base de datos
+    TAMANO_LOTE = 1000
+    
+    # Loncheras por fragmento de la respuesta
+    LONCHERAS_POR_FRAGMENTO = 200
+    
+    FORMATOS = {
+        "csv": "text/csv; charset=utf-8",
+        "ndjson": "application/x-ndjson"
+    }
+    
+    COLUMNAS_CSV = [
+        "lonchera_id", "hijo_id", "hijo", "nombre", "fecha_asignacion", "estado",
+        "total_calorias", "total_proteinas", "total_carbohidratos", "total_grasas",
+        "total_fibra", "num_alimentos",
+        "alimento_id", "alimento", "tipo", "cantidad", "notas"
+    ]
+    
+    @staticmethod
+    def exportar(
+        formato: str,
+        hijo_id: Optional[int] = None,
+        padre_id: Optional[int] = None,
+        fecha_inicio: Optional[date] = None,
+        fecha_fin: Optional[date] = None
+    ) -> Iterator[str]:
+        """
+        Generar el historial de loncheras de un hijo (o de todos los hijos de
+        un usuario) como fragmentos de texto CSV o NDJSON
+        
+        Abre su propia sesión, que vive mientras se consume la respuesta. Las
+        filas se leen como tuplas (sin objetos ORM) con un cursor del servidor,
+        así que la memoria no depende del tamaño del historial.
+        """
+        filas = ExportacionService._filas(hijo_id, padre_id, fecha_inicio, fecha_fin)
+        loncheras = groupby(filas, key=lambda fila: fila.id)
+        
+        if formato == "csv":
+            return ExportacionService._csv(loncheras)
+        return ExportacionService._ndjson(loncheras)
+    
+    @staticmethod
+    def _filas(
+        hijo_id: Optional[int],
+        padre_id: Optional[int],
+        fecha_inicio: Optional[date],
+        fecha_fin: Optional[date]
+    ):
+        """Filas lonchera × alimento ordenadas por fecha, lonchera e item"""
+        consulta = select(
+            Lonchera.id,
+            Lonchera.hijo_id,
+            Hijo.nombre.label("hijo"),
+            Lonchera.nombre,
+            Lonchera.fecha_asignacion,
+            Lonchera.estado,
+            Lonchera.total_calorias,
+            Lonchera.total_proteinas,
+            Lonchera.total_carbohidratos,
+            Lonchera.total_grasas,
+            Lonchera.total_fibra,
+            Lonchera.num_alimentos,
+            LoncheraAlimento.alimento_id,
+            Alimento.nombre.label("alimento"),
+            Alimento.tipo,
+            LoncheraAlimento.cantidad,
+            LoncheraAlimento.notas
+        ).select_from(Lonchera).join(
+            Hijo, Hijo.id == Lonchera.hijo_id
+        ).outerjoin(
+            LoncheraAlimento, LoncheraAlimento.lonchera_id == Lonchera.id
+        ).outerjoin(
+            Alimento, Alimento.id == LoncheraAlimento.alimento_id
+        ).where(
+            Lonchera.estado != EstadoLoncheraEnum.ELIMINADA.value
+        )
+        
+        if hijo_id is not None:
+            consulta = consulta.where(Lonchera.hijo_id == hijo_id)
+        if padre_id is not None:
+            consulta = consulta.where(Hijo.padre_id == padre_id)
+        if fecha_inicio:
+            consulta = consulta.where(Lonchera.fecha_asignacion >= fecha_inicio)
+        if fecha_fin:
+            consulta = consulta.where(Lonchera.fecha_asignacion <= fecha_fin)
+        
+        consulta = consulta.order_by(
+            Lonchera.fecha_asignacion,
+            Lonchera.id,
+            LoncheraAlimento.id
+        ).execution_options(yield_per=ExportacionService.TAMANO_LOTE)
+        
+        db = SessionLocal()
+        try:
+            yield from db.execute(consulta)
+        finally:
+            db.close()
+    
+    @staticmethod
+    def _csv(loncheras) -> Iterator[str]:
+        """Una línea por alimento (las loncheras vacías ocupan una línea)"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(ExportacionService.COLUMNAS_CSV)
+        
+        for numero, (_, filas) in enumerate(loncheras, start=1):
+            for fila in filas:
+                writer.writerow([
+                    fila.id, fila.hijo_id, fila.hijo, fila.nombre,
+                    fila.fecha_asignacion.isoformat(), fila.estado,
+                    fila.total_calorias, fila.total_proteinas, fila.total_carbohidratos,
+                    fila.total_grasas, fila.total_fibra, fila.num_alimentos,
+                    fila.alimento_id, fila.alimento, fila.tipo, fila.cantidad, fila.notas
+                ])
+            
+            if numero % ExportacionService.LONCHERAS_POR_FRAGMENTO == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        
+        yield buffer.getvalue()
+    
+    @staticmethod
+    def _ndjson(loncheras) -> Iterator[str]:
+        """Un objeto JSON por lonchera, con sus alimentos y su resumen"""
+        fragmento = []
+        
+        for _, filas in loncheras:
+            filas = list(filas)
+            primera = filas[0]
+            
+            fragmento.append(json.dumps({
+                "id": primera.id,
+                "hijo_id": primera.hijo_id,
+                "hijo": primera.hijo,
+                "nombre": primera.nombre,
+                "fecha_asignacion": primera.fecha_asignacion.isoformat(),
+                "estado": primera.estado,
+                "resumen_nutricional": {
+                    "total_calorias": primera.total_calorias,
+                    "total_proteinas": primera.total_proteinas,
+                    "total_carbohidratos": primera.total_carbohidratos,
+                    "total_grasas": primera.total_grasas,
+                    "total_fibra": primera.total_fibra,
+                    "num_alimentos": primera.num_alimentos
+                },
+                "alimentos": [
+                    {
+                        "id": fila.alimento_id,
+                        "nombre": fila.alimento,
+                        "tipo": fila.tipo,
+                        "cantidad": fila.cantidad,
+                        "notas": fila.notas
+                    }
+                    for fila in filas
+                    if fila.alimento_id is not None
+                ]
+            }, ensure_ascii=False))
+            
+            if len(fragmento) == ExportacionService.LONCHERAS_POR_FRAGMENTO:
+                yield "\n".join(fragmento) + "\n"
+                fragmento = []
+        
+        if fragmento:
+            yield "\n".join(fragmento) + "\n"
@@ -0,0 +1,165 @@
+"""
+Servicio de Importación - Carga masiva del catálogo de alimentos (CSV o JSON)
+"""
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from pydantic import ValidationError
+import csv
+import io
+import json
+from backend.app.models.models import Alimento, HistorialAlimento
+from backend.app.schemas.alimento import AlimentoCreate, ErrorImportacion, ResultadoImportacion
+from backend.app.services.alimento_service import AlimentoService
+from backend.app.utils.texto import normalizar
+
+
+class ImportacionService:
+    """
+    Servicio para importar catálogos de proveedores
+    
+    Cada fila se valida con AlimentoCreate y se descartan los nombres que ya
+    existen en el catálogo o que se repiten en el archivo (sin distinguir
+    mayúsculas, acentos ni espacios). Los alimentos y sus entradas de
+    historial se escriben con INSERT masivos, una transacción por lote.
+    """
+    
+    FORMATOS = ("csv", "json")
+    
+    # Filas por INSERT masivo y por transacción
+    TAMANO_LOTE = 1000
+    
+    # Filas con errores que se detallan en el resultado (se cuentan todas)
+    MAX_ERRORES_REPORTADOS = 1000
+    
+    @staticmethod
+    def leer(contenido: bytes, formato: str) -> Iterator[Tuple[int, dict]]:
+        """Filas (número, datos) de un archivo CSV con encabezados o de un arreglo JSON"""
+        texto = contenido.decode("utf-8-sig")
+        
+        if formato == "csv":
+            # La fila 1 es el encabezado; las celdas vacías se omiten
+            for numero, fila in enumerate(csv.DictReader(io.StringIO(texto)), start=2):
+                yield numero, {
+                    clave.strip(): valor.strip()
+                    for clave, valor in fila.items()
+                    if clave and valor is not None and valor.strip() != ""
+                }
+            return
+        
+        datos = json.loads(texto)
+        if isinstance(datos, dict):
+            datos = datos.get("alimentos", [])
+        if not isinstance(datos, list):
+            raise TypeError("se esperaba un arreglo de alimentos")
+        
+        for numero, fila in enumerate(datos, start=1):
+            yield numero, fila if isinstance(fila, dict) else {}
+    
+    @staticmethod
+    def clave_nombre(nombre: str) -> str:
+        """Nombre normalizado para detectar duplicados"""
+        return " ".join(normalizar(nombre).split())
+    
+    @staticmethod
+    def importar(
+        db: Session,
+        filas: Iterable[Tuple[int, dict]],
+        usuario_id: Optional[int] = None,
+        origen: str = "archivo"
+    ) -> ResultadoImportacion:
+        """
+        Validar, deduplicar e insertar las filas en lotes
+        
+        Los lotes ya escritos quedan confirmados aunque falle uno posterior.
+        """
+        existentes = {
+            ImportacionService.clave_nombre(nombre)
+            for (nombre,) in db.query(Alimento.nombre)
+        }
+        
+        total = 0
+        creados = 0
+        con_errores = 0
+        errores: List[ErrorImportacion] = []
+        duplicadas: List[int] = []
+        lote: List[dict] = []
+        
+        for numero, datos in filas:
+            total += 1
+            
+            try:
+                alimento = AlimentoCreate.model_validate(datos)
+            except ValidationError as e:
+                con_errores += 1
+                if len(errores) < ImportacionService.MAX_ERRORES_REPORTADOS:
+                    errores.append(ErrorImportacion(
+                        fila=numero,
+                        nombre=str(datos.get("nombre")) if datos.get("nombre") is not None else None,
+                        errores=[
+                            f"{'.'.join(str(p) for p in error['loc']) or 'fila'}: {error['msg']}"
+                            for error in e.errors()
+                        ]
+                    ))
+                continue
+            
+            clave = ImportacionService.clave_nombre(alimento.nombre)
+            if clave in existentes:
+                duplicadas.append(numero)
+                continue
+            
+            existentes.add(clave)
+            lote.append(alimento.model_dump())
+            
+            if len(lote) == ImportacionService.TAMANO_LOTE:
+                creados += ImportacionService._insertar_lote(db, lote, usuario_id, origen)
+                lote = []
+        
+        if lote:
+            creados += ImportacionService._insertar_lote(db, lote, usuario_id, origen)
+        
+        if creados:
+            AlimentoService.catalogo_modificado()
+        
+        return ResultadoImportacion(
+            total_filas=total,
+            creados=creados,
+            duplicados=len(duplicadas),
+            con_errores=con_errores,
+            filas_duplicadas=duplicadas,
+            errores=errores
+        )
+    
+    @staticmethod
+    def _insertar_lote(
+        db: Session,
+        lote: List[Dict],
+        usuario_id: Optional[int],
+        origen: str
+    ) -> int:
+        """Insertar un lote de alimentos y su historial en una transacción"""
+        ids = db.execute(
+            insert(Alimento).returning(Alimento.id, sort_by_parameter_order=True),
+            lote
+        ).scalars().all()
+        
+        historial = AlimentoService.nuevo_historial(
+            accion="Creado",
+            usuario_id=usuario_id,
+            motivo=f"Importación de catálogo ({origen})"
+        )
+        db.execute(
+            insert(HistorialAlimento),
+            [
+                {
+                    "alimento_id": alimento_id,
+                    "accion": historial.accion,
+                    "usuario_accion": historial.usuario_accion,
+                    "motivo": historial.motivo
+                }
+                for alimento_id in ids
+            ]
+        )
+        db.commit()
+        
+        return len(ids)
@@ -1,28 +1,134 @@
 """
 Servicio de Lonchera - Lógica de negocio
 """
-from sqlalchemy.orm import Session
-from typing import Optional, List
-from datetime import date
+from sqlalchemy.orm import Session, selectinload, joinedload, aliased
+from sqlalchemy import func, select, tuple_, insert, literal, exists, Date, Boolean
+from sqlalchemy.dialects import postgresql, sqlite
+from typing import Optional, List, Dict, Iterable, Tuple
+from datetime import date, timedelta
+import time
 from backend.app.models.models import (
-    Lonchera, LoncheraAlimento, Alimento, Hijo, 
-    EstadoLoncheraEnum, Usuario, TipoMembresia
+    Lonchera, LoncheraAlimento, Alimento, Hijo, Usuario, TipoMembresia,
+    Restriccion, EstadoLoncheraEnum
 )
+from backend.app.core.config import settings
+from backend.app.services.restriccion_service import RestriccionService
+from backend.app.services.estadistica_service import EstadisticaService
+from backend.app.services.catalogo_alimentos import obtener_catalogo
+from backend.app.utils.cache import CacheLRU
 from backend.app.schemas.lonchera import (
     LoncheraCreate, LoncheraUpdate, 
-    LoncheraAlimentoCreate, ResumenNutricional
+    LoncheraAlimentoCreate, ResumenNutricional,
+    ResultadoLoncheraLote, AsignacionMasivaRequest, AsignacionMasivaResultado,
+    OperacionAlimento
 )
 from fastapi import HTTPException, status
 
+# Detalle serializado (LoncheraWithAlimentos) por id de lonchera, con su versión
+cache_detalle = CacheLRU(
+    capacidad=settings.CACHE_DETALLE_TAMANO,
+    ttl_segundos=settings.CACHE_DETALLE_TTL_SEGUNDOS
+)
+
 
 class LoncheraService:
     """Servicio para gestión de loncheras"""
     
+    # Máximo de ids por cláusula IN (límite de variables de SQLite)
+    TAMANO_LOTE_IDS = 500
+    
+    # Estados que pasan a Archivada cuando la fecha de la lonchera ya pasó
+    ESTADOS_ARCHIVABLES = (
+        EstadoLoncheraEnum.BORRADOR.value,
+        EstadoLoncheraEnum.ASIGNADA.value,
+        EstadoLoncheraEnum.PERSONALIZADA.value,
+        EstadoLoncheraEnum.CONFIRMADA.value
+    )
+    
+    # Rango máximo de días de una asignación masiva
+    MAX_DIAS_ASIGNACION = 31
+    
     @staticmethod
     def get_by_id(db: Session, lonchera_id: int) -> Optional[Lonchera]:
         """Obtener lonchera por ID"""
         return db.query(Lonchera).filter(Lonchera.id == lonchera_id).first()
     
+    @staticmethod
+    def get_version(db: Session, lonchera_id: int):
+        """
+        Obtener (hijo_id, version, padre_id) de una lonchera sin cargar sus
+        alimentos: basta para verificar permisos y resolver un ETag
+        """
+        return db.query(Lonchera.hijo_id, Lonchera.version, Hijo.padre_id).join(
+            Hijo, Hijo.id == Lonchera.hijo_id
+        ).filter(
+            Lonchera.id == lonchera_id
+        ).first()
+    
+    @staticmethod
+    def get_detalle(db: Session, lonchera_id: int) -> Optional[Lonchera]:
+        """
+        Obtener una lonchera con sus alimentos ya cargados
+        
+        Dos consultas: la lonchera, y sus items unidos a los alimentos.
+        """
+        return db.query(Lonchera).options(
+            selectinload(Lonchera.alimentos).joinedload(LoncheraAlimento.alimento)
+        ).filter(Lonchera.id == lonchera_id).first()
+    
+    @staticmethod
+    def get_detalle_por_fecha(
+        db: Session, 
+        hijo_id: int, 
+        fecha: date,
+        usuario_id: int
+    ) -> Optional[Lonchera]:
+        """
+        Obtener la lonchera vigente de un hijo en una fecha, con sus alimentos
+        
+        El hijo viene en la misma consulta que la lonchera para verificar
+        permisos; solo se consulta aparte si ese día no hay lonchera.
+        """
+        lonchera = db.query(Lonchera).options(
+            joinedload(Lonchera.hijo),
+            selectinload(Lonchera.alimentos).joinedload(LoncheraAlimento.alimento)
+        ).filter(
+            Lonchera.hijo_id == hijo_id,
+            Lonchera.fecha_asignacion == fecha,
+            Lonchera.estado != EstadoLoncheraEnum.ELIMINADA.value
+        ).order_by(Lonchera.id.desc()).first()
+        
+        if lonchera:
+            padre_id = lonchera.hijo.padre_id
+        else:
+            padre_id = db.query(Hijo.padre_id).filter(Hijo.id == hijo_id).scalar()
+        
+        if padre_id != usuario_id:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="No tiene permisos para ver loncheras de este hijo"
+            )
+        
+        return lonchera
+    
+    @staticmethod
+    def incrementar_versiones(db: Session, lonchera_ids: Iterable[int]) -> int:
+        """Incrementar la versión de varias loncheras (cambió algo que muestran)"""
+        ids = list(lonchera_ids)
+        filas = 0
+        
+        for inicio in range(0, len(ids), LoncheraService.TAMANO_LOTE_IDS):
+            lote = ids[inicio:inicio + LoncheraService.TAMANO_LOTE_IDS]
+            filas += db.query(Lonchera).filter(Lonchera.id.in_(lote)).update(
+                {Lonchera.version: Lonchera.version + 1},
+                synchronize_session=False
+            )
+        
+        db.commit()
+        cache_detalle.invalidar_muchas(ids)
+        
+        return filas
+    
     @staticmethod
     def get_all(
         db: Session, 
@@ -42,6 +148,44 @@ class LoncheraService:
         
         return query.offset(skip).limit(limit).all()
     
+    @staticmethod
+    def get_por_padre(
+        db: Session, 
+        padre_id: int, 
+        limit: int = 100,
+        cursor: Optional[Tuple[date, int]] = None,
+        hijo_id: Optional[int] = None,
+        estado: Optional[str] = None
+    ) -> List[Lonchera]:
+        """
+        Obtener loncheras de los hijos de un usuario, de la más reciente a la
+        más antigua, paginadas por cursor sobre (fecha_asignacion, id)
+        
+        `cursor` es la posición de la última lonchera de la página anterior;
+        el costo de cada página no depende de cuán profunda sea.
+        """
+        query = db.query(Lonchera).join(
+            Hijo, Hijo.id == Lonchera.hijo_id
+        ).filter(
+            Hijo.padre_id == padre_id
+        )
+        
+        if hijo_id:
+            query = query.filter(Lonchera.hijo_id == hijo_id)
+        
+        if estado:
+            query = query.filter(Lonchera.estado == estado)
+        
+        if cursor:
+            query = query.filter(
+                tuple_(Lonchera.fecha_asignacion, Lonchera.id) < tuple_(*cursor)
+            )
+        
+        return query.order_by(
+            Lonchera.fecha_asignacion.desc(), 
+            Lonchera.id.desc()
+        ).limit(limit).all()
+    
     @staticmethod
     def get_por_fecha(
         db: Session, 
@@ -54,6 +198,35 @@ class LoncheraService:
             Lonchera.fecha_asignacion == fecha
         ).first()
     
+    @staticmethod
+    def get_calendario(
+        db: Session, 
+        hijo_ids: List[int], 
+        fecha_inicio: date, 
+        fecha_fin: date
+    ) -> List[Lonchera]:
+        """
+        Obtener las loncheras de varios hijos en un rango de fechas
+        
+        Usa el índice (hijo_id, fecha_asignacion) y carga alimentos por
+        adelantado: dos consultas en total, sin importar el tamaño del rango.
+        """
+        if not hijo_ids:
+            return []
+        
+        return db.query(Lonchera).options(
+            selectinload(Lonchera.alimentos).joinedload(LoncheraAlimento.alimento)
+        ).filter(
+            Lonchera.hijo_id.in_(hijo_ids),
+            Lonchera.fecha_asignacion >= fecha_inicio,
+            Lonchera.fecha_asignacion <= fecha_fin,
+            Lonchera.estado != EstadoLoncheraEnum.ELIMINADA.value
+        ).order_by(
+            Lonchera.fecha_asignacion, 
+            Lonchera.hijo_id, 
+            Lonchera.id
+        ).all()
+    
     @staticmethod
     def create(
         db: Session, 
@@ -76,34 +249,167 @@ class LoncheraService:
                 detail="No tiene permisos para crear lonchera para este hijo"
             )
         
-        # Verificar permisos según membresía
-        usuario = db.query(Usuario).filter(Usuario.id == usuario_id).first()
-        membresia = db.query(TipoMembresia).filter(
-            TipoMembresia.id == usuario.tipo_membresia_id
-        ).first()
+        # Verificar que todos los alimentos existen (una sola consulta)
+        alimentos = LoncheraService._cargar_alimentos(
+            db, [a.alimento_id for a in lonchera.alimentos]
+        )
         
-        # Crear lonchera
-        db_lonchera = Lonchera(
-            nombre=lonchera.nombre,
-            descripcion=lonchera.descripcion,
-            fecha_asignacion=lonchera.fecha_asignacion,
-            hijo_id=lonchera.hijo_id,
-            estado=EstadoLoncheraEnum.BORRADOR.value
+        if len(alimentos) != len({a.alimento_id for a in lonchera.alimentos}):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Alimento no encontrado"
+            )
+        
+        # Verificar restricciones alimentarias del hijo
+        RestriccionService.validar(
+            db, lonchera.hijo_id, alimentos.keys(), lonchera.fecha_asignacion
         )
         
+        # Crear lonchera con sus alimentos y totales en una sola transacción
+        db_lonchera = LoncheraService._construir_lonchera(lonchera, alimentos)
+        
         db.add(db_lonchera)
         db.commit()
         db.refresh(db_lonchera)
         
-        # Agregar alimentos si se proporcionaron
-        if lonchera.alimentos:
-            for alimento_data in lonchera.alimentos:
-                LoncheraService.agregar_alimento(
-                    db, 
-                    db_lonchera.id, 
-                    alimento_data
+        return db_lonchera
+    
+    @staticmethod
+    def crear_lote(
+        db: Session, 
+        loncheras: List[LoncheraCreate], 
+        usuario_id: int
+    ) -> List[ResultadoLoncheraLote]:
+        """
+        Crear muchas loncheras (varios hijos × varias fechas) en una transacción
+        
+        Hijos y alimentos se validan con una consulta cada uno; las entradas
+        inválidas se reportan sin impedir la creación de las demás.
+        """
+        hijo_ids = {l.hijo_id for l in loncheras}
+        padres = dict(
+            db.query(Hijo.id, Hijo.padre_id).filter(Hijo.id.in_(hijo_ids)).all()
+        ) if hijo_ids else {}
+        
+        alimentos = LoncheraService._cargar_alimentos(
+            db, [a.alimento_id for l in loncheras for a in l.alimentos]
+        )
+        
+        # Reglas de restricciones de todos los hijos (compiladas en lote)
+        reglas = RestriccionService.obtener_reglas(
+            db, [h for h, padre_id in padres.items() if padre_id == usuario_id]
+        )
+        
+        resultados = []
+        creadas = []
+        
+        for indice, datos in enumerate(loncheras):
+            resultado = ResultadoLoncheraLote(
+                indice=indice,
+                hijo_id=datos.hijo_id,
+                fecha_asignacion=datos.fecha_asignacion
+            )
+            resultados.append(resultado)
+            
+            faltantes = sorted({a.alimento_id for a in datos.alimentos} - alimentos.keys())
+            
+            if datos.hijo_id not in padres:
+                resultado.error = "Hijo no encontrado"
+            elif padres[datos.hijo_id] != usuario_id:
+                resultado.error = "No tiene permisos para crear lonchera para este hijo"
+            elif faltantes:
+                resultado.error = f"Alimentos no encontrados: {faltantes}"
+            else:
+                conflictos = reglas[datos.hijo_id].conflictos(
+                    {a.alimento_id for a in datos.alimentos}, datos.fecha_asignacion
+                )
+                if conflictos:
+                    resultado.error = RestriccionService.describir_conflictos(
+                        conflictos, reglas[datos.hijo_id]
+                    )
+                else:
+                    creadas.append((resultado, LoncheraService._construir_lonchera(datos, alimentos)))
+        
+        if creadas:
+            # El flush agrupa los INSERT de loncheras y de sus alimentos
+            db.add_all([db_lonchera for _, db_lonchera in creadas])
+            db.flush()
+            
+            for resultado, db_lonchera in creadas:
+                resultado.creada = True
+                resultado.lonchera_id = db_lonchera.id
+            
+            db.commit()
+        
+        return resultados
+    
+    @staticmethod
+    def _cargar_alimentos(db: Session, alimento_ids: Iterable[int]) -> Dict[int, Alimento]:
+        """
+        Cargar alimentos por id en lotes, indexados por id
+        
+        Se leen de la base de datos y no de la instantánea del catálogo: sus
+        valores nutricionales se copian a los totales materializados, y la
+        instantánea de otro worker puede estar desactualizada.
+        """
+        ids = list(set(alimento_ids))
+        alimentos = {}
+        
+        for inicio in range(0, len(ids), LoncheraService.TAMANO_LOTE_IDS):
+            lote = ids[inicio:inicio + LoncheraService.TAMANO_LOTE_IDS]
+            for alimento in db.query(Alimento).filter(Alimento.id.in_(lote)).all():
+                alimentos[alimento.id] = alimento
+        
+        return alimentos
+    
+    @staticmethod
+    def _construir_lonchera(
+        datos: LoncheraCreate, 
+        alimentos: Dict[int, Alimento]
+    ) -> Lonchera:
+        """
+        Construir (sin persistir) una lonchera con sus alimentos y totales
+        
+        Un mismo alimento repetido en `datos.alimentos` se acumula en una sola
+        fila, igual que en agregar_alimento.
+        """
+        db_lonchera = Lonchera(
+            nombre=datos.nombre,
+            descripcion=datos.descripcion,
+            fecha_asignacion=datos.fecha_asignacion,
+            hijo_id=datos.hijo_id,
+            estado=EstadoLoncheraEnum.BORRADOR.value,
+            total_calorias=0.0,
+            total_proteinas=0.0,
+            total_carbohidratos=0.0,
+            total_grasas=0.0,
+            total_fibra=0.0,
+            num_alimentos=0
+        )
+        
+        items = {}
+        for alimento_data in datos.alimentos:
+            alimento = alimentos[alimento_data.alimento_id]
+            cantidad = alimento_data.cantidad
+            
+            db_lonchera.total_calorias += alimento.calorias * cantidad
+            db_lonchera.total_proteinas += alimento.proteinas * cantidad
+            db_lonchera.total_carbohidratos += alimento.carbohidratos * cantidad
+            db_lonchera.total_grasas += (alimento.grasas or 0.0) * cantidad
+            db_lonchera.total_fibra += (alimento.fibra or 0.0) * cantidad
+            db_lonchera.num_alimentos += cantidad
+            
+            if alimento_data.alimento_id in items:
+                items[alimento_data.alimento_id].cantidad += cantidad
+            else:
+                items[alimento_data.alimento_id] = LoncheraAlimento(
+                    alimento_id=alimento_data.alimento_id,
+                    cantidad=cantidad,
+                    notas=alimento_data.notas
                 )
         
+        db_lonchera.alimentos = list(items.values())
+        
         return db_lonchera
     
     @staticmethod
@@ -130,12 +436,29 @@ class LoncheraService:
                 detail="No tiene permisos para modificar esta lonchera"
             )
         
+        # Día en que contaba para las estadísticas (puede cambiar de fecha)
+        dias_previos = []
+        if db_lonchera.confirmada_en is not None:
+            dias_previos.append((db_lonchera.hijo_id, db_lonchera.fecha_asignacion))
+        
         # Actualizar campos
         update_data = lonchera_update.model_dump(exclude_unset=True)
         for field, value in update_data.items():
             setattr(db_lonchera, field, value)
+        db_lonchera.version = Lonchera.version + 1
+        
+        estado = update_data.get("estado")
+        if estado == EstadoLoncheraEnum.CONFIRMADA.value:
+            if db_lonchera.confirmada_en is None:
+                db_lonchera.confirmada_en = func.now()
+        elif estado is not None and estado != EstadoLoncheraEnum.ARCHIVADA.value:
+            # Deja de estar confirmada: ya no cuenta en las estadísticas
+            # (al archivar se conserva)
+            db_lonchera.confirmada_en = None
         
         db.commit()
+        cache_detalle.invalidar(lonchera_id)
+        LoncheraService._refrescar_estadisticas(db, [lonchera_id], dias_previos)
         db.refresh(db_lonchera)
         
         return db_lonchera
@@ -161,7 +484,10 @@ class LoncheraService:
         
         # Cambiar estado a eliminada (soft delete)
         db_lonchera.estado = EstadoLoncheraEnum.ELIMINADA.value
+        db_lonchera.version = Lonchera.version + 1
         db.commit()
+        cache_detalle.invalidar(lonchera_id)
+        LoncheraService._refrescar_estadisticas(db, [lonchera_id])
         
         return True
     
@@ -172,10 +498,8 @@ class LoncheraService:
         alimento_data: LoncheraAlimentoCreate
     ) -> LoncheraAlimento:
         """Agregar alimento a lonchera"""
-        # Verificar que el alimento existe
-        alimento = db.query(Alimento).filter(
-            Alimento.id == alimento_data.alimento_id
-        ).first()
+        # Verificar que el alimento existe (en la instantánea del catálogo)
+        alimento = obtener_catalogo(db).por_id.get(alimento_data.alimento_id)
         
         if not alimento:
             raise HTTPException(
@@ -183,33 +507,158 @@ class LoncheraService:
                 detail="Alimento no encontrado"
             )
         
-        # Verificar si ya existe en la lonchera
-        existe = db.query(LoncheraAlimento).filter(
-            LoncheraAlimento.lonchera_id == lonchera_id,
-            LoncheraAlimento.alimento_id == alimento_data.alimento_id
+        lonchera = db.query(Lonchera.hijo_id, Lonchera.fecha_asignacion).filter(
+            Lonchera.id == lonchera_id
         ).first()
         
-        if existe:
-            # Actualizar cantidad
-            existe.cantidad += alimento_data.cantidad
-            db.commit()
-            db.refresh(existe)
-            return existe
+        if not lonchera:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Lonchera no encontrada"
+            )
         
-        # Crear nuevo
-        db_lonchera_alimento = LoncheraAlimento(
-            lonchera_id=lonchera_id,
-            alimento_id=alimento_data.alimento_id,
-            cantidad=alimento_data.cantidad,
-            notas=alimento_data.notas
+        # Verificar restricciones alimentarias del hijo
+        RestriccionService.validar(
+            db, lonchera.hijo_id, [alimento.id], lonchera.fecha_asignacion
+        )
+        
+        # Sumar el aporte a los totales
+        LoncheraService._aplicar_delta_totales(
+            db, lonchera_id, alimento.id, alimento_data.cantidad
         )
         
-        db.add(db_lonchera_alimento)
+        # Crear el item o sumar la cantidad en una sola sentencia (sin leer antes)
+        sentencia = LoncheraService._sentencia_upsert(
+            db,
+            lonchera_id,
+            alimento_data.alimento_id,
+            alimento_data.cantidad,
+            alimento_data.notas,
+            acumular=True
+        )
+        db_lonchera_alimento = db.scalars(
+            sentencia.returning(LoncheraAlimento),
+            execution_options={"populate_existing": True}
+        ).one()
+        
         db.commit()
+        cache_detalle.invalidar(lonchera_id)
+        LoncheraService._refrescar_estadisticas(db, [lonchera_id])
         db.refresh(db_lonchera_alimento)
         
         return db_lonchera_alimento
     
+    @staticmethod
+    def _sentencia_upsert(
+        db: Session, 
+        lonchera_id: int, 
+        alimento_id: int, 
+        cantidad: int, 
+        notas: Optional[str], 
+        acumular: bool
+    ):
+        """
+        INSERT ... ON CONFLICT (lonchera_id, alimento_id) DO UPDATE del
+        dialecto en uso (SQLite o PostgreSQL)
+        
+        Con `acumular` la cantidad se suma a la existente; si no, la reemplaza.
+        Las notas solo se cambian si se envían.
+        """
+        dialecto = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+        
+        sentencia = dialecto.insert(LoncheraAlimento).values(
+            lonchera_id=lonchera_id,
+            alimento_id=alimento_id,
+            cantidad=cantidad,
+            notas=notas
+        )
+        
+        return sentencia.on_conflict_do_update(
+            index_elements=[LoncheraAlimento.lonchera_id, LoncheraAlimento.alimento_id],
+            set_={
+                "cantidad": (
+                    LoncheraAlimento.cantidad + sentencia.excluded.cantidad
+                    if acumular else sentencia.excluded.cantidad
+                ),
+                "notas": func.coalesce(sentencia.excluded.notas, LoncheraAlimento.notas)
+            }
+        )
+    
+    @staticmethod
+    def aplicar_operaciones(
+        db: Session, 
+        lonchera_id: int, 
+        operaciones: List[OperacionAlimento], 
+        usuario_id: int
+    ) -> Lonchera:
+        """
+        Aplicar varias operaciones (agregar, eliminar, establecer cantidad)
+        sobre los alimentos de una lonchera en una sola transacción
+        
+        Las validaciones se hacen en lote antes de escribir; cada operación es
+        un upsert o un DELETE, y al final un único UPDATE recalcula totales y
+        versión. Si una operación falla no se aplica ninguna.
+        """
+        lonchera = db.query(Lonchera.hijo_id, Lonchera.fecha_asignacion, Hijo.padre_id).join(
+            Hijo, Hijo.id == Lonchera.hijo_id
+        ).filter(
+            Lonchera.id == lonchera_id
+        ).first()
+        
+        if not lonchera:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Lonchera no encontrada"
+            )
+        
+        if lonchera.padre_id != usuario_id:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="No tiene permisos para modificar esta lonchera"
+            )
+        
+        agregados = {op.alimento_id for op in operaciones if op.accion != "eliminar"}
+        faltantes = sorted(agregados - LoncheraService._cargar_alimentos(db, agregados).keys())
+        
+        if faltantes:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Alimentos no encontrados: {faltantes}"
+            )
+        
+        # Verificar restricciones alimentarias del hijo
+        RestriccionService.validar(
+            db, lonchera.hijo_id, agregados, lonchera.fecha_asignacion
+        )
+        
+        for operacion in operaciones:
+            if operacion.accion == "eliminar":
+                eliminados = db.query(LoncheraAlimento).filter(
+                    LoncheraAlimento.lonchera_id == lonchera_id,
+                    LoncheraAlimento.alimento_id == operacion.alimento_id
+                ).delete(synchronize_session=False)
+                
+                if not eliminados:
+                    db.rollback()
+                    raise HTTPException(
+                        status_code=status.HTTP_404_NOT_FOUND,
+                        detail=f"Alimento {operacion.alimento_id} no encontrado en la lonchera"
+                    )
+            else:
+                db.execute(LoncheraService._sentencia_upsert(
+                    db,
+                    lonchera_id,
+                    operacion.alimento_id,
+                    operacion.cantidad,
+                    operacion.notas,
+                    acumular=operacion.accion == "agregar"
+                ))
+        
+        # Totales, versión, cache y estadísticas; confirma la transacción
+        LoncheraService.recalcular_totales(db, [lonchera_id])
+        
+        return LoncheraService.get_detalle(db, lonchera_id)
+    
     @staticmethod
     def eliminar_alimento(
         db: Session, 
@@ -228,37 +677,186 @@ class LoncheraService:
                 detail="Alimento no encontrado en la lonchera"
             )
         
+        # Restar el aporte del alimento a los totales
+        LoncheraService._aplicar_delta_totales(
+            db, 
+            lonchera_id, 
+            alimento_id, 
+            -db_lonchera_alimento.cantidad
+        )
+        
         db.delete(db_lonchera_alimento)
         db.commit()
+        cache_detalle.invalidar(lonchera_id)
+        LoncheraService._refrescar_estadisticas(db, [lonchera_id])
         
         return True
     
+    @staticmethod
+    def _aplicar_delta_totales(
+        db: Session, 
+        lonchera_id: int, 
+        alimento_id: int, 
+        cantidad: int
+    ) -> bool:
+        """
+        Sumar (o restar, con cantidad negativa) el aporte de un alimento a los
+        totales materializados de la lonchera, con un UPDATE atómico que
+        también incrementa su versión.
+        
+        Los valores nutricionales se leen en la misma sentencia (subconsultas
+        sobre alimentos), no de la instantánea del catálogo en memoria.
+        Retorna False si la lonchera no existe. No hace commit.
+        """
+        def aporte(nutriente):
+            return select(
+                func.coalesce(nutriente, 0.0) * cantidad
+            ).where(
+                Alimento.id == alimento_id
+            ).scalar_subquery()
+        
+        filas = db.query(Lonchera).filter(Lonchera.id == lonchera_id).update(
+            {
+                Lonchera.total_calorias: Lonchera.total_calorias + aporte(Alimento.calorias),
+                Lonchera.total_proteinas: Lonchera.total_proteinas + aporte(Alimento.proteinas),
+                Lonchera.total_carbohidratos: Lonchera.total_carbohidratos + aporte(Alimento.carbohidratos),
+                Lonchera.total_grasas: Lonchera.total_grasas + aporte(Alimento.grasas),
+                Lonchera.total_fibra: Lonchera.total_fibra + aporte(Alimento.fibra),
+                Lonchera.num_alimentos: Lonchera.num_alimentos + cantidad,
+                Lonchera.version: Lonchera.version + 1
+            },
+            synchronize_session=False
+        )
+        return filas > 0
+    
+    @staticmethod
+    def recalcular_totales(
+        db: Session, 
+        lonchera_ids: Optional[Iterable[int]] = None
+    ) -> int:
+        """
+        Recalcular los totales materializados desde lonchera_alimento
+        
+        Un único UPDATE con subconsultas correlacionadas (SUM de nutriente ×
+        cantidad) repara todas las loncheras, o solo las indicadas.
+        Retorna el número de loncheras actualizadas.
+        """
+        def subtotal(expresion):
+            return select(
+                func.coalesce(func.sum(expresion), 0)
+            ).select_from(LoncheraAlimento).join(
+                Alimento, Alimento.id == LoncheraAlimento.alimento_id
+            ).where(
+                LoncheraAlimento.lonchera_id == Lonchera.id
+            ).scalar_subquery()
+        
+        valores = {
+            Lonchera.total_calorias: subtotal(Alimento.calorias * LoncheraAlimento.cantidad),
+            Lonchera.total_proteinas: subtotal(Alimento.proteinas * LoncheraAlimento.cantidad),
+            Lonchera.total_carbohidratos: subtotal(Alimento.carbohidratos * LoncheraAlimento.cantidad),
+            Lonchera.total_grasas: subtotal(func.coalesce(Alimento.grasas, 0.0) * LoncheraAlimento.cantidad),
+            Lonchera.total_fibra: subtotal(func.coalesce(Alimento.fibra, 0.0) * LoncheraAlimento.cantidad),
+            Lonchera.num_alimentos: subtotal(LoncheraAlimento.cantidad),
+            Lonchera.version: Lonchera.version + 1
+        }
+        
+        if lonchera_ids is None:
+            filas = db.query(Lonchera).update(valores, synchronize_session=False)
+            cache_detalle.limpiar()
+        else:
+            ids = list(lonchera_ids)
+            filas = 0
+            for inicio in range(0, len(ids), LoncheraService.TAMANO_LOTE_IDS):
+                lote = ids[inicio:inicio + LoncheraService.TAMANO_LOTE_IDS]
+                filas += db.query(Lonchera).filter(
+                    Lonchera.id.in_(lote)
+                ).update(valores, synchronize_session=False)
+            cache_detalle.invalidar_muchas(ids)
+        
+        db.commit()
+        
+        if lonchera_ids is not None:
+            LoncheraService._refrescar_estadisticas(db, ids)
+        
+        return filas
+    
+    @staticmethod
+    def _refrescar_estadisticas(
+        db: Session, 
+        lonchera_ids: Iterable[int], 
+        dias_previos: Iterable[Tuple[int, date]] = ()
+    ):
+        """
+        Recalcular los resúmenes diarios de los días de las loncheras
+        confirmadas indicadas (más los días en que estaban antes de un cambio)
+        """
+        dias = set(dias_previos)
+        ids = list(lonchera_ids)
+        
+        for inicio in range(0, len(ids), LoncheraService.TAMANO_LOTE_IDS):
+            lote = ids[inicio:inicio + LoncheraService.TAMANO_LOTE_IDS]
+            dias.update(
+                (fila.hijo_id, fila.fecha_asignacion)
+                for fila in db.query(Lonchera.hijo_id, Lonchera.fecha_asignacion).filter(
+                    Lonchera.id.in_(lote),
+                    Lonchera.confirmada_en.isnot(None)
+                )
+            )
+        
+        if dias:
+            EstadisticaService.refrescar_dias(db, dias)
+    
+    @staticmethod
+    def resumen_de(lonchera: Lonchera) -> ResumenNutricional:
+        """Construir el resumen nutricional desde los totales materializados"""
+        return ResumenNutricional(
+            total_calorias=lonchera.total_calorias or 0.0,
+            total_proteinas=lonchera.total_proteinas or 0.0,
+            total_carbohidratos=lonchera.total_carbohidratos or 0.0,
+            total_grasas=lonchera.total_grasas or 0.0,
+            total_fibra=lonchera.total_fibra or 0.0,
+            num_alimentos=lonchera.num_alimentos or 0
+        )
+    
     @staticmethod
     def calcular_resumen_nutricional(
         db: Session, 
         lonchera_id: int
     ) -> ResumenNutricional:
         """Calcular resumen nutricional de una lonchera"""
-        lonchera_alimentos = db.query(LoncheraAlimento).filter(
-            LoncheraAlimento.lonchera_id == lonchera_id
-        ).all()
+        return LoncheraService.calcular_resumenes_nutricionales(db, [lonchera_id])[lonchera_id]
+    
+    @staticmethod
+    def calcular_resumenes_nutricionales(
+        db: Session, 
+        lonchera_ids: Iterable[int]
+    ) -> Dict[int, ResumenNutricional]:
+        """
+        Obtener el resumen nutricional de varias loncheras a la vez
         
-        resumen = ResumenNutricional()
+        Se leen los totales materializados en la tabla loncheras: una fila por
+        lonchera, sin recorrer lonchera_alimento.
+        """
+        resumenes = {lonchera_id: ResumenNutricional() for lonchera_id in lonchera_ids}
+        ids = list(resumenes.keys())
         
-        for la in lonchera_alimentos:
-            alimento = db.query(Alimento).filter(
-                Alimento.id == la.alimento_id
-            ).first()
+        for inicio in range(0, len(ids), LoncheraService.TAMANO_LOTE_IDS):
+            lote = ids[inicio:inicio + LoncheraService.TAMANO_LOTE_IDS]
+            
+            filas = db.query(
+                Lonchera.id,
+                Lonchera.total_calorias,
+                Lonchera.total_proteinas,
+                Lonchera.total_carbohidratos,
+                Lonchera.total_grasas,
+                Lonchera.total_fibra,
+                Lonchera.num_alimentos
+            ).filter(Lonchera.id.in_(lote)).all()
             
-            if alimento:
-                resumen.total_calorias += alimento.calorias * la.cantidad
-                resumen.total_proteinas += alimento.proteinas * la.cantidad
-                resumen.total_carbohidratos += alimento.carbohidratos * la.cantidad
-                resumen.total_grasas += alimento.grasas * la.cantidad
-                resumen.total_fibra += alimento.fibra * la.cantidad
-                resumen.num_alimentos += la.cantidad
+            for fila in filas:
+                resumenes[fila.id] = LoncheraService.resumen_de(fila)
         
-        return resumen
+        return resumenes
     
     @staticmethod
     def confirmar(db: Session, lonchera_id: int, usuario_id: int) -> Lonchera:
@@ -279,8 +877,21 @@ class LoncheraService:
                 detail="No tiene permisos para confirmar esta lonchera"
             )
         
+        # Verificar restricciones alimentarias antes de confirmar
+        alimento_ids = [fila.alimento_id for fila in db.query(LoncheraAlimento.alimento_id).filter(
+            LoncheraAlimento.lonchera_id == lonchera_id
+        )]
+        RestriccionService.validar(
+            db, db_lonchera.hijo_id, alimento_ids, db_lonchera.fecha_asignacion
+        )
+        
         db_lonchera.estado = EstadoLoncheraEnum.CONFIRMADA.value
+        db_lonchera.version = Lonchera.version + 1
+        if db_lonchera.confirmada_en is None:
+            db_lonchera.confirmada_en = func.now()
         db.commit()
+        cache_detalle.invalidar(lonchera_id)
+        LoncheraService._refrescar_estadisticas(db, [lonchera_id])
         db.refresh(db_lonchera)
         
         return db_lonchera
@@ -297,7 +908,230 @@ class LoncheraService:
             )
         
         db_lonchera.estado = EstadoLoncheraEnum.ARCHIVADA.value
+        db_lonchera.version = Lonchera.version + 1
         db.commit()
+        cache_detalle.invalidar(lonchera_id)
         db.refresh(db_lonchera)
         
         return db_lonchera
+    
+    @staticmethod
+    def archivar_vencidas(
+        db: Session, 
+        hoy: Optional[date] = None, 
+        tamano_lote: int = 500
+    ) -> dict:
+        """
+        Archivar todas las loncheras con fecha anterior a hoy
+        
+        Trabaja por lotes de ids con un UPDATE y un commit por lote, de modo
+        que cada transacción es corta y la API puede seguir atendiendo
+        peticiones. Las loncheras predeterminadas (plantillas) no se archivan.
+        Retorna métricas de la ejecución.
+        """
+        hoy = hoy or date.today()
+        inicio = time.perf_counter()
+        archivadas = 0
+        lotes = 0
+        ultimo_id = 0
+        
+        while True:
+            ids = [fila.id for fila in db.query(Lonchera.id).filter(
+                Lonchera.id > ultimo_id,
+                Lonchera.fecha_asignacion < hoy,
+                Lonchera.estado.in_(LoncheraService.ESTADOS_ARCHIVABLES),
+                Lonchera.es_predeterminada.isnot(True)
+            ).order_by(Lonchera.id).limit(tamano_lote)]
+            
+            if not ids:
+                break
+            
+            # El estado se vuelve a comprobar por si cambió entre SELECT y UPDATE
+            archivadas += db.query(Lonchera).filter(
+                Lonchera.id.in_(ids),
+                Lonchera.estado.in_(LoncheraService.ESTADOS_ARCHIVABLES)
+            ).update(
+                {
+                    Lonchera.estado: EstadoLoncheraEnum.ARCHIVADA.value,
+                    Lonchera.version: Lonchera.version + 1
+                },
+                synchronize_session=False
+            )
+            db.commit()
+            cache_detalle.invalidar_muchas(ids)
+            
+            lotes += 1
+            ultimo_id = ids[-1]
+        
+        return {
+            "fecha_corte": hoy.isoformat(),
+            "archivadas": archivadas,
+            "lotes": lotes,
+            "duracion_segundos": round(time.perf_counter() - inicio, 3)
+        }
+    
+    @staticmethod
+    def asignar_plantilla(
+        db: Session, 
+        plantilla_id: int, 
+        solicitud: AsignacionMasivaRequest
+    ) -> AsignacionMasivaResultado:
+        """
+        Copiar una lonchera y sus alimentos a todos los hijos que cumplan el filtro
+        
+        Por cada día se ejecutan dos INSERT ... SELECT: uno crea las loncheras
+        (en estado Asignada, con los totales de la plantilla) para los hijos
+        activos que aún no tienen lonchera ese día, y otro copia los alimentos
+        de la plantilla a todas ellas. Solo los ids de las loncheras creadas
+        (RETURNING) pasan por Python, y el borrado de conflictos y la copia de
+        alimentos se limitan a esos ids, así que dos asignaciones simultáneas
+        de la misma plantilla no tocan las filas de la otra. Los hijos cuyas
+        restricciones chocan con la plantilla se omiten. Cada día se confirma
+        en su propia transacción.
+        """
+        inicio = time.perf_counter()
+        plantilla = LoncheraService.get_by_id(db, plantilla_id)
+        
+        if not plantilla or plantilla.estado == EstadoLoncheraEnum.ELIMINADA.value:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Lonchera no encontrada"
+            )
+        
+        dias = (solicitud.fecha_fin - solicitud.fecha_inicio).days + 1
+        if dias > LoncheraService.MAX_DIAS_ASIGNACION:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"El rango no puede superar {LoncheraService.MAX_DIAS_ASIGNACION} días"
+            )
+        
+        fechas = [solicitud.fecha_inicio + timedelta(days=d) for d in range(dias)]
+        if not solicitud.incluir_fines_de_semana:
+            fechas = [fecha for fecha in fechas if fecha.weekday() < 5]
+        
+        # La plantilla queda marcada como predeterminada (no se archiva)
+        plantilla.es_predeterminada = True
+        db.commit()
+        
+        filtros = [Hijo.activo == True, Usuario.activo == True]
+        if solicitud.colegio:
+            filtros.append(Hijo.colegio == solicitud.colegio)
+        if solicitud.grado_escolar:
+            filtros.append(Hijo.grado_escolar == solicitud.grado_escolar)
+        if solicitud.tipo_membresia:
+            filtros.append(TipoMembresia.nombre == solicitud.tipo_membresia)
+        
+        def hijos_destino(*columnas):
+            return select(*columnas).select_from(Hijo).join(
+                Usuario, Usuario.id == Hijo.padre_id
+            ).join(
+                TipoMembresia, TipoMembresia.id == Usuario.tipo_membresia_id
+            ).where(*filtros)
+        
+        # Solo los hijos con restricciones activas necesitan verificarse
+        restringidos = [fila[0] for fila in db.execute(
+            hijos_destino(Hijo.id).where(
+                exists().where(
+                    Restriccion.hijo_id == Hijo.id,
+                    Restriccion.activa == True
+                )
+            )
+        )]
+        reglas = RestriccionService.obtener_reglas(db, restringidos)
+        alimento_ids = [item.alimento_id for item in plantilla.alimentos]
+        
+        # Valores copiados de la plantilla a cada lonchera nueva
+        copia = [
+            literal(plantilla.nombre),
+            literal(plantilla.descripcion),
+            literal(EstadoLoncheraEnum.ASIGNADA.value),
+            literal(False, Boolean),
+            literal(plantilla.total_calorias),
+            literal(plantilla.total_proteinas),
+            literal(plantilla.total_carbohidratos),
+            literal(plantilla.total_grasas),
+            literal(plantilla.total_fibra),
+            literal(plantilla.num_alimentos),
+            literal(plantilla.id)
+        ]
+        existente = aliased(Lonchera)
+        
+        asignadas = 0
+        omitidas = 0
+        
+        for fecha in fechas:
+            creadas = db.execute(
+                insert(Lonchera).from_select(
+                    [
+                        Lonchera.nombre,
+                        Lonchera.descripcion,
+                        Lonchera.estado,
+                        Lonchera.es_predeterminada,
+                        Lonchera.total_calorias,
+                        Lonchera.total_proteinas,
+                        Lonchera.total_carbohidratos,
+                        Lonchera.total_grasas,
+                        Lonchera.total_fibra,
+                        Lonchera.num_alimentos,
+                        Lonchera.plantilla_id,
+                        Lonchera.fecha_asignacion,
+                        Lonchera.hijo_id
+                    ],
+                    hijos_destino(*copia, literal(fecha, Date), Hijo.id).where(
+                        ~exists().where(
+                            existente.hijo_id == Hijo.id,
+                            existente.fecha_asignacion == fecha,
+                            existente.estado != EstadoLoncheraEnum.ELIMINADA.value
+                        )
+                    )
+                ).returning(Lonchera.id, Lonchera.hijo_id)
+            ).all()
+            
+            # Descartar las copias de hijos con restricciones que chocan ese día
+            conflictivos = {
+                hijo_id for hijo_id, reglas_hijo in reglas.items()
+                if reglas_hijo.conflictos(alimento_ids, fecha)
+            }
+            descartadas = [fila.id for fila in creadas if fila.hijo_id in conflictivos]
+            for inicio_lote in range(0, len(descartadas), LoncheraService.TAMANO_LOTE_IDS):
+                lote = descartadas[inicio_lote:inicio_lote + LoncheraService.TAMANO_LOTE_IDS]
+                db.query(Lonchera).filter(
+                    Lonchera.id.in_(lote)
+                ).delete(synchronize_session=False)
+            omitidas += len(descartadas)
+            
+            # Las copias de esta ejecución se enlazan con los alimentos de la plantilla
+            nuevas = [fila.id for fila in creadas if fila.hijo_id not in conflictivos]
+            for inicio_lote in range(0, len(nuevas), LoncheraService.TAMANO_LOTE_IDS):
+                lote = nuevas[inicio_lote:inicio_lote + LoncheraService.TAMANO_LOTE_IDS]
+                db.execute(
+                    insert(LoncheraAlimento).from_select(
+                        [
+                            LoncheraAlimento.lonchera_id,
+                            LoncheraAlimento.alimento_id,
+                            LoncheraAlimento.cantidad,
+                            LoncheraAlimento.notas
+                        ],
+                        select(
+                            Lonchera.id,
+                            LoncheraAlimento.alimento_id,
+                            LoncheraAlimento.cantidad,
+                            LoncheraAlimento.notas
+                        ).select_from(Lonchera).join(
+                            LoncheraAlimento, LoncheraAlimento.lonchera_id == Lonchera.plantilla_id
+                        ).where(
+                            Lonchera.id.in_(lote)
+                        )
+                    )
+                )
+            db.commit()
+            
+            asignadas += len(nuevas)
+        
+        return AsignacionMasivaResultado(
+            plantilla_id=plantilla_id,
+            dias=len(fechas),
+            asignadas=asignadas,
+            omitidas_por_restriccion=omitidas,
+            duracion_segundos=round(time.perf_counter() - inicio, 3)
+        )
@@ -0,0 +1,145 @@
+"""
+Matriz nutricional del catálogo de alimentos (NumPy)
+
+El catálogo es pequeño y casi de solo lectura, así que se mantiene en memoria
+como una matriz densa (filas = alimentos ordenados por id, columnas =
+nutrientes). Las loncheras se representan como cantidades dispersas (COO) y
+los totales de muchas loncheras salen de un solo producto disperso × denso.
+
+La matriz se construye desde la instantánea del catálogo y se reconstruye
+cuando esta cambia (por versión o por CATALOGO_TTL_SEGUNDOS), así que los
+cambios hechos en otro worker se ven al mismo tiempo que en el catálogo.
+"""
+import threading
+from typing import Optional
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from backend.app.models.models import EstadoAlimentoEnum
+from backend.app.services.catalogo_alimentos import CatalogoAlimentos, obtener_catalogo
+
+# Orden de las columnas de la matriz
+NUTRIENTES = ("calorias", "proteinas", "carbohidratos", "grasas", "fibra")
+
+
+class MatrizNutricional:
+    """Catálogo de alimentos como matriz de nutrientes"""
+    
+    def __init__(
+        self,
+        ids: np.ndarray,
+        valores: np.ndarray,
+        activos: np.ndarray,
+        catalogo: Optional[CatalogoAlimentos] = None
+    ):
+        self.ids = ids            # (n,) int64, ordenado
+        self.valores = valores    # (n, len(NUTRIENTES)) float64
+        self.activos = activos    # (n,) bool
+        self.catalogo = catalogo  # instantánea de la que se construyó
+    
+    @classmethod
+    def desde_catalogo(cls, catalogo: CatalogoAlimentos) -> "MatrizNutricional":
+        """Construir la matriz desde la instantánea del catálogo (sin consultas)"""
+        filas = catalogo.todos
+        
+        ids = np.fromiter((f.id for f in filas), dtype=np.int64, count=len(filas))
+        valores = np.array(
+            [[f.calorias, f.proteinas, f.carbohidratos, f.grasas or 0.0, f.fibra or 0.0] for f in filas],
+            dtype=np.float64
+        ).reshape(len(filas), len(NUTRIENTES))
+        activos = np.fromiter(
+            (f.estado == EstadoAlimentoEnum.ACTIVO.value for f in filas),
+            dtype=bool,
+            count=len(filas)
+        )
+        
+        return cls(ids, valores, activos, catalogo)
+    
+    def vigente(self, catalogo: CatalogoAlimentos) -> bool:
+        """La matriz corresponde a la instantánea vigente del catálogo"""
+        return self.catalogo is catalogo
+    
+    def filas_de(self, alimento_ids: np.ndarray) -> np.ndarray:
+        """Convertir ids de alimento a índices de fila (-1 si no existe)"""
+        alimento_ids = np.asarray(alimento_ids, dtype=np.int64)
+        
+        if len(self.ids) == 0:
+            return np.full(alimento_ids.shape, -1, dtype=np.int64)
+        
+        posiciones = np.searchsorted(self.ids, alimento_ids)
+        posiciones = np.minimum(posiciones, len(self.ids) - 1)
+        
+        return np.where(self.ids[posiciones] == alimento_ids, posiciones, -1)
+    
+    def totales(self, cantidades: "CantidadesDispersas") -> np.ndarray:
+        """
+        Totales nutricionales por fila de `cantidades` (Q @ N)
+        
+        Retorna una matriz (cantidades.num_filas, len(NUTRIENTES)).
+        """
+        columnas = self.filas_de(cantidades.alimento_ids)
+        validas = columnas >= 0
+        
+        filas = cantidades.filas[validas]
+        columnas = columnas[validas]
+        pesos = cantidades.cantidades[validas]
+        
+        resultado = np.zeros((cantidades.num_filas, len(NUTRIENTES)), dtype=np.float64)
+        for j in range(len(NUTRIENTES)):
+            resultado[:, j] = np.bincount(
+                filas,
+                weights=pesos * self.valores[columnas, j],
+                minlength=cantidades.num_filas
+            )
+        
+        return resultado
+
+
+class CantidadesDispersas:
+    """
+    Matriz dispersa de cantidades en formato COO
+    
+    Cada entrada indica que la fila `filas[k]` (una lonchera o un día) lleva
+    `cantidades[k]` unidades del alimento `alimento_ids[k]`.
+    """
+    
+    def __init__(self, filas: np.ndarray, alimento_ids: np.ndarray, cantidades: np.ndarray, num_filas: int):
+        self.filas = np.asarray(filas, dtype=np.int64)
+        self.alimento_ids = np.asarray(alimento_ids, dtype=np.int64)
+        self.cantidades = np.asarray(cantidades, dtype=np.float64)
+        self.num_filas = num_filas
+    
+    def unidades_por_fila(self) -> np.ndarray:
+        """Número total de unidades de alimento por fila"""
+        return np.bincount(self.filas, weights=self.cantidades, minlength=self.num_filas)
+
+
+# ==================== CACHE DEL CATÁLOGO ====================
+
+_matriz: Optional[MatrizNutricional] = None
+_lock = threading.Lock()
+
+
+def obtener_matriz(db: Session) -> MatrizNutricional:
+    """Obtener la matriz del catálogo, reconstruyéndola si cambió la instantánea"""
+    global _matriz
+    
+    catalogo = obtener_catalogo(db)
+    
+    matriz = _matriz
+    if matriz is not None and matriz.vigente(catalogo):
+        return matriz
+    
+    with _lock:
+        if _matriz is None or not _matriz.vigente(catalogo):
+            _matriz = MatrizNutricional.desde_catalogo(catalogo)
+        return _matriz
+
+
+def invalidar_matriz():
+    """Descartar la matriz en memoria (llamar tras cambios en el catálogo)"""
+    global _matriz
+    
+    with _lock:
+        _matriz = None
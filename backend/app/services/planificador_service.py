@@ -0,0 +1,235 @@
+"""
+Servicio de Planificación - Generación automática de loncheras
+"""
+from sqlalchemy.orm import Session
+from typing import List, Optional, Sequence, Tuple
+from datetime import date, timedelta
+from concurrent.futures import ProcessPoolExecutor
+import asyncio
+import threading
+import numpy as np
+from backend.app.core.config import settings
+from backend.app.schemas.lonchera import (
+    LoncheraCreate, LoncheraAlimentoCreate, ResumenNutricional,
+    PlanificacionRequest, PlanificacionResultado
+)
+from backend.app.services.matriz_nutricional import NUTRIENTES, obtener_matriz
+from backend.app.services.restriccion_service import RestriccionService
+
+DIAS_SEMANA = ["Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo"]
+
+# Combinaciones candidatas evaluadas por día
+NUM_CANDIDATOS = 4096
+
+COLUMNA_CALORIAS = NUTRIENTES.index("calorias")
+COLUMNA_PROTEINAS = NUTRIENTES.index("proteinas")
+
+
+def planificar_dias(
+    valores: np.ndarray,
+    tipos: np.ndarray,
+    semanas: Sequence[int],
+    objetivos: Tuple[float, float, float, float],
+    alimentos_por_lonchera: int,
+    semilla: int
+) -> List[List[int]]:
+    """
+    Elegir los alimentos de cada día (búsqueda heurística vectorizada)
+    
+    Para cada día se generan NUM_CANDIDATOS combinaciones aleatorias de filas
+    de `valores` que no se hayan usado en la misma semana, se evalúan todas a
+    la vez con la matriz de nutrientes y se queda la de menor penalización:
+    distancia a los rangos de calorías y proteínas, alimentos repetidos y
+    poca variedad de tipos. Es una función pura para poder ejecutarse en un
+    proceso aparte.
+    
+    Retorna, por día, la lista de índices de fila elegidos.
+    """
+    calorias_min, calorias_max, proteinas_min, proteinas_max = objetivos
+    rng = np.random.default_rng(semilla)
+    usados_por_semana = {}
+    plan = []
+    
+    for semana in semanas:
+        usados = usados_por_semana.setdefault(semana, set())
+        disponibles = np.array([i for i in range(len(valores)) if i not in usados], dtype=np.int64)
+        
+        # Si la semana ya agotó el catálogo se permite repetir
+        if len(disponibles) < alimentos_por_lonchera:
+            disponibles = np.arange(len(valores), dtype=np.int64)
+        
+        k = min(alimentos_por_lonchera, len(disponibles))
+        combinaciones = np.sort(
+            disponibles[rng.integers(0, len(disponibles), size=(NUM_CANDIDATOS, k))],
+            axis=1
+        )
+        
+        totales = valores[combinaciones].sum(axis=1)
+        calorias = totales[:, COLUMNA_CALORIAS]
+        proteinas = totales[:, COLUMNA_PROTEINAS]
+        
+        penalizacion = (
+            np.maximum(calorias_min - calorias, 0) / max(calorias_min, 1.0)
+            + np.maximum(calorias - calorias_max, 0) / max(calorias_max, 1.0)
+            + np.maximum(proteinas_min - proteinas, 0) / max(proteinas_min, 1.0)
+            + np.maximum(proteinas - proteinas_max, 0) / max(proteinas_max, 1.0)
+        )
+        
+        if k > 1:
+            # Un mismo alimento dos veces en la combinación
+            repetidos = (np.diff(combinaciones, axis=1) == 0).any(axis=1)
+            # Tipos distintos dentro de la combinación
+            tipos_combinacion = np.sort(tipos[combinaciones], axis=1)
+            variedad = (np.diff(tipos_combinacion, axis=1) != 0).sum(axis=1) + 1
+            
+            penalizacion += 10.0 * repetidos + 0.1 * (k - variedad) / k
+        
+        mejor = combinaciones[int(np.argmin(penalizacion))]
+        plan.append(mejor.tolist())
+        usados.update(plan[-1])
+    
+    return plan
+
+
+# ==================== POOL DE PROCESOS ====================
+
+_pool: Optional[ProcessPoolExecutor] = None
+_lock = threading.Lock()
+
+
+def obtener_pool() -> ProcessPoolExecutor:
+    """Obtener el pool de procesos del planificador, creándolo si hace falta"""
+    global _pool
+    
+    with _lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=settings.PLANIFICADOR_PROCESOS)
+        return _pool
+
+
+def cerrar_pool():
+    """Cerrar el pool de procesos (al apagar la aplicación)"""
+    global _pool
+    
+    with _lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+class PlanificadorService:
+    """Servicio para generar loncheras a partir del catálogo"""
+    
+    # Rango máximo de días de una planificación
+    MAX_DIAS = 31
+    
+    @staticmethod
+    async def planificar(db: Session, solicitud: PlanificacionRequest) -> PlanificacionResultado:
+        """
+        Generar loncheras para un hijo en un rango de fechas
+        
+        La consulta del catálogo se hace aquí; la búsqueda se ejecuta en el
+        pool de procesos para no bloquear el event loop. Las loncheras
+        resultantes se pueden insertar directamente con LoncheraService, y
+        cada una va acompañada de su resumen nutricional.
+        """
+        fechas = PlanificadorService._fechas(solicitud)
+        alimento_ids, valores, tipos = PlanificadorService._alimentos_permitidos(
+            db, solicitud.hijo_id, solicitud.fecha_inicio, solicitud.fecha_fin
+        )
+        
+        if not fechas or len(alimento_ids) == 0:
+            return PlanificacionResultado(loncheras=[])
+        
+        # Cada día se identifica con el lunes de su semana
+        semanas = [(fecha - timedelta(days=fecha.weekday())).toordinal() for fecha in fechas]
+        objetivos = (
+            solicitud.calorias_min,
+            solicitud.calorias_max,
+            solicitud.proteinas_min,
+            solicitud.proteinas_max
+        )
+        semilla = solicitud.hijo_id * 100003 + fechas[0].toordinal()
+        
+        loop = asyncio.get_running_loop()
+        plan = await loop.run_in_executor(
+            obtener_pool(),
+            planificar_dias,
+            valores,
+            tipos,
+            semanas,
+            objetivos,
+            solicitud.alimentos_por_lonchera,
+            semilla
+        )
+        
+        loncheras = [
+            LoncheraCreate(
+                nombre=f"Lonchera {DIAS_SEMANA[fecha.weekday()]} {fecha.strftime('%d/%m')}",
+                descripcion="Generada por el planificador",
+                fecha_asignacion=fecha,
+                hijo_id=solicitud.hijo_id,
+                alimentos=[
+                    LoncheraAlimentoCreate(alimento_id=int(alimento_ids[fila]))
+                    for fila in filas
+                ]
+            )
+            for fecha, filas in zip(fechas, plan)
+        ]
+        resumenes = [
+            ResumenNutricional(
+                **{
+                    f"total_{nutriente}": round(float(valor), 2)
+                    for nutriente, valor in zip(NUTRIENTES, valores[filas].sum(axis=0))
+                },
+                num_alimentos=len(filas)
+            )
+            for filas in plan
+        ]
+        
+        return PlanificacionResultado(loncheras=loncheras, resumenes=resumenes)
+    
+    @staticmethod
+    def _fechas(solicitud: PlanificacionRequest) -> List[date]:
+        """Fechas a planificar (sin fines de semana, salvo que se pidan)"""
+        dias = (solicitud.fecha_fin - solicitud.fecha_inicio).days + 1
+        fechas = [solicitud.fecha_inicio + timedelta(days=d) for d in range(max(dias, 0))]
+        
+        if not solicitud.incluir_fines_de_semana:
+            fechas = [fecha for fecha in fechas if fecha.weekday() < 5]
+        
+        return fechas
+    
+    @staticmethod
+    def _alimentos_permitidos(
+        db: Session,
+        hijo_id: int,
+        fecha_inicio: date,
+        fecha_fin: date
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Alimentos activos que no chocan con las restricciones del hijo en
+        ningún día del rango
+        
+        Retorna (ids, matriz de nutrientes, código de tipo) de esos alimentos.
+        """
+        reglas = RestriccionService.obtener_reglas(db, [hijo_id])[hijo_id]
+        prohibidos = reglas.alimentos_prohibidos(fecha_inicio, fecha_fin)
+        
+        # Ids, tipos y nutrientes de la misma instantánea del catálogo (la
+        # fila i de la matriz es catalogo.todos[i]), sin consultas
+        matriz = obtener_matriz(db)
+        alimentos = matriz.catalogo.todos
+        
+        filas = np.array(
+            [i for i in np.flatnonzero(matriz.activos) if alimentos[i].id not in prohibidos],
+            dtype=np.int64
+        )
+        
+        codigos_tipo = {}
+        tipos = np.array(
+            [codigos_tipo.setdefault(alimentos[i].tipo, len(codigos_tipo)) for i in filas],
+            dtype=np.int64
+        )
+        
+        return matriz.ids[filas], matriz.valores[filas], tipos
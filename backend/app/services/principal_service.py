@@ -0,0 +1,183 @@
+"""
+Usuario autenticado en memoria (principal) para get_current_user
+
+Cada petición autenticada decodificaba el JWT, consultaba el usuario y luego
+cargaba de forma perezosa sus hijos, su rol y su membresía. El principal es
+un resumen inmutable con lo que necesitan las comprobaciones de permisos
+(rol, banderas de la membresía y el conjunto de ids de sus hijos), guardado
+por id de usuario en un cache con TTL. Los tokens ya decodificados se
+guardan en un LRU aparte.
+
+Los cambios en usuarios, hijos, roles y membresías descartan las entradas
+afectadas (eventos del ORM, al hacer flush y otra vez al confirmar la
+transacción). El cache es por proceso; en otro worker los cambios se ven al
+expirar el TTL.
+"""
+from datetime import datetime, timezone
+from typing import FrozenSet, Iterable, NamedTuple, Optional
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+
+from backend.app.core.config import settings
+from backend.app.core.security import decode_access_token
+from backend.app.core.revocacion import indice_revocacion
+from backend.app.models.models import Usuario, Hijo, Rol, TipoMembresia, RolEnum
+from backend.app.utils.cache import CacheLRU
+
+# Principal por id de usuario
+cache_principales = CacheLRU(
+    capacidad=settings.CACHE_PRINCIPAL_TAMANO,
+    ttl_segundos=settings.CACHE_PRINCIPAL_TTL_SEGUNDOS
+)
+
+# (id de usuario, expiración, jti) por token JWT
+cache_tokens = CacheLRU(
+    capacidad=settings.CACHE_PRINCIPAL_TAMANO,
+    ttl_segundos=settings.CACHE_PRINCIPAL_TTL_SEGUNDOS
+)
+
+
+class Principal(NamedTuple):
+    """Resumen inmutable del usuario autenticado para verificar permisos"""
+    id: int
+    activo: bool
+    rol: str
+    membresia: str
+    permite_personalizacion: bool
+    permite_restricciones: bool
+    permite_estadisticas_avanzadas: bool
+    hijo_ids: FrozenSet[int]
+    
+    @property
+    def es_administrador(self) -> bool:
+        return self.rol == RolEnum.ADMINISTRADOR.value
+
+
+def cargar_principal(db: Session, usuario_id: int) -> Optional[Principal]:
+    """Construir el principal desde la base de datos (dos consultas)"""
+    fila = db.query(
+        Usuario.id,
+        Usuario.activo,
+        Rol.nombre.label("rol"),
+        TipoMembresia.nombre.label("membresia"),
+        TipoMembresia.permite_personalizacion,
+        TipoMembresia.permite_restricciones,
+        TipoMembresia.permite_estadisticas_avanzadas
+    ).join(
+        Rol, Rol.id == Usuario.rol_id
+    ).join(
+        TipoMembresia, TipoMembresia.id == Usuario.tipo_membresia_id
+    ).filter(
+        Usuario.id == usuario_id
+    ).first()
+    
+    if fila is None:
+        return None
+    
+    hijo_ids = frozenset(
+        hijo_id for (hijo_id,) in db.query(Hijo.id).filter(Hijo.padre_id == usuario_id)
+    )
+    
+    return Principal(
+        id=fila.id,
+        activo=bool(fila.activo),
+        rol=fila.rol,
+        membresia=fila.membresia,
+        permite_personalizacion=bool(fila.permite_personalizacion),
+        permite_restricciones=bool(fila.permite_restricciones),
+        permite_estadisticas_avanzadas=bool(fila.permite_estadisticas_avanzadas),
+        hijo_ids=hijo_ids
+    )
+
+
+def obtener_principal(db: Session, usuario_id: int) -> Optional[Principal]:
+    """Principal del usuario, desde el cache o la base de datos"""
+    principal = cache_principales.obtener(usuario_id)
+    
+    if principal is None:
+        principal = cargar_principal(db, usuario_id)
+        if principal is not None:
+            cache_principales.guardar(usuario_id, principal)
+    
+    return principal
+
+
+def usuario_del_token(token: str) -> Optional[int]:
+    """Id de usuario de un JWT válido, no expirado ni revocado (None si no lo es)"""
+    entrada = cache_tokens.obtener(token)
+    
+    if entrada is None:
+        payload = decode_access_token(token)
+        if payload is None or payload.get("sub") is None:
+            return None
+        
+        try:
+            entrada = (int(payload["sub"]), float(payload["exp"]), payload.get("jti"))
+        except (KeyError, TypeError, ValueError):
+            return None
+        
+        cache_tokens.guardar(token, entrada)
+    
+    usuario_id, expira, jti = entrada
+    
+    # La revocación se comprueba también con el token en cache (en memoria)
+    if expira <= datetime.now(timezone.utc).timestamp() or (
+        jti is not None and indice_revocacion.esta_revocado(jti)
+    ):
+        cache_tokens.invalidar(token)
+        return None
+    
+    return usuario_id
+
+
+def invalidar_principales(usuario_ids: Iterable[int]):
+    """Descartar los principales de los usuarios indicados"""
+    cache_principales.invalidar_muchas(usuario_ids)
+
+
+# ==================== INVALIDACIÓN POR EVENTOS DEL ORM ====================
+
+def _marcar(target, usuario_ids: Iterable[int]):
+    """Invalidar ahora y recordar los ids para invalidar de nuevo al confirmar"""
+    usuario_ids = [u for u in usuario_ids if u is not None]
+    invalidar_principales(usuario_ids)
+    
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault("principales_modificados", set()).update(usuario_ids)
+
+
+@event.listens_for(Usuario, "after_update")
+@event.listens_for(Usuario, "after_delete")
+def _usuario_modificado(mapper, connection, target):
+    _marcar(target, [target.id])
+
+
+@event.listens_for(Hijo, "after_insert")
+@event.listens_for(Hijo, "after_update")
+@event.listens_for(Hijo, "after_delete")
+def _hijo_modificado(mapper, connection, target):
+    # Si el hijo cambió de padre, también el padre anterior
+    anteriores = inspect(target).attrs.padre_id.history.deleted or ()
+    _marcar(target, [target.padre_id, *anteriores])
+
+
+@event.listens_for(Rol, "after_update")
+@event.listens_for(TipoMembresia, "after_update")
+def _permisos_modificados(mapper, connection, target):
+    cache_principales.limpiar()
+
+
+@event.listens_for(Session, "after_commit")
+def _transaccion_confirmada(session):
+    # Una petición concurrente pudo recargar el principal con los datos
+    # anteriores entre el flush y el commit
+    usuario_ids = session.info.pop("principales_modificados", None)
+    if usuario_ids:
+        invalidar_principales(usuario_ids)
+
+
+@event.listens_for(Session, "after_rollback")
+def _transaccion_revertida(session):
+    session.info.pop("principales_modificados", None)
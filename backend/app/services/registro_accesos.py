@@ -0,0 +1,80 @@
+"""
+Registro diferido del último acceso de los usuarios
+
+Cada login hacía un UPDATE y un commit de `ultimo_acceso` (en SQLite, un
+bloqueo de escritura y un fsync dentro del login). Aquí el momento del
+acceso se guarda en un diccionario en memoria (el más reciente por usuario)
+y se vuelca periódicamente con un solo UPDATE por lotes, y una última vez
+al apagar la aplicación (ver tasks/accesos.py). Si el proceso termina de
+forma abrupta se pierden como mucho los accesos de un intervalo.
+"""
+import threading
+from datetime import datetime
+from typing import Dict, Optional
+
+from sqlalchemy import bindparam, or_, update
+from sqlalchemy.orm import Session
+
+from backend.app.models.models import Usuario
+
+
+class BufferAccesos:
+    """Último acceso pendiente de guardar, por id de usuario"""
+    
+    def __init__(self):
+        self._pendientes: Dict[int, datetime] = {}
+        self._lock = threading.Lock()
+    
+    def registrar(self, usuario_id: int, momento: Optional[datetime] = None) -> datetime:
+        """Anotar un acceso (sin tocar la base de datos); retorna el momento anotado"""
+        momento = momento or datetime.utcnow()
+        
+        with self._lock:
+            anterior = self._pendientes.get(usuario_id)
+            if anterior is None or anterior < momento:
+                self._pendientes[usuario_id] = momento
+        
+        return momento
+    
+    def vaciar(self, db: Session) -> int:
+        """
+        Guardar los accesos pendientes en un UPDATE por lotes y un commit
+        
+        Solo se escribe si el valor guardado es anterior (otro worker pudo
+        registrar un acceso más reciente). Si falla, los accesos vuelven al
+        buffer para el siguiente intento. Retorna cuántos se guardaron.
+        """
+        with self._lock:
+            pendientes, self._pendientes = self._pendientes, {}
+        
+        if not pendientes:
+            return 0
+        
+        tabla = Usuario.__table__
+        sentencia = update(tabla).where(
+            tabla.c.id == bindparam("b_id"),
+            or_(
+                tabla.c.ultimo_acceso.is_(None),
+                tabla.c.ultimo_acceso < bindparam("b_acceso")
+            )
+        ).values(ultimo_acceso=bindparam("b_acceso"))
+        
+        try:
+            db.execute(sentencia, [
+                {"b_id": usuario_id, "b_acceso": momento}
+                for usuario_id, momento in pendientes.items()
+            ])
+            db.commit()
+        except Exception:
+            db.rollback()
+            for usuario_id, momento in pendientes.items():
+                self.registrar(usuario_id, momento)
+            raise
+        
+        return len(pendientes)
+    
+    def __len__(self) -> int:
+        return len(self._pendientes)
+
+
+buffer_accesos = BufferAccesos()
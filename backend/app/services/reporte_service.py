@@ -0,0 +1,114 @@
+"""
+Servicio de Reportes - Reportes nutricionales por periodo
+"""
+from sqlalchemy.orm import Session
+from typing import Dict, List
+from datetime import date, timedelta
+import numpy as np
+from backend.app.models.models import Lonchera, LoncheraAlimento, EstadoLoncheraEnum
+from backend.app.schemas.lonchera import ReporteNutricional, ResumenDiario, ResumenNutricional
+from backend.app.services.matriz_nutricional import CantidadesDispersas, obtener_matriz
+
+
+class ReporteService:
+    """Servicio para reportes nutricionales"""
+    
+    # Máximo de hijos por consulta (límite de variables de SQLite)
+    TAMANO_LOTE_HIJOS = 500
+    
+    @staticmethod
+    def reporte_periodo(
+        db: Session,
+        hijo_ids: List[int],
+        fecha_inicio: date,
+        fecha_fin: date
+    ) -> Dict[int, ReporteNutricional]:
+        """
+        Reporte nutricional diario de varios hijos en un rango de fechas
+        
+        Cada celda (hijo, día) es una fila de una matriz dispersa de cantidades;
+        todos los totales diarios salen de un único producto con la matriz
+        nutricional del catálogo, sin calcular lonchera por lonchera.
+        """
+        hijo_ids = list(dict.fromkeys(hijo_ids))
+        num_dias = (fecha_fin - fecha_inicio).days + 1
+        posicion_hijo = {hijo_id: i for i, hijo_id in enumerate(hijo_ids)}
+        
+        filas, alimento_ids, cantidades = [], [], []
+        loncheras_por_celda = np.zeros(len(hijo_ids) * num_dias, dtype=np.int64)
+        
+        for inicio in range(0, len(hijo_ids), ReporteService.TAMANO_LOTE_HIJOS):
+            lote = hijo_ids[inicio:inicio + ReporteService.TAMANO_LOTE_HIJOS]
+            filtros = (
+                Lonchera.hijo_id.in_(lote),
+                Lonchera.fecha_asignacion >= fecha_inicio,
+                Lonchera.fecha_asignacion <= fecha_fin,
+                Lonchera.estado != EstadoLoncheraEnum.ELIMINADA.value
+            )
+            
+            # Loncheras por celda (incluye loncheras sin alimentos)
+            for hijo_id, fecha in db.query(Lonchera.hijo_id, Lonchera.fecha_asignacion).filter(*filtros):
+                celda = posicion_hijo[hijo_id] * num_dias + (fecha - fecha_inicio).days
+                loncheras_por_celda[celda] += 1
+            
+            # Cantidades de cada alimento por celda
+            items = db.query(
+                Lonchera.hijo_id,
+                Lonchera.fecha_asignacion,
+                LoncheraAlimento.alimento_id,
+                LoncheraAlimento.cantidad
+            ).join(
+                LoncheraAlimento, LoncheraAlimento.lonchera_id == Lonchera.id
+            ).filter(*filtros)
+            
+            for hijo_id, fecha, alimento_id, cantidad in items:
+                filas.append(posicion_hijo[hijo_id] * num_dias + (fecha - fecha_inicio).days)
+                alimento_ids.append(alimento_id)
+                cantidades.append(cantidad)
+        
+        dispersa = CantidadesDispersas(filas, alimento_ids, cantidades, len(hijo_ids) * num_dias)
+        totales = obtener_matriz(db).totales(dispersa)
+        unidades = dispersa.unidades_por_fila()
+        
+        reportes = {}
+        for hijo_id, i in posicion_hijo.items():
+            celdas = slice(i * num_dias, (i + 1) * num_dias)
+            totales_hijo = totales[celdas]
+            unidades_hijo = unidades[celdas]
+            loncheras_hijo = loncheras_por_celda[celdas]
+            
+            dias = [
+                ResumenDiario(
+                    fecha=fecha_inicio + timedelta(days=int(d)),
+                    num_loncheras=int(loncheras_hijo[d]),
+                    resumen=ReporteService._resumen(totales_hijo[d], unidades_hijo[d])
+                )
+                for d in np.flatnonzero(loncheras_hijo)
+            ]
+            
+            dias_con_lonchera = max(len(dias), 1)
+            reportes[hijo_id] = ReporteNutricional(
+                hijo_id=hijo_id,
+                fecha_inicio=fecha_inicio,
+                fecha_fin=fecha_fin,
+                dias=dias,
+                total=ReporteService._resumen(totales_hijo.sum(axis=0), unidades_hijo.sum()),
+                promedio_diario=ReporteService._resumen(
+                    totales_hijo.sum(axis=0) / dias_con_lonchera,
+                    unidades_hijo.sum() / dias_con_lonchera
+                )
+            )
+        
+        return reportes
+    
+    @staticmethod
+    def _resumen(valores: np.ndarray, unidades: float) -> ResumenNutricional:
+        """Convertir una fila de la matriz de totales en ResumenNutricional"""
+        return ResumenNutricional(
+            total_calorias=round(float(valores[0]), 2),
+            total_proteinas=round(float(valores[1]), 2),
+            total_carbohidratos=round(float(valores[2]), 2),
+            total_grasas=round(float(valores[3]), 2),
+            total_fibra=round(float(valores[4]), 2),
+            num_alimentos=int(round(float(unidades)))
+        )
@@ -0,0 +1,448 @@
+"""
+Servicio de Restricciones - Verificación de loncheras contra restricciones alimentarias
+"""
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session, object_session, selectinload
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+from datetime import date
+import threading
+from backend.app.core.config import settings
+from backend.app.models.models import (
+    Lonchera, LoncheraAlimento, Hijo, Restriccion, Excepcion,
+    EstadoLoncheraEnum
+)
+from backend.app.services.catalogo_alimentos import CatalogoAlimentos, obtener_catalogo
+from backend.app.utils.cache import CacheLRU
+from backend.app.utils.texto import palabras
+from fastapi import HTTPException, status
+
+# Palabras de una restricción que no describen un alimento
+PALABRAS_IGNORADAS = {
+    "a", "al", "alergia", "alergico", "alergica", "con", "de", "del", "el",
+    "en", "evitar", "intolerancia", "la", "las", "lo", "los", "no", "nada",
+    "o", "para", "por", "preferencia", "que", "sin", "severa", "un", "una", "y"
+}
+
+# Grupos de alérgenos: cualquier término de un grupo en una restricción
+# prohíbe los alimentos que mencionen cualquier término del mismo grupo
+ALERGENOS = {
+    "lacteos": {
+        "leche", "lacteo", "lactea", "lactosa", "queso", "yogurt", "yogur",
+        "mantequilla", "crema", "nata", "kefir", "caseina", "suero"
+    },
+    "gluten": {
+        "gluten", "celiaco", "celiaca", "celiaquia", "trigo", "cebada", "centeno",
+        "avena", "harina", "pan", "galleta", "granola", "pasta", "sandwich"
+    },
+    "mani": {"mani", "cacahuate", "cacahuete"},
+    "frutos_secos": {
+        "fruto seco", "nuez", "almendra", "avellana", "pistacho", "anacardo",
+        "maranon", "castana"
+    },
+    "huevo": {"huevo", "clara", "yema", "mayonesa"},
+    "pescados": {"pescado", "marisco", "atun", "salmon", "sardina", "camaron"},
+    "soya": {"soya", "soja"},
+    "azucar": {"azucar", "dulce", "chocolate", "caramelo", "golosina", "miel"}
+}
+
+# Palabras que pueden seguir a "sin" sin terminar la negación
+# ("sin azúcar ni gluten", "sin la cáscara")
+CONECTORES_NEGACION = {"ni", "o", "y", "e", "el", "la", "los", "las", "de", "un", "una"}
+
+
+def _raiz(palabra: str) -> str:
+    """Forma singular aproximada de una palabra normalizada"""
+    if palabra.endswith("ces") and len(palabra) > 4:
+        return palabra[:-3] + "z"
+    if palabra.endswith("es") and len(palabra) > 4 and palabra[-3] not in "aeiou":
+        return palabra[:-2]
+    if palabra.endswith("s") and len(palabra) > 3:
+        return palabra[:-1]
+    return palabra
+
+
+def _termino(texto: str) -> str:
+    """Término de un grupo con sus palabras reducidas a la raíz"""
+    return " ".join(_raiz(p) for p in palabras(texto))
+
+
+def _indice_alergenos() -> Dict[str, FrozenSet[str]]:
+    """Término -> todos los términos de su grupo (o grupos) de alérgenos"""
+    indice: Dict[str, FrozenSet[str]] = {}
+    for grupo in ALERGENOS.values():
+        terminos = frozenset(_termino(t) for t in grupo)
+        for termino in terminos:
+            indice[termino] = indice.get(termino, frozenset()) | terminos
+    return indice
+
+
+TERMINOS_ALERGENO = _indice_alergenos()
+
+
+def _segmentos(texto: str, negaciones: bool = False) -> List[List[str]]:
+    """
+    Tramos de palabras consecutivas de un texto, ya reducidas a la raíz
+    
+    Con `negaciones`, se descartan las palabras negadas con "sin" (en
+    "Yogurt sin azúcar" el alimento no contiene azúcar); el texto se corta
+    en ese punto para no formar pares con palabras que no eran vecinas.
+    """
+    segmentos = [[]]
+    negado = False
+    for palabra in palabras(texto):
+        if negaciones and palabra == "sin":
+            negado = True
+            segmentos.append([])
+            continue
+        if negado:
+            if palabra not in CONECTORES_NEGACION:
+                # Termina la negación salvo que siga "ni"/"y"/"o"
+                negado = None
+            continue
+        if negado is None:
+            if palabra in {"ni", "o", "y", "e"}:
+                negado = True
+                continue
+            negado = False
+        segmentos[-1].append(_raiz(palabra))
+    return [segmento for segmento in segmentos if segmento]
+
+
+def _etiquetas(texto: str, negaciones: bool = False) -> Set[str]:
+    """Etiquetas de un texto: raíces de sus palabras y de sus pares de palabras"""
+    etiquetas = set()
+    for raices in _segmentos(texto, negaciones):
+        etiquetas.update(raices)
+        etiquetas.update(f"{a} {b}" for a, b in zip(raices, raices[1:]))
+    return etiquetas
+
+
+class EtiquetasCatalogo:
+    """
+    Etiquetas de cada alimento, como conjuntos dispersos de ids
+    
+    Se construye desde la instantánea del catálogo y se descarta cuando esta
+    cambia (por versión o por CATALOGO_TTL_SEGUNDOS). Cada alimento guarda
+    solo los ids de sus propias etiquetas, y un índice invertido da los
+    alimentos de cada etiqueta; el tamaño no crece con el vocabulario.
+    """
+    
+    def __init__(self, catalogo: CatalogoAlimentos):
+        self.origen = catalogo
+        self.ids: Dict[str, int] = {}
+        self.etiquetas: Dict[int, FrozenSet[int]] = {}
+        self.alimentos_por_etiqueta: Dict[int, List[int]] = {}
+        self.nombres: Dict[int, str] = {}
+        
+        for alimento in catalogo.todos:
+            etiquetas = set()
+            for campo in (alimento.nombre, alimento.tipo, alimento.descripcion or ""):
+                etiquetas |= _etiquetas(campo, negaciones=True)
+            
+            ids = frozenset(self.ids.setdefault(e, len(self.ids)) for e in etiquetas)
+            for etiqueta_id in ids:
+                self.alimentos_por_etiqueta.setdefault(etiqueta_id, []).append(alimento.id)
+            
+            self.etiquetas[alimento.id] = ids
+            self.nombres[alimento.id] = alimento.nombre
+    
+    def vigente(self, catalogo: CatalogoAlimentos) -> bool:
+        """Las etiquetas corresponden a la instantánea vigente del catálogo"""
+        return self.origen is catalogo
+    
+    def etiquetas_de_restriccion(self, descripcion: str) -> FrozenSet[int]:
+        """Ids de las etiquetas de alimento que prohíbe una restricción"""
+        terminos = set()
+        for etiqueta in _etiquetas(descripcion):
+            if etiqueta in PALABRAS_IGNORADAS:
+                continue
+            terminos.add(etiqueta)
+            terminos.update(TERMINOS_ALERGENO.get(etiqueta, ()))
+        
+        return frozenset(self.ids[t] for t in terminos if t in self.ids)
+    
+    def alimentos_con(self, etiqueta_ids: Iterable[int]) -> Set[int]:
+        """Ids de los alimentos que tienen alguna de las etiquetas"""
+        alimentos = set()
+        for etiqueta_id in etiqueta_ids:
+            alimentos.update(self.alimentos_por_etiqueta.get(etiqueta_id, ()))
+        return alimentos
+
+
+class ReglasHijo:
+    """Restricciones activas de un hijo compiladas a conjuntos de etiquetas"""
+    
+    def __init__(self, restricciones: List[Restriccion], catalogo: EtiquetasCatalogo):
+        self.catalogo = catalogo
+        # (restriccion_id, descripcion, etiquetas prohibidas, ventanas de excepción)
+        self.reglas: List[Tuple[int, str, FrozenSet[int], List[Tuple[date, Optional[date]]]]] = [
+            (
+                r.id,
+                r.descripcion,
+                catalogo.etiquetas_de_restriccion(r.descripcion),
+                [(e.fecha_inicio, e.fecha_fin) for e in r.excepciones]
+            )
+            for r in restricciones
+        ]
+        self.reglas = [regla for regla in self.reglas if regla[2]]
+    
+    def _aplica(self, ventanas, inicio: date, fin: date) -> bool:
+        """La regla aplica si ninguna excepción cubre todo el rango [inicio, fin]"""
+        return not any(
+            e_inicio <= inicio and (e_fin is None or fin <= e_fin)
+            for e_inicio, e_fin in ventanas
+        )
+    
+    def etiquetas_prohibidas(self, inicio: date, fin: Optional[date] = None) -> Set[int]:
+        """Etiquetas prohibidas en una fecha (o en algún día de un rango de fechas)"""
+        fin = fin or inicio
+        prohibidas = set()
+        for _, _, etiquetas, ventanas in self.reglas:
+            if self._aplica(ventanas, inicio, fin):
+                prohibidas |= etiquetas
+        return prohibidas
+    
+    def alimentos_prohibidos(self, inicio: date, fin: Optional[date] = None) -> Set[int]:
+        """Ids de los alimentos prohibidos en una fecha (o en un rango de fechas)"""
+        if not self.reglas:
+            return set()
+        return self.catalogo.alimentos_con(self.etiquetas_prohibidas(inicio, fin))
+    
+    def conflictos(self, alimento_ids: Iterable[int], fecha: date) -> List[Tuple[int, int, str]]:
+        """(alimento_id, restriccion_id, descripcion) de cada alimento prohibido"""
+        resultado = []
+        prohibidas = self.etiquetas_prohibidas(fecha) if self.reglas else set()
+        if not prohibidas:
+            return resultado
+        
+        for alimento_id in alimento_ids:
+            etiquetas_alimento = self.catalogo.etiquetas.get(alimento_id, frozenset())
+            if etiquetas_alimento.isdisjoint(prohibidas):
+                continue
+            for restriccion_id, descripcion, etiquetas, ventanas in self.reglas:
+                if not etiquetas_alimento.isdisjoint(etiquetas) and self._aplica(ventanas, fecha, fecha):
+                    resultado.append((alimento_id, restriccion_id, descripcion))
+        return resultado
+
+
+# ==================== CACHE ====================
+
+# Reglas compiladas por hijo; en otro worker los cambios se ven al expirar
+cache_reglas = CacheLRU(
+    capacidad=settings.CACHE_RESTRICCIONES_TAMANO,
+    ttl_segundos=settings.CACHE_RESTRICCIONES_TTL_SEGUNDOS
+)
+
+_catalogo: Optional[EtiquetasCatalogo] = None
+_lock = threading.Lock()
+
+
+def obtener_etiquetas(db: Session) -> EtiquetasCatalogo:
+    """Etiquetas del catálogo, reconstruidas si cambió la instantánea"""
+    global _catalogo
+    
+    catalogo = obtener_catalogo(db)
+    
+    etiquetas = _catalogo
+    if etiquetas is not None and etiquetas.vigente(catalogo):
+        return etiquetas
+    
+    with _lock:
+        if _catalogo is None or not _catalogo.vigente(catalogo):
+            _catalogo = EtiquetasCatalogo(catalogo)
+        return _catalogo
+
+
+def invalidar_catalogo():
+    """Descartar etiquetas del catálogo y reglas compiladas (cambios en alimentos)"""
+    global _catalogo
+    
+    with _lock:
+        _catalogo = None
+    cache_reglas.limpiar()
+
+
+def invalidar_hijo(hijo_id: int):
+    """Descartar las reglas compiladas de un hijo (cambios en sus restricciones)"""
+    cache_reglas.invalidar(hijo_id)
+
+
+# ==================== INVALIDACIÓN POR EVENTOS DEL ORM ====================
+
+def _marcar(target, hijo_ids: Iterable[int]):
+    """Invalidar ahora y recordar los hijos para invalidar de nuevo al confirmar"""
+    hijo_ids = [h for h in hijo_ids if h is not None]
+    for hijo_id in hijo_ids:
+        invalidar_hijo(hijo_id)
+    
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault("restricciones_modificadas", set()).update(hijo_ids)
+
+
+@event.listens_for(Restriccion, "after_insert")
+@event.listens_for(Restriccion, "after_update")
+@event.listens_for(Restriccion, "after_delete")
+def _restriccion_modificada(mapper, connection, target):
+    # Si la restricción cambió de hijo, también el hijo anterior
+    anteriores = inspect(target).attrs.hijo_id.history.deleted or ()
+    _marcar(target, [target.hijo_id, *anteriores])
+
+
+@event.listens_for(Excepcion, "after_insert")
+@event.listens_for(Excepcion, "after_update")
+@event.listens_for(Excepcion, "after_delete")
+def _excepcion_modificada(mapper, connection, target):
+    # El hijo se busca en la misma conexión (la restricción puede no estar cargada)
+    hijo_id = connection.execute(
+        select(Restriccion.hijo_id).where(Restriccion.id == target.restriccion_id)
+    ).scalar()
+    _marcar(target, [hijo_id])
+
+
+@event.listens_for(Session, "after_commit")
+def _transaccion_confirmada(session):
+    # Una petición concurrente pudo compilar las reglas con las restricciones
+    # anteriores entre el flush y el commit
+    hijo_ids = session.info.pop("restricciones_modificadas", None)
+    if hijo_ids:
+        for hijo_id in hijo_ids:
+            invalidar_hijo(hijo_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _transaccion_revertida(session):
+    session.info.pop("restricciones_modificadas", None)
+
+
+class RestriccionService:
+    """Servicio para verificar loncheras contra restricciones alimentarias"""
+    
+    # Máximo de hijos por consulta (límite de variables de SQLite)
+    TAMANO_LOTE_HIJOS = 500
+    
+    @staticmethod
+    def obtener_reglas(db: Session, hijo_ids: Iterable[int]) -> Dict[int, ReglasHijo]:
+        """
+        Obtener las reglas compiladas de varios hijos
+        
+        Las que no están en cache se compilan con una consulta por lote (con
+        sus excepciones); las demás no tocan la base de datos.
+        """
+        hijo_ids = set(hijo_ids)
+        catalogo = obtener_etiquetas(db)
+        
+        reglas = {}
+        for hijo_id in hijo_ids:
+            compiladas = cache_reglas.obtener(hijo_id)
+            if compiladas is not None and compiladas.catalogo is catalogo:
+                reglas[hijo_id] = compiladas
+        
+        faltantes = [h for h in hijo_ids if h not in reglas]
+        
+        for inicio in range(0, len(faltantes), RestriccionService.TAMANO_LOTE_HIJOS):
+            lote = faltantes[inicio:inicio + RestriccionService.TAMANO_LOTE_HIJOS]
+            por_hijo = {h: [] for h in lote}
+            
+            for restriccion in db.query(Restriccion).options(
+                selectinload(Restriccion.excepciones)
+            ).filter(
+                Restriccion.hijo_id.in_(lote),
+                Restriccion.activa == True
+            ):
+                por_hijo[restriccion.hijo_id].append(restriccion)
+            
+            for hijo_id, restricciones in por_hijo.items():
+                reglas[hijo_id] = ReglasHijo(restricciones, catalogo)
+                cache_reglas.guardar(hijo_id, reglas[hijo_id])
+        
+        return reglas
+    
+    @staticmethod
+    def conflictos(
+        db: Session,
+        hijo_id: int,
+        alimento_ids: Iterable[int],
+        fecha: date
+    ) -> List[Tuple[int, int, str]]:
+        """Alimentos de la lista que el hijo no puede recibir en esa fecha"""
+        reglas = RestriccionService.obtener_reglas(db, [hijo_id])[hijo_id]
+        return reglas.conflictos(alimento_ids, fecha)
+    
+    @staticmethod
+    def describir_conflictos(conflictos: List[Tuple[int, int, str]], reglas: ReglasHijo) -> str:
+        """Mensaje legible con los alimentos restringidos"""
+        detalle = ", ".join(
+            f"{reglas.catalogo.nombres.get(alimento_id, alimento_id)} ({descripcion})"
+            for alimento_id, _, descripcion in conflictos
+        )
+        return f"La lonchera incluye alimentos restringidos para este hijo: {detalle}"
+    
+    @staticmethod
+    def validar(
+        db: Session,
+        hijo_id: int,
+        alimento_ids: Iterable[int],
+        fecha: date
+    ):
+        """Lanzar HTTP 400 si algún alimento viola una restricción activa del hijo"""
+        reglas = RestriccionService.obtener_reglas(db, [hijo_id])[hijo_id]
+        conflictos = reglas.conflictos(alimento_ids, fecha)
+        
+        if conflictos:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=RestriccionService.describir_conflictos(conflictos, reglas)
+            )
+    
+    @staticmethod
+    def auditar_colegio(
+        db: Session,
+        colegio: str,
+        desde: Optional[date] = None
+    ) -> List[dict]:
+        """
+        Revisar todas las loncheras próximas de los hijos de un colegio
+        
+        Una consulta trae todos los alimentos de esas loncheras; las reglas se
+        compilan en lote y la verificación se hace en memoria.
+        """
+        desde = desde or date.today()
+        
+        filas = db.query(
+            Lonchera.id,
+            Lonchera.hijo_id,
+            Lonchera.fecha_asignacion,
+            LoncheraAlimento.alimento_id
+        ).join(
+            LoncheraAlimento, LoncheraAlimento.lonchera_id == Lonchera.id
+        ).join(
+            Hijo, Hijo.id == Lonchera.hijo_id
+        ).filter(
+            Hijo.colegio == colegio,
+            Lonchera.fecha_asignacion >= desde,
+            Lonchera.estado.notin_([
+                EstadoLoncheraEnum.ELIMINADA.value,
+                EstadoLoncheraEnum.ARCHIVADA.value
+            ])
+        ).all()
+        
+        reglas = RestriccionService.obtener_reglas(db, {fila.hijo_id for fila in filas})
+        
+        hallazgos = []
+        for fila in filas:
+            reglas_hijo = reglas[fila.hijo_id]
+            for alimento_id, restriccion_id, descripcion in reglas_hijo.conflictos(
+                [fila.alimento_id], fila.fecha_asignacion
+            ):
+                hallazgos.append({
+                    "lonchera_id": fila.id,
+                    "hijo_id": fila.hijo_id,
+                    "fecha": fila.fecha_asignacion,
+                    "alimento_id": alimento_id,
+                    "alimento": reglas_hijo.catalogo.nombres.get(alimento_id),
+                    "restriccion_id": restriccion_id,
+                    "restriccion": descripcion
+                })
+        
+        return hallazgos
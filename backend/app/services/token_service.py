@@ -0,0 +1,232 @@
+"""
+Servicio de Tokens - Sesiones con refresh tokens rotativos y revocación
+"""
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+from typing import Optional
+from datetime import datetime, timedelta, timezone
+import hashlib
+import secrets
+import uuid
+from backend.app.core.config import settings
+from backend.app.core.security import create_access_token
+from backend.app.core.revocacion import indice_revocacion
+from backend.app.models.models import Usuario, RefreshToken, TokenRevocado
+from fastapi import HTTPException, status
+
+
+class TokenService:
+    """
+    Servicio para emitir, rotar y revocar tokens de sesión
+    
+    El token de acceso (JWT) dura ACCESS_TOKEN_EXPIRE_MINUTES y lleva un
+    `jti` y la familia de su sesión (`fam`). El refresh token es un valor
+    aleatorio opaco; en la base de datos solo se guarda su hash. Cada
+    refresh lo reemplaza por uno nuevo de la misma familia: si se presenta
+    uno ya usado (robado y reutilizado), se revoca toda la familia.
+    """
+    
+    # Revocaciones con id menor al último cargado que aún se releen: en
+    # PostgreSQL los ids de una secuencia pueden confirmarse fuera de orden
+    VENTANA_REVOCACIONES_TARDIAS = timedelta(seconds=60)
+    
+    @staticmethod
+    def _hash(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+    
+    @staticmethod
+    def _nuevo_refresh(
+        db: Session,
+        usuario_id: int,
+        familia: str,
+        familia_expira_en: datetime
+    ) -> str:
+        """Crear (sin commit) un refresh token y retornar su valor en claro"""
+        token = secrets.token_urlsafe(32)
+        ahora = datetime.utcnow()
+        
+        db.add(RefreshToken(
+            usuario_id=usuario_id,
+            token_hash=TokenService._hash(token),
+            familia=familia,
+            expira_en=min(
+                ahora + timedelta(minutes=settings.SESSION_TIMEOUT_MINUTES),
+                familia_expira_en
+            ),
+            familia_expira_en=familia_expira_en
+        ))
+        
+        return token
+    
+    @staticmethod
+    def _respuesta(usuario: Usuario, familia: str, refresh_token: str) -> dict:
+        access_token = create_access_token(
+            data={"sub": str(usuario.id), "fam": familia},
+            expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+        )
+        
+        return {
+            "access_token": access_token,
+            "refresh_token": refresh_token,
+            "token_type": "bearer",
+            "expires_in": settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+            "user_info": usuario
+        }
+    
+    @staticmethod
+    def iniciar_sesion(db: Session, usuario: Usuario) -> dict:
+        """Emitir el token de acceso y el primer refresh token de una sesión nueva"""
+        familia = uuid.uuid4().hex
+        familia_expira_en = datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+        
+        refresh_token = TokenService._nuevo_refresh(db, usuario.id, familia, familia_expira_en)
+        db.commit()
+        
+        return TokenService._respuesta(usuario, familia, refresh_token)
+    
+    @staticmethod
+    def refrescar(db: Session, refresh_token: str) -> dict:
+        """Canjear un refresh token por un token de acceso y un refresh token nuevos"""
+        credenciales_invalidas = HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Refresh token inválido o expirado",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+        
+        actual = db.query(RefreshToken).filter(
+            RefreshToken.token_hash == TokenService._hash(refresh_token)
+        ).first()
+        
+        if actual is None or actual.revocado_en is not None:
+            raise credenciales_invalidas
+        
+        ahora = datetime.utcnow()
+        
+        # Marcar como usado solo si nadie lo usó antes (atómico entre peticiones)
+        marcado = db.query(RefreshToken).filter(
+            RefreshToken.id == actual.id,
+            RefreshToken.usado_en.is_(None)
+        ).update({RefreshToken.usado_en: ahora}, synchronize_session=False)
+        
+        if not marcado:
+            # Reutilización de un token ya rotado: la sesión está comprometida
+            TokenService.revocar_familia(db, actual.familia)
+            db.commit()
+            raise credenciales_invalidas
+        
+        if TokenService._naive(actual.expira_en) <= ahora:
+            db.commit()
+            raise credenciales_invalidas
+        
+        usuario = db.query(Usuario).filter(Usuario.id == actual.usuario_id).first()
+        
+        if usuario is None or not usuario.activo:
+            TokenService.revocar_familia(db, actual.familia)
+            db.commit()
+            raise credenciales_invalidas
+        
+        nuevo = TokenService._nuevo_refresh(
+            db, usuario.id, actual.familia, TokenService._naive(actual.familia_expira_en)
+        )
+        db.commit()
+        
+        return TokenService._respuesta(usuario, actual.familia, nuevo)
+    
+    @staticmethod
+    def cerrar_sesion(db: Session, payload: dict):
+        """Revocar el token de acceso actual y los refresh tokens de su sesión"""
+        if payload.get("fam"):
+            TokenService.revocar_familia(db, payload["fam"])
+        
+        if payload.get("jti"):
+            TokenService.revocar_acceso(db, payload["jti"], float(payload["exp"]))
+        
+        db.commit()
+    
+    @staticmethod
+    def revocar_familia(db: Session, familia: str):
+        """Revocar (sin commit) todos los refresh tokens de una sesión"""
+        db.query(RefreshToken).filter(
+            RefreshToken.familia == familia,
+            RefreshToken.revocado_en.is_(None)
+        ).update({RefreshToken.revocado_en: datetime.utcnow()}, synchronize_session=False)
+    
+    @staticmethod
+    def revocar_acceso(db: Session, jti: str, expira: float):
+        """
+        Revocar un token de acceso hasta su expiración: en el índice en
+        memoria de este proceso y en la tabla (sin commit) para los demás
+        """
+        indice_revocacion.revocar(jti, expira)
+        
+        if not db.query(TokenRevocado.id).filter(TokenRevocado.jti == jti).first():
+            db.add(TokenRevocado(
+                jti=jti,
+                expira_en=datetime.fromtimestamp(expira, tz=timezone.utc).replace(tzinfo=None)
+            ))
+    
+    @staticmethod
+    def sincronizar_revocaciones(db: Session) -> int:
+        """
+        Cargar en el índice en memoria las revocaciones nuevas (las hechas
+        por otros procesos)
+        
+        Solo lee: las de id mayor al último cargado y las creadas dentro de
+        VENTANA_REVOCACIONES_TARDIAS (una con id menor confirmada tarde). Las
+        filas expiradas las borra `purgar_expirados`, en otra tarea.
+        Retorna cuántas revocaciones nuevas se cargaron.
+        """
+        ahora = datetime.utcnow()
+        
+        filas = db.query(TokenRevocado.id, TokenRevocado.jti, TokenRevocado.expira_en).filter(
+            TokenRevocado.expira_en > ahora,
+            or_(
+                TokenRevocado.id > indice_revocacion.ultimo_id,
+                TokenRevocado.created_at >= ahora - TokenService.VENTANA_REVOCACIONES_TARDIAS
+            )
+        ).all()
+        
+        nuevas = 0
+        for fila in filas:
+            nuevas += indice_revocacion.revocar(
+                fila.jti,
+                TokenService._naive(fila.expira_en).replace(tzinfo=timezone.utc).timestamp()
+            )
+        
+        if filas:
+            indice_revocacion.ultimo_id = max(
+                indice_revocacion.ultimo_id, max(fila.id for fila in filas)
+            )
+        
+        indice_revocacion.purgar()
+        
+        return nuevas
+    
+    @staticmethod
+    def purgar_expirados(db: Session) -> int:
+        """
+        Borrar las revocaciones y las sesiones expiradas (mantenimiento)
+        
+        Si no hay filas expiradas no escribe ni toma el bloqueo de escritura.
+        Retorna cuántas filas se borraron.
+        """
+        ahora = datetime.utcnow()
+        
+        revocaciones = db.query(TokenRevocado).filter(TokenRevocado.expira_en <= ahora)
+        sesiones = db.query(RefreshToken).filter(RefreshToken.familia_expira_en <= ahora)
+        
+        if revocaciones.first() is None and sesiones.first() is None:
+            return 0
+        
+        borradas = revocaciones.delete(synchronize_session=False)
+        borradas += sesiones.delete(synchronize_session=False)
+        db.commit()
+        
+        return borradas
+    
+    @staticmethod
+    def _naive(valor: Optional[datetime]) -> Optional[datetime]:
+        """Fecha en UTC sin zona horaria (SQLite y PostgreSQL la devuelven distinto)"""
+        if valor is not None and valor.tzinfo is not None:
+            return valor.astimezone(timezone.utc).replace(tzinfo=None)
+        return valor
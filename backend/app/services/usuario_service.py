@@ -2,12 +2,14 @@
 Servicio de Usuario - Lógica de negocio
 """
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
 from sqlalchemy import or_
 from typing import Optional, List
-from datetime import datetime
 from backend.app.models.models import Usuario, Rol
 from backend.app.schemas.usuario import UsuarioCreate, UsuarioUpdate
 from backend.app.core.security import get_password_hash, verify_password
+from backend.app.core.hashing import verify_password_async
+from backend.app.services.registro_accesos import buffer_accesos
 from fastapi import HTTPException, status
 
 
@@ -160,26 +162,54 @@ class UsuarioService:
     @staticmethod
     def authenticate(db: Session, email: str, password: str) -> Optional[Usuario]:
         """Autenticar usuario"""
-        usuario = UsuarioService.get_by_email(db, email)
+        usuario = UsuarioService._usuario_para_login(db, email)
         
-        if not usuario:
+        if not usuario or not verify_password(password, usuario.password_hash):
             return None
         
-        if not usuario.activo:
+        UsuarioService._registrar_acceso(db, usuario)
+        
+        return usuario
+    
+    @staticmethod
+    async def authenticate_async(db: Session, email: str, password: str) -> Optional[Usuario]:
+        """
+        Autenticar usuario desde un handler async
+        
+        La verificación de bcrypt se ejecuta en el pool de hashing, así que
+        el event loop sigue atendiendo otras peticiones mientras tanto.
+        """
+        usuario = UsuarioService._usuario_para_login(db, email)
+        
+        if not usuario or not await verify_password_async(password, usuario.password_hash):
+            return None
+        
+        UsuarioService._registrar_acceso(db, usuario)
+        
+        return usuario
+    
+    @staticmethod
+    def _usuario_para_login(db: Session, email: str) -> Optional[Usuario]:
+        """Usuario con ese email (None si no existe; 403 si está desactivado)"""
+        usuario = UsuarioService.get_by_email(db, email)
+        
+        if usuario and not usuario.activo:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Usuario desactivado"
             )
         
-        if not verify_password(password, usuario.password_hash):
-            return None
-        
-        # Actualizar último acceso
-        usuario.ultimo_acceso = datetime.utcnow()
-        db.commit()
-        
         return usuario
     
+    @staticmethod
+    def _registrar_acceso(db: Session, usuario: Usuario):
+        """
+        Registrar el último acceso en el buffer (se guarda en el siguiente
+        volcado) y reflejarlo en la instancia sin marcarla como modificada
+        """
+        momento = buffer_accesos.registrar(usuario.id)
+        set_committed_value(usuario, "ultimo_acceso", momento)
+    
     @staticmethod
     def search(
         db: Session, 
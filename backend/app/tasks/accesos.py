@@ -0,0 +1,32 @@
+"""
+Tarea de volcado del último acceso de los usuarios
+Guarda en la base de datos los accesos acumulados en memoria
+"""
+import asyncio
+import logging
+from backend.app.core.config import settings
+from backend.app.database.connection import SessionLocal
+from backend.app.services.registro_accesos import buffer_accesos
+
+logger = logging.getLogger(__name__)
+
+
+def volcar_accesos() -> int:
+    """Guardar los accesos pendientes en un solo UPDATE por lotes"""
+    db = SessionLocal()
+    
+    try:
+        return buffer_accesos.vaciar(db)
+    finally:
+        db.close()
+
+
+async def programar_volcado():
+    """Volcar cada ULTIMO_ACCESO_VOLCADO_SEGUNDOS sin bloquear el event loop"""
+    while True:
+        await asyncio.sleep(settings.ULTIMO_ACCESO_VOLCADO_SEGUNDOS)
+        
+        try:
+            await asyncio.to_thread(volcar_accesos)
+        except Exception:
+            logger.exception("Error al guardar el último acceso de los usuarios")
@@ -0,0 +1,64 @@
+"""
+Tarea de archivado automático de loncheras vencidas
+Puede ejecutarse periódicamente desde la aplicación o como script
+"""
+import asyncio
+import logging
+from datetime import date
+from typing import Optional
+from backend.app.core.config import settings
+from backend.app.database.connection import SessionLocal
+from backend.app.services.lonchera_service import LoncheraService
+
+logger = logging.getLogger(__name__)
+
+# Métricas de la última ejecución (None si aún no se ha ejecutado)
+ultima_ejecucion: Optional[dict] = None
+
+
+def ejecutar_archivado(hoy: Optional[date] = None) -> dict:
+    """Archivar las loncheras vencidas y registrar las métricas"""
+    global ultima_ejecucion
+    
+    db = SessionLocal()
+    
+    try:
+        resultado = LoncheraService.archivar_vencidas(
+            db,
+            hoy=hoy,
+            tamano_lote=settings.ARCHIVADO_TAMANO_LOTE
+        )
+    finally:
+        db.close()
+    
+    ultima_ejecucion = resultado
+    logger.info(
+        "Archivado de loncheras: %s archivadas en %s lotes (%.3f s)",
+        resultado["archivadas"],
+        resultado["lotes"],
+        resultado["duracion_segundos"]
+    )
+    
+    return resultado
+
+
+async def programar_archivado():
+    """Ejecutar el archivado cada ARCHIVADO_INTERVALO_MINUTOS sin bloquear el event loop"""
+    while True:
+        try:
+            await asyncio.to_thread(ejecutar_archivado)
+        except Exception:
+            logger.exception("Error en el archivado automático de loncheras")
+        
+        await asyncio.sleep(settings.ARCHIVADO_INTERVALO_MINUTOS * 60)
+
+
+if __name__ == "__main__":
+    print("Archivando loncheras vencidas...")
+    
+    try:
+        resultado = ejecutar_archivado()
+        print(f"✓ {resultado['archivadas']} loncheras archivadas "
+              f"en {resultado['lotes']} lotes ({resultado['duracion_segundos']} s)")
+    except Exception as e:
+        print(f"❌ Error al archivar loncheras: {e}")
@@ -0,0 +1,32 @@
+"""
+Tarea de recálculo de la popularidad del autocompletado
+Reconstruye el índice de prefijos fuera de las peticiones
+"""
+import asyncio
+import logging
+from backend.app.core.config import settings
+from backend.app.database.connection import SessionLocal
+from backend.app.services.autocompletado import refrescar_popularidad
+
+logger = logging.getLogger(__name__)
+
+
+def recalcular_popularidad():
+    """Contar las loncheras de cada alimento y reconstruir el índice"""
+    db = SessionLocal()
+    
+    try:
+        refrescar_popularidad(db)
+    finally:
+        db.close()
+
+
+async def programar_popularidad():
+    """Recalcular al arrancar y cada AUTOCOMPLETADO_TTL_SEGUNDOS sin bloquear el event loop"""
+    while True:
+        try:
+            await asyncio.to_thread(recalcular_popularidad)
+        except Exception:
+            logger.exception("Error al recalcular la popularidad del autocompletado")
+        
+        await asyncio.sleep(settings.AUTOCOMPLETADO_TTL_SEGUNDOS)
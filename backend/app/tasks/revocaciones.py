@@ -0,0 +1,58 @@
+"""
+Tareas del índice de tokens revocados
+Carga en memoria las revocaciones hechas por otros procesos (solo lectura) y,
+con mucha menos frecuencia, borra las revocaciones y sesiones expiradas
+"""
+import asyncio
+import logging
+from backend.app.core.config import settings
+from backend.app.database.connection import SessionLocal
+from backend.app.services.token_service import TokenService
+
+logger = logging.getLogger(__name__)
+
+
+def sincronizar_revocaciones() -> int:
+    """Cargar las revocaciones nuevas"""
+    db = SessionLocal()
+    
+    try:
+        return TokenService.sincronizar_revocaciones(db)
+    finally:
+        db.close()
+
+
+async def programar_sincronizacion():
+    """Sincronizar cada REVOCACION_SINCRONIZACION_SEGUNDOS sin bloquear el event loop"""
+    while True:
+        try:
+            cargadas = await asyncio.to_thread(sincronizar_revocaciones)
+            if cargadas:
+                logger.info("Tokens revocados cargados de otros procesos: %s", cargadas)
+        except Exception:
+            logger.exception("Error al sincronizar los tokens revocados")
+        
+        await asyncio.sleep(settings.REVOCACION_SINCRONIZACION_SEGUNDOS)
+
+
+def purgar_expirados() -> int:
+    """Borrar las revocaciones y sesiones expiradas"""
+    db = SessionLocal()
+    
+    try:
+        return TokenService.purgar_expirados(db)
+    finally:
+        db.close()
+
+
+async def programar_purga():
+    """Purgar cada REVOCACION_PURGA_SEGUNDOS sin bloquear el event loop"""
+    while True:
+        await asyncio.sleep(settings.REVOCACION_PURGA_SEGUNDOS)
+        
+        try:
+            borradas = await asyncio.to_thread(purgar_expirados)
+            if borradas:
+                logger.info("Revocaciones y sesiones expiradas borradas: %s", borradas)
+        except Exception:
+            logger.exception("Error al borrar las revocaciones y sesiones expiradas")
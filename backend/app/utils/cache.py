@@ -0,0 +1,99 @@
+"""
+Cache en memoria LRU con expiración (TTL) y contadores de uso
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Iterable, Optional
+
+
+class CacheLRU:
+    """
+    Cache acotado: al llenarse descarta la entrada usada hace más tiempo
+    
+    Cada entrada puede llevar una versión; si al leerla se pide otra versión
+    se considera obsoleta y se descarta. Es seguro entre hilos.
+    """
+    
+    def __init__(self, capacidad: int, ttl_segundos: float):
+        self.capacidad = capacidad
+        self.ttl_segundos = ttl_segundos
+        self._entradas: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.obsoletas = 0
+        self.expiradas = 0
+        self.desalojadas = 0
+        self.invalidadas = 0
+    
+    def obtener(self, clave: Hashable, version: Optional[int] = None) -> Optional[Any]:
+        """Valor guardado para la clave, o None si no está, expiró o es de otra versión"""
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            
+            if entrada is None:
+                self.fallos += 1
+                return None
+            
+            valor, version_guardada, expira = entrada
+            
+            if expira < time.monotonic():
+                del self._entradas[clave]
+                self.expiradas += 1
+                self.fallos += 1
+                return None
+            
+            if version is not None and version_guardada != version:
+                del self._entradas[clave]
+                self.obsoletas += 1
+                self.fallos += 1
+                return None
+            
+            self._entradas.move_to_end(clave)
+            self.aciertos += 1
+            return valor
+    
+    def guardar(self, clave: Hashable, valor: Any, version: Optional[int] = None):
+        """Guardar un valor, desalojando el menos usado si el cache está lleno"""
+        with self._lock:
+            self._entradas[clave] = (valor, version, time.monotonic() + self.ttl_segundos)
+            self._entradas.move_to_end(clave)
+            
+            while len(self._entradas) > self.capacidad:
+                self._entradas.popitem(last=False)
+                self.desalojadas += 1
+    
+    def invalidar(self, *claves: Hashable):
+        """Descartar las entradas de las claves indicadas"""
+        self.invalidar_muchas(claves)
+    
+    def invalidar_muchas(self, claves: Iterable[Hashable]):
+        """Descartar las entradas de una colección de claves"""
+        with self._lock:
+            for clave in claves:
+                if self._entradas.pop(clave, None) is not None:
+                    self.invalidadas += 1
+    
+    def limpiar(self):
+        """Descartar todas las entradas"""
+        with self._lock:
+            self.invalidadas += len(self._entradas)
+            self._entradas.clear()
+    
+    def estadisticas(self) -> dict:
+        """Contadores de uso para dimensionar el cache"""
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                "capacidad": self.capacidad,
+                "ttl_segundos": self.ttl_segundos,
+                "entradas": len(self._entradas),
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "tasa_aciertos": round(self.aciertos / consultas, 4) if consultas else 0.0,
+                "obsoletas": self.obsoletas,
+                "expiradas": self.expiradas,
+                "desalojadas": self.desalojadas,
+                "invalidadas": self.invalidadas
+            }
@@ -0,0 +1,32 @@
+"""
+Utilidades de ETag para peticiones condicionales (If-None-Match)
+"""
+from typing import Optional
+from fastapi import Response, status
+
+
+def etag_lonchera(lonchera_id: int, version: int, representacion: str = "") -> str:
+    """ETag fuerte de una representación de la lonchera en una versión dada"""
+    return f'"l{lonchera_id}-v{version}{representacion}"'
+
+
+def coincide(if_none_match: Optional[str], etag: str) -> bool:
+    """Comparar el encabezado If-None-Match con un ETag (comparación débil)"""
+    if not if_none_match:
+        return False
+    
+    if if_none_match.strip() == "*":
+        return True
+    
+    return any(
+        candidato.strip().removeprefix("W/") == etag
+        for candidato in if_none_match.split(",")
+    )
+
+
+def no_modificado(etag: str) -> Response:
+    """Respuesta 304 sin cuerpo para una representación que el cliente ya tiene"""
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED,
+        headers={"ETag": etag, "Cache-Control": "private, no-cache"}
+    )
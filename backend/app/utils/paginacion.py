@@ -0,0 +1,26 @@
+"""
+Utilidades de paginación por cursor (keyset)
+"""
+import base64
+from datetime import date
+from typing import Tuple
+from fastapi import HTTPException, status
+
+
+def codificar_cursor(fecha: date, id: int) -> str:
+    """Codificar la posición (fecha, id) de la última fila de una página"""
+    valor = f"{fecha.isoformat()}|{id}".encode()
+    return base64.urlsafe_b64encode(valor).decode().rstrip("=")
+
+
+def decodificar_cursor(cursor: str) -> Tuple[date, int]:
+    """Decodificar un cursor generado por codificar_cursor"""
+    try:
+        relleno = "=" * (-len(cursor) % 4)
+        fecha, id = base64.urlsafe_b64decode(cursor + relleno).decode().split("|")
+        return date.fromisoformat(fecha), int(id)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor de paginación inválido"
+        )
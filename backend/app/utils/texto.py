@@ -0,0 +1,21 @@
+"""
+Utilidades de normalización de texto
+"""
+import re
+import unicodedata
+from typing import List
+
+_PATRON_PALABRA = re.compile(r"[a-z0-9]+")
+
+
+def normalizar(texto: str) -> str:
+    """Pasar a minúsculas y quitar tildes ("Plátano" -> "platano")"""
+    if not texto:
+        return ""
+    descompuesto = unicodedata.normalize("NFKD", texto.lower())
+    return "".join(c for c in descompuesto if not unicodedata.combining(c))
+
+
+def palabras(texto: str) -> List[str]:
+    """Dividir un texto normalizado en palabras alfanuméricas"""
+    return _PATRON_PALABRA.findall(normalizar(texto))
@@ -0,0 +1,66 @@
+"""
+Entorno de Alembic: usa settings.DATABASE_URL, o la conexión que pasa
+backend/app/database/migraciones.py al migrar desde la aplicación
+"""
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import create_engine
+
+from backend.app.core.config import settings
+from backend.app.database.connection import Base
+import backend.app.models.models  # noqa: F401 (registra las tablas en Base.metadata)
+
+config = context.config
+
+if config.config_file_name is not None and config.attributes.get("connection") is None:
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+
+def run_migrations_offline():
+    """Generar el SQL de las migraciones sin conectarse a la base de datos"""
+    context.configure(
+        url=settings.DATABASE_URL,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        render_as_batch=True
+    )
+    
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    """Aplicar las migraciones sobre la conexión de la aplicación o una nueva"""
+    conexion = config.attributes.get("connection")
+    
+    if conexion is not None:
+        _migrar(conexion)
+        return
+    
+    engine = create_engine(settings.DATABASE_URL)
+    try:
+        with engine.connect() as conexion:
+            _migrar(conexion)
+    finally:
+        engine.dispose()
+
+
+def _migrar(conexion):
+    # render_as_batch: SQLite no soporta ALTER de restricciones (recrea la tabla)
+    context.configure(
+        connection=conexion,
+        target_metadata=target_metadata,
+        render_as_batch=True
+    )
+    
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,239 @@
+"""Esquema base (tablas anteriores a las migraciones)
+
+Las bases de datos creadas antes de Alembic con Base.metadata.create_all ya
+tienen estas tablas: backend/app/database/migraciones.py las marca en esta
+revisión (stamp) y aplica las siguientes.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('alimentos',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('nombre', sa.String(length=100), nullable=False),
+    sa.Column('tipo', sa.String(length=50), nullable=False),
+    sa.Column('descripcion', sa.Text(), nullable=True),
+    sa.Column('calorias', sa.Float(), nullable=False),
+    sa.Column('proteinas', sa.Float(), nullable=False),
+    sa.Column('carbohidratos', sa.Float(), nullable=False),
+    sa.Column('grasas', sa.Float(), nullable=True),
+    sa.Column('fibra', sa.Float(), nullable=True),
+    sa.Column('estado', sa.String(length=20), nullable=True),
+    sa.Column('imagen_url', sa.String(length=255), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_alimentos_id'), 'alimentos', ['id'], unique=False)
+    op.create_table('bitacora',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('usuario_id', sa.Integer(), nullable=True),
+    sa.Column('accion', sa.String(length=100), nullable=False),
+    sa.Column('entidad', sa.String(length=50), nullable=False),
+    sa.Column('entidad_id', sa.Integer(), nullable=True),
+    sa.Column('detalles', sa.Text(), nullable=True),
+    sa.Column('ip_address', sa.String(length=50), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_bitacora_id'), 'bitacora', ['id'], unique=False)
+    op.create_table('roles',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('nombre', sa.String(length=50), nullable=False),
+    sa.Column('descripcion', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('nombre')
+    )
+    op.create_index(op.f('ix_roles_id'), 'roles', ['id'], unique=False)
+    op.create_table('tipos_membresia',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('nombre', sa.String(length=50), nullable=False),
+    sa.Column('descripcion', sa.Text(), nullable=True),
+    sa.Column('max_direcciones', sa.Integer(), nullable=True),
+    sa.Column('permite_personalizacion', sa.Boolean(), nullable=True),
+    sa.Column('permite_restricciones', sa.Boolean(), nullable=True),
+    sa.Column('permite_estadisticas_avanzadas', sa.Boolean(), nullable=True),
+    sa.Column('precio_mensual', sa.Float(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('nombre')
+    )
+    op.create_index(op.f('ix_tipos_membresia_id'), 'tipos_membresia', ['id'], unique=False)
+    op.create_table('historial_alimentos',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('alimento_id', sa.Integer(), nullable=False),
+    sa.Column('accion', sa.String(length=50), nullable=False),
+    sa.Column('usuario_accion', sa.String(length=100), nullable=True),
+    sa.Column('datos_anteriores', sa.Text(), nullable=True),
+    sa.Column('motivo', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['alimento_id'], ['alimentos.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_historial_alimentos_id'), 'historial_alimentos', ['id'], unique=False)
+    op.create_table('inventario',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('alimento_id', sa.Integer(), nullable=False),
+    sa.Column('cantidad_disponible', sa.Integer(), nullable=True),
+    sa.Column('cantidad_minima', sa.Integer(), nullable=True),
+    sa.Column('unidad_medida', sa.String(length=20), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['alimento_id'], ['alimentos.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('alimento_id')
+    )
+    op.create_index(op.f('ix_inventario_id'), 'inventario', ['id'], unique=False)
+    op.create_table('usuarios',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('email', sa.String(length=100), nullable=False),
+    sa.Column('password_hash', sa.String(length=255), nullable=False),
+    sa.Column('nombre', sa.String(length=100), nullable=False),
+    sa.Column('apellido', sa.String(length=100), nullable=False),
+    sa.Column('telefono', sa.String(length=20), nullable=True),
+    sa.Column('fecha_registro', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('ultimo_acceso', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('activo', sa.Boolean(), nullable=True),
+    sa.Column('rol_id', sa.Integer(), nullable=False),
+    sa.Column('tipo_membresia_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['rol_id'], ['roles.id'], ),
+    sa.ForeignKeyConstraint(['tipo_membresia_id'], ['tipos_membresia.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_usuarios_email'), 'usuarios', ['email'], unique=True)
+    op.create_index(op.f('ix_usuarios_id'), 'usuarios', ['id'], unique=False)
+    op.create_table('direcciones',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('nombre', sa.String(length=100), nullable=False),
+    sa.Column('direccion_linea1', sa.String(length=200), nullable=False),
+    sa.Column('direccion_linea2', sa.String(length=200), nullable=True),
+    sa.Column('barrio', sa.String(length=100), nullable=False),
+    sa.Column('ciudad', sa.String(length=100), nullable=False),
+    sa.Column('codigo_postal', sa.String(length=20), nullable=True),
+    sa.Column('referencia', sa.Text(), nullable=True),
+    sa.Column('es_principal', sa.Boolean(), nullable=True),
+    sa.Column('usuario_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['usuario_id'], ['usuarios.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_direcciones_id'), 'direcciones', ['id'], unique=False)
+    op.create_table('hijos',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('nombre', sa.String(length=100), nullable=False),
+    sa.Column('apellido', sa.String(length=100), nullable=False),
+    sa.Column('fecha_nacimiento', sa.Date(), nullable=False),
+    sa.Column('grado_escolar', sa.String(length=50), nullable=True),
+    sa.Column('colegio', sa.String(length=150), nullable=True),
+    sa.Column('observaciones', sa.Text(), nullable=True),
+    sa.Column('activo', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('padre_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['padre_id'], ['usuarios.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_hijos_id'), 'hijos', ['id'], unique=False)
+    op.create_table('inventario_movimientos',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('inventario_id', sa.Integer(), nullable=False),
+    sa.Column('tipo_movimiento', sa.String(length=20), nullable=False),
+    sa.Column('cantidad', sa.Integer(), nullable=False),
+    sa.Column('motivo', sa.Text(), nullable=True),
+    sa.Column('usuario_registro', sa.String(length=100), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['inventario_id'], ['inventario.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_inventario_movimientos_id'), 'inventario_movimientos', ['id'], unique=False)
+    op.create_table('loncheras',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('nombre', sa.String(length=100), nullable=False),
+    sa.Column('descripcion', sa.Text(), nullable=True),
+    sa.Column('fecha_asignacion', sa.Date(), nullable=False),
+    sa.Column('estado', sa.String(length=20), nullable=True),
+    sa.Column('es_predeterminada', sa.Boolean(), nullable=True),
+    sa.Column('hijo_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['hijo_id'], ['hijos.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_loncheras_id'), 'loncheras', ['id'], unique=False)
+    op.create_table('restricciones',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('tipo', sa.String(length=50), nullable=False),
+    sa.Column('descripcion', sa.Text(), nullable=False),
+    sa.Column('severidad', sa.String(length=20), nullable=False),
+    sa.Column('activa', sa.Boolean(), nullable=True),
+    sa.Column('hijo_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['hijo_id'], ['hijos.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_restricciones_id'), 'restricciones', ['id'], unique=False)
+    op.create_table('excepciones',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('motivo', sa.Text(), nullable=False),
+    sa.Column('fecha_inicio', sa.Date(), nullable=False),
+    sa.Column('fecha_fin', sa.Date(), nullable=True),
+    sa.Column('autorizado_por', sa.String(length=100), nullable=True),
+    sa.Column('restriccion_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    sa.ForeignKeyConstraint(['restriccion_id'], ['restricciones.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_excepciones_id'), 'excepciones', ['id'], unique=False)
+    op.create_table('lonchera_alimento',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('lonchera_id', sa.Integer(), nullable=False),
+    sa.Column('alimento_id', sa.Integer(), nullable=False),
+    sa.Column('cantidad', sa.Integer(), nullable=True),
+    sa.Column('notas', sa.Text(), nullable=True),
+    sa.ForeignKeyConstraint(['alimento_id'], ['alimentos.id'], ),
+    sa.ForeignKeyConstraint(['lonchera_id'], ['loncheras.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_lonchera_alimento_id'), 'lonchera_alimento', ['id'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_lonchera_alimento_id'), table_name='lonchera_alimento')
+    op.drop_table('lonchera_alimento')
+    op.drop_index(op.f('ix_excepciones_id'), table_name='excepciones')
+    op.drop_table('excepciones')
+    op.drop_index(op.f('ix_restricciones_id'), table_name='restricciones')
+    op.drop_table('restricciones')
+    op.drop_index(op.f('ix_loncheras_id'), table_name='loncheras')
+    op.drop_table('loncheras')
+    op.drop_index(op.f('ix_inventario_movimientos_id'), table_name='inventario_movimientos')
+    op.drop_table('inventario_movimientos')
+    op.drop_index(op.f('ix_hijos_id'), table_name='hijos')
+    op.drop_table('hijos')
+    op.drop_index(op.f('ix_direcciones_id'), table_name='direcciones')
+    op.drop_table('direcciones')
+    op.drop_index(op.f('ix_usuarios_id'), table_name='usuarios')
+    op.drop_index(op.f('ix_usuarios_email'), table_name='usuarios')
+    op.drop_table('usuarios')
+    op.drop_index(op.f('ix_inventario_id'), table_name='inventario')
+    op.drop_table('inventario')
+    op.drop_index(op.f('ix_historial_alimentos_id'), table_name='historial_alimentos')
+    op.drop_table('historial_alimentos')
+    op.drop_index(op.f('ix_tipos_membresia_id'), table_name='tipos_membresia')
+    op.drop_table('tipos_membresia')
+    op.drop_index(op.f('ix_roles_id'), table_name='roles')
+    op.drop_table('roles')
+    op.drop_index(op.f('ix_bitacora_id'), table_name='bitacora')
+    op.drop_table('bitacora')
+    op.drop_index(op.f('ix_alimentos_id'), table_name='alimentos')
+    op.drop_table('alimentos')
@@ -0,0 +1,271 @@
+"""Totales materializados de loncheras, resúmenes diarios y sesiones
+
+- loncheras: totales nutricionales, version (ETag), confirmada_en,
+  plantilla_id e índice (hijo_id, fecha_asignacion)
+- lonchera_alimento: restricción única (lonchera_id, alimento_id), destino
+  de los upserts; antes se fusionan las filas repetidas
+- tablas resumenes_diarios_hijo, refresh_tokens y tokens_revocados
+
+Los totales, confirmada_en y los resúmenes diarios se calculan desde los
+datos existentes. Cada paso comprueba el esquema actual, así que también
+puede aplicarse a una base creada con create_all después de estos cambios.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+import json
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+# (columna, tipo, valor inicial) de los totales materializados
+TOTALES = [
+    ("total_calorias", sa.Float(), "0"),
+    ("total_proteinas", sa.Float(), "0"),
+    ("total_carbohidratos", sa.Float(), "0"),
+    ("total_grasas", sa.Float(), "0"),
+    ("total_fibra", sa.Float(), "0"),
+    ("num_alimentos", sa.Integer(), "0"),
+]
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    tablas = set(inspector.get_table_names())
+    
+    _crear_tablas(tablas)
+    
+    columnas = {c["name"] for c in inspector.get_columns("loncheras")}
+    indices = {i["name"] for i in inspector.get_indexes("loncheras")}
+    
+    with op.batch_alter_table("loncheras") as batch:
+        for nombre, tipo, inicial in TOTALES:
+            if nombre not in columnas:
+                batch.add_column(sa.Column(nombre, tipo, nullable=False, server_default=inicial))
+        if "version" not in columnas:
+            batch.add_column(sa.Column("version", sa.Integer(), nullable=False, server_default="1"))
+        if "confirmada_en" not in columnas:
+            batch.add_column(sa.Column("confirmada_en", sa.DateTime(timezone=True), nullable=True))
+        if "plantilla_id" not in columnas:
+            batch.add_column(sa.Column("plantilla_id", sa.Integer(), nullable=True))
+            batch.create_foreign_key(
+                "fk_loncheras_plantilla_id", "loncheras", ["plantilla_id"], ["id"]
+            )
+        if "ix_loncheras_hijo_fecha" not in indices:
+            batch.create_index("ix_loncheras_hijo_fecha", ["hijo_id", "fecha_asignacion"])
+        if "ix_loncheras_plantilla_id" not in indices:
+            batch.create_index("ix_loncheras_plantilla_id", ["plantilla_id"])
+    
+    unicas = {
+        tuple(u["column_names"]) for u in inspector.get_unique_constraints("lonchera_alimento")
+    }
+    if ("lonchera_id", "alimento_id") not in unicas:
+        _fusionar_repetidos()
+        with op.batch_alter_table("lonchera_alimento") as batch:
+            batch.create_unique_constraint(
+                "uq_lonchera_alimento", ["lonchera_id", "alimento_id"]
+            )
+    
+    _calcular_totales()
+    
+    # Las confirmadas antes de esta migración no guardaban el momento
+    op.execute(
+        "UPDATE loncheras SET confirmada_en = COALESCE(updated_at, created_at, CURRENT_TIMESTAMP) "
+        "WHERE estado = 'Confirmada' AND confirmada_en IS NULL"
+    )
+    
+    _calcular_resumenes()
+
+
+def downgrade():
+    with op.batch_alter_table("lonchera_alimento") as batch:
+        batch.drop_constraint("uq_lonchera_alimento", type_="unique")
+    
+    with op.batch_alter_table("loncheras") as batch:
+        batch.drop_index("ix_loncheras_plantilla_id")
+        batch.drop_index("ix_loncheras_hijo_fecha")
+        batch.drop_constraint("fk_loncheras_plantilla_id", type_="foreignkey")
+        batch.drop_column("plantilla_id")
+        batch.drop_column("confirmada_en")
+        batch.drop_column("version")
+        for nombre, _, _ in reversed(TOTALES):
+            batch.drop_column(nombre)
+    
+    op.drop_index("ix_resumenes_diarios_hijo_id", table_name="resumenes_diarios_hijo")
+    op.drop_table("resumenes_diarios_hijo")
+    op.drop_index("ix_refresh_tokens_usuario_id", table_name="refresh_tokens")
+    op.drop_index("ix_refresh_tokens_token_hash", table_name="refresh_tokens")
+    op.drop_index("ix_refresh_tokens_id", table_name="refresh_tokens")
+    op.drop_index("ix_refresh_tokens_familia", table_name="refresh_tokens")
+    op.drop_table("refresh_tokens")
+    op.drop_index("ix_tokens_revocados_id", table_name="tokens_revocados")
+    op.drop_index("ix_tokens_revocados_expira_en", table_name="tokens_revocados")
+    op.drop_table("tokens_revocados")
+
+
+def _crear_tablas(tablas):
+    """Tablas nuevas (resúmenes diarios y sesiones) que aún no existen"""
+    if "resumenes_diarios_hijo" not in tablas:
+        op.create_table(
+            "resumenes_diarios_hijo",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("hijo_id", sa.Integer(), nullable=False),
+            sa.Column("fecha", sa.Date(), nullable=False),
+            sa.Column("num_loncheras", sa.Integer(), nullable=False),
+            sa.Column("total_calorias", sa.Float(), nullable=False),
+            sa.Column("total_proteinas", sa.Float(), nullable=False),
+            sa.Column("total_carbohidratos", sa.Float(), nullable=False),
+            sa.Column("total_grasas", sa.Float(), nullable=False),
+            sa.Column("total_fibra", sa.Float(), nullable=False),
+            sa.Column("num_alimentos", sa.Integer(), nullable=False),
+            sa.Column("distribucion_tipos", sa.Text(), nullable=True),
+            sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+            sa.ForeignKeyConstraint(["hijo_id"], ["hijos.id"]),
+            sa.PrimaryKeyConstraint("id"),
+            sa.UniqueConstraint("hijo_id", "fecha", name="uq_resumen_diario_hijo_fecha")
+        )
+        op.create_index("ix_resumenes_diarios_hijo_id", "resumenes_diarios_hijo", ["id"])
+    
+    if "refresh_tokens" not in tablas:
+        op.create_table(
+            "refresh_tokens",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("usuario_id", sa.Integer(), nullable=False),
+            sa.Column("token_hash", sa.String(length=64), nullable=False),
+            sa.Column("familia", sa.String(length=32), nullable=False),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+            sa.Column("expira_en", sa.DateTime(timezone=True), nullable=False),
+            sa.Column("familia_expira_en", sa.DateTime(timezone=True), nullable=False),
+            sa.Column("usado_en", sa.DateTime(timezone=True), nullable=True),
+            sa.Column("revocado_en", sa.DateTime(timezone=True), nullable=True),
+            sa.ForeignKeyConstraint(["usuario_id"], ["usuarios.id"]),
+            sa.PrimaryKeyConstraint("id")
+        )
+        op.create_index("ix_refresh_tokens_familia", "refresh_tokens", ["familia"])
+        op.create_index("ix_refresh_tokens_id", "refresh_tokens", ["id"])
+        op.create_index("ix_refresh_tokens_token_hash", "refresh_tokens", ["token_hash"], unique=True)
+        op.create_index("ix_refresh_tokens_usuario_id", "refresh_tokens", ["usuario_id"])
+    
+    if "tokens_revocados" not in tablas:
+        op.create_table(
+            "tokens_revocados",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("jti", sa.String(length=32), nullable=False),
+            sa.Column("expira_en", sa.DateTime(timezone=True), nullable=False),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+            sa.PrimaryKeyConstraint("id"),
+            sa.UniqueConstraint("jti")
+        )
+        op.create_index("ix_tokens_revocados_expira_en", "tokens_revocados", ["expira_en"])
+        op.create_index("ix_tokens_revocados_id", "tokens_revocados", ["id"])
+
+
+def _fusionar_repetidos():
+    """Sumar las cantidades de un alimento repetido en una lonchera en su primera fila"""
+    op.execute("""
+        UPDATE lonchera_alimento
+        SET cantidad = (
+            SELECT SUM(COALESCE(r.cantidad, 1))
+            FROM lonchera_alimento r
+            WHERE r.lonchera_id = lonchera_alimento.lonchera_id
+              AND r.alimento_id = lonchera_alimento.alimento_id
+        )
+        WHERE id IN (
+            SELECT MIN(id) FROM lonchera_alimento
+            GROUP BY lonchera_id, alimento_id
+            HAVING COUNT(*) > 1
+        )
+    """)
+    op.execute("""
+        DELETE FROM lonchera_alimento
+        WHERE id NOT IN (
+            SELECT MIN(id) FROM lonchera_alimento
+            GROUP BY lonchera_id, alimento_id
+        )
+    """)
+
+
+def _calcular_totales():
+    """Totales de cada lonchera desde lonchera_alimento (nutriente × cantidad)"""
+    def subtotal(expresion):
+        return f"""(
+            SELECT COALESCE(SUM({expresion}), 0)
+            FROM lonchera_alimento la
+            JOIN alimentos a ON a.id = la.alimento_id
+            WHERE la.lonchera_id = loncheras.id
+        )"""
+    
+    op.execute(f"""
+        UPDATE loncheras SET
+            total_calorias = {subtotal("a.calorias * la.cantidad")},
+            total_proteinas = {subtotal("a.proteinas * la.cantidad")},
+            total_carbohidratos = {subtotal("a.carbohidratos * la.cantidad")},
+            total_grasas = {subtotal("COALESCE(a.grasas, 0) * la.cantidad")},
+            total_fibra = {subtotal("COALESCE(a.fibra, 0) * la.cantidad")},
+            num_alimentos = {subtotal("la.cantidad")}
+    """)
+
+
+def _calcular_resumenes():
+    """Resúmenes diarios de las loncheras confirmadas (como EstadisticaService.reconstruir)"""
+    conexion = op.get_bind()
+    filtro = "l.confirmada_en IS NOT NULL AND l.estado <> 'Eliminada'"
+    
+    conexion.execute(sa.text("DELETE FROM resumenes_diarios_hijo"))
+    
+    distribuciones = {}
+    for hijo_id, fecha, tipo, unidades in conexion.execute(sa.text(f"""
+        SELECT l.hijo_id, l.fecha_asignacion, a.tipo, SUM(la.cantidad)
+        FROM loncheras l
+        JOIN lonchera_alimento la ON la.lonchera_id = l.id
+        JOIN alimentos a ON a.id = la.alimento_id
+        WHERE {filtro}
+        GROUP BY l.hijo_id, l.fecha_asignacion, a.tipo
+    """)):
+        distribuciones.setdefault((hijo_id, fecha), {})[tipo] = int(unidades or 0)
+    
+    filas = []
+    for fila in conexion.execute(sa.text(f"""
+        SELECT l.hijo_id, l.fecha_asignacion, COUNT(l.id),
+               SUM(l.total_calorias), SUM(l.total_proteinas), SUM(l.total_carbohidratos),
+               SUM(l.total_grasas), SUM(l.total_fibra), SUM(l.num_alimentos)
+        FROM loncheras l
+        WHERE {filtro}
+        GROUP BY l.hijo_id, l.fecha_asignacion
+    """)):
+        hijo_id, fecha = fila[0], fila[1]
+        distribucion = distribuciones.get((hijo_id, fecha))
+        filas.append({
+            "hijo_id": hijo_id,
+            "fecha": fecha,
+            "num_loncheras": fila[2],
+            "total_calorias": fila[3] or 0.0,
+            "total_proteinas": fila[4] or 0.0,
+            "total_carbohidratos": fila[5] or 0.0,
+            "total_grasas": fila[6] or 0.0,
+            "total_fibra": fila[7] or 0.0,
+            "num_alimentos": fila[8] or 0,
+            "distribucion_tipos": (
+                json.dumps(distribucion, ensure_ascii=False) if distribucion else None
+            )
+        })
+    
+    if filas:
+        conexion.execute(sa.text("""
+            INSERT INTO resumenes_diarios_hijo (
+                hijo_id, fecha, num_loncheras, total_calorias, total_proteinas,
+                total_carbohidratos, total_grasas, total_fibra, num_alimentos,
+                distribucion_tipos
+            ) VALUES (
+                :hijo_id, :fecha, :num_loncheras, :total_calorias, :total_proteinas,
+                :total_carbohidratos, :total_grasas, :total_fibra, :num_alimentos,
+                :distribucion_tipos
+            )
+        """), filas)
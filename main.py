@@ -1,17 +1,55 @@
 """
 NutriBox - Aplicación Principal FastAPI
 """
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from backend.app.core.config import settings
-from backend.app.database.connection import engine, Base
+from backend.app.database.connection import engine
+from backend.app.database.migraciones import migrar
+from backend.app.services.busqueda_alimentos import crear_indice_busqueda
+
+from backend.app.tasks.archivado import programar_archivado
+from backend.app.tasks.revocaciones import programar_purga, programar_sincronizacion
+from backend.app.tasks.accesos import programar_volcado, volcar_accesos
+from backend.app.tasks.popularidad import programar_popularidad
+from backend.app.services.planificador_service import cerrar_pool as cerrar_pool_planificador
+from backend.app.core.hashing import cerrar_pool as cerrar_pool_hashing
 
 # Importar routers
-from backend.app.routers import auth, alimentos, loncheras
+from backend.app.routers import auth, alimentos, loncheras, estadisticas
+
+# Crear o migrar las tablas (Alembic)
+migrar(engine)
+crear_indice_busqueda(engine)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Arrancar y detener las tareas en segundo plano"""
+    tareas = [
+        asyncio.create_task(programar_sincronizacion()),
+        asyncio.create_task(programar_purga()),
+        asyncio.create_task(programar_volcado()),
+        asyncio.create_task(programar_popularidad())
+    ]
+    
+    if settings.ARCHIVADO_AUTOMATICO:
+        tareas.append(asyncio.create_task(programar_archivado()))
+    
+    yield
+    
+    for tarea in tareas:
+        tarea.cancel()
+    
+    cerrar_pool_planificador()
+    cerrar_pool_hashing()
+    
+    # Guardar los accesos que quedaron en memoria
+    await asyncio.to_thread(volcar_accesos)
 
-# Crear tablas
-Base.metadata.create_all(bind=engine)
 
 # Crear aplicación
 app = FastAPI(
@@ -19,7 +57,8 @@ app = FastAPI(
     version=settings.APP_VERSION,
     description="Plataforma web para la gestión y personalización de loncheras escolares",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
 # Configurar CORS
@@ -29,6 +68,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
 # Montar archivos estáticos (cuando tengamos el frontend)
@@ -57,8 +97,19 @@ async def health_check():
 
 # Incluir routers
 app.include_router(auth.router, prefix="/api/auth", tags=["Autenticación"])
-app.include_router(alimentos.router, prefix="/api/alimentos", tags=["Alimentos"])
-app.include_router(loncheras.router, prefix="/api/loncheras", tags=["Loncheras"])
+app.include_router(
+    alimentos.router,
+    prefix="/api/alimentos",
+    tags=["Alimentos"],
+    dependencies=[Depends(auth.limitar_escritura)]
+)
+app.include_router(
+    loncheras.router,
+    prefix="/api/loncheras",
+    tags=["Loncheras"],
+    dependencies=[Depends(auth.limitar_escritura)]
+)
+app.include_router(estadisticas.router, prefix="/api/estadisticas", tags=["Estadísticas"])
 
 
 if __name__ == "__main__":
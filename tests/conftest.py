@@ -0,0 +1,93 @@
+"""
+Fixtures compartidas de las pruebas: base de datos SQLite en memoria con el
+catálogo de alimentos de init_db
+"""
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from backend.app.database.connection import Base
+from backend.app.models.models import Alimento, EstadoAlimentoEnum
+from backend.app.services.autocompletado import invalidar_indice
+from backend.app.services.catalogo_alimentos import incrementar_version_catalogo
+from backend.app.services.lonchera_service import cache_detalle
+from backend.app.services.matriz_nutricional import invalidar_matriz
+from backend.app.services.restriccion_service import invalidar_catalogo
+
+# (nombre, tipo, descripcion, calorias, proteinas, carbohidratos, grasas, fibra)
+CATALOGO = [
+    ("Manzana", "Fruta", "Manzana roja fresca", 52, 0.3, 14, 0.2, 2.4),
+    ("Banana", "Fruta", "Banana madura", 89, 1.1, 23, 0.3, 2.6),
+    ("Naranja", "Fruta", "Naranja fresca", 47, 0.9, 12, 0.1, 2.4),
+    ("Sandwich de pollo", "Proteína", "Sandwich integral con pechuga de pollo", 250, 20, 30, 8, 3),
+    ("Huevo duro", "Proteína", "Huevo cocido", 78, 6, 0.6, 5, 0),
+    ("Yogurt natural", "Lácteo", "Yogurt natural sin azúcar", 59, 3.5, 4.7, 3.3, 0),
+    ("Queso fresco", "Lácteo", "Porción de queso fresco", 98, 7, 1.4, 7, 0),
+    ("Pan integral", "Carbohidrato", "Rebanada de pan integral", 69, 3.6, 12, 1, 2),
+    ("Galletas integrales", "Carbohidrato", "Paquete de galletas integrales", 130, 2, 20, 5, 2),
+    ("Zanahoria baby", "Verdura", "Zanahorias baby crudas", 35, 0.6, 8, 0.2, 2.3),
+    ("Tomates cherry", "Verdura", "Tomates cherry frescos", 18, 0.9, 3.9, 0.2, 1.2),
+    ("Jugo natural", "Bebida", "Jugo de fruta natural sin azúcar", 45, 0.5, 11, 0.1, 0.5),
+    ("Agua", "Bebida", "Botella de agua", 0, 0, 0, 0, 0),
+    ("Frutos secos", "Snack", "Mix de nueces y almendras", 170, 6, 6, 15, 3),
+    ("Granola", "Snack", "Porción de granola casera", 150, 4, 20, 6, 3),
+]
+
+
+def vaciar_caches():
+    """Descartar las estructuras en memoria construidas desde otra base de datos"""
+    invalidar_catalogo()
+    invalidar_matriz()
+    incrementar_version_catalogo()
+    cache_detalle.limpiar()
+    invalidar_indice()
+
+
+@pytest.fixture(autouse=True)
+def caches_vacios():
+    """Cada prueba construye los caches desde su propia base de datos"""
+    vaciar_caches()
+    yield
+    vaciar_caches()
+
+
+@pytest.fixture
+def db():
+    """Sesión sobre una base de datos SQLite en memoria con todas las tablas"""
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+
+@pytest.fixture
+def alimentos(db):
+    """Catálogo de alimentos de init_db, por nombre"""
+    por_nombre = {}
+    for nombre, tipo, descripcion, calorias, proteinas, carbohidratos, grasas, fibra in CATALOGO:
+        por_nombre[nombre] = Alimento(
+            nombre=nombre,
+            tipo=tipo,
+            descripcion=descripcion,
+            calorias=calorias,
+            proteinas=proteinas,
+            carbohidratos=carbohidratos,
+            grasas=grasas,
+            fibra=fibra,
+            estado=EstadoAlimentoEnum.ACTIVO.value
+        )
+    
+    db.add_all(por_nombre.values())
+    db.commit()
+    
+    return por_nombre
@@ -0,0 +1,41 @@
+"""
+Pruebas del índice de prefijos del autocompletado
+"""
+from datetime import date
+
+from backend.app.core.config import settings
+from backend.app.models.models import Hijo, Lonchera, LoncheraAlimento
+from backend.app.services import autocompletado
+from backend.app.services.catalogo_alimentos import incrementar_version_catalogo
+
+
+def test_recarga_del_catalogo_sin_cambios_no_reconstruye_el_indice(db, alimentos, monkeypatch):
+    indice = autocompletado.obtener_indice(db)
+    
+    # Cada lectura recarga la instantánea (misma versión, otro objeto)
+    monkeypatch.setattr(settings, "CATALOGO_TTL_SEGUNDOS", 0)
+    
+    assert autocompletado.obtener_indice(db) is indice
+
+
+def test_cambio_de_version_reconstruye_sin_perder_la_popularidad(db, alimentos):
+    hijo = Hijo(nombre="Ana", apellido="Pérez", fecha_nacimiento=date(2016, 5, 1), padre_id=1)
+    db.add(hijo)
+    db.flush()
+    lonchera = Lonchera(nombre="Lunes", fecha_asignacion=date(2025, 3, 10), hijo_id=hijo.id)
+    db.add(lonchera)
+    db.flush()
+    db.add(LoncheraAlimento(lonchera_id=lonchera.id, alimento_id=alimentos["Galletas integrales"].id, cantidad=1))
+    db.commit()
+    
+    # Sin popularidad calculada, a igual popularidad gana el nombre más corto
+    assert [a.nombre for a in autocompletado.obtener_indice(db).buscar("g")] == [
+        "Granola", "Galletas integrales"
+    ]
+    
+    autocompletado.refrescar_popularidad(db)
+    incrementar_version_catalogo()
+    
+    indice = autocompletado.obtener_indice(db)
+    assert indice.popularidad == {alimentos["Galletas integrales"].id: 1}
+    assert [a.nombre for a in indice.buscar("g")] == ["Galletas integrales", "Granola"]
@@ -0,0 +1,19 @@
+"""
+Pruebas de la búsqueda de alimentos sin índice de texto completo
+"""
+from backend.app.services import busqueda_alimentos
+
+
+def test_busqueda_sin_indice_incluye_la_descripcion(db, alimentos, monkeypatch):
+    monkeypatch.setattr(busqueda_alimentos, "_motor", None)
+    
+    nombres = [a.nombre for a in busqueda_alimentos.buscar(db, "nueces")]
+    
+    assert nombres == ["Frutos secos"]
+
+
+def test_busqueda_sin_indice_por_nombre_y_tipo(db, alimentos, monkeypatch):
+    monkeypatch.setattr(busqueda_alimentos, "_motor", None)
+    
+    assert [a.nombre for a in busqueda_alimentos.buscar(db, "queso")] == ["Queso fresco"]
+    assert {a.nombre for a in busqueda_alimentos.buscar(db, "lácteo")} == {"Yogurt natural", "Queso fresco"}
@@ -0,0 +1,77 @@
+"""
+Pruebas de los resúmenes diarios de estadísticas
+"""
+from datetime import date, datetime
+
+import pytest
+
+from backend.app.models.models import EstadoLoncheraEnum, Hijo, Lonchera, ResumenDiarioHijo
+from backend.app.schemas.lonchera import LoncheraUpdate
+from backend.app.services.estadistica_service import EstadisticaService
+from backend.app.services.lonchera_service import LoncheraService
+
+FECHA = date(2025, 3, 10)
+
+
+def confirmada(db, calorias: float) -> Lonchera:
+    lonchera = Lonchera(
+        nombre="Lunes",
+        fecha_asignacion=FECHA,
+        hijo_id=1,
+        total_calorias=calorias,
+        num_alimentos=1,
+        confirmada_en=datetime(2025, 3, 9, 8, 0)
+    )
+    db.add(lonchera)
+    db.commit()
+    return lonchera
+
+
+def resumenes(db):
+    return db.query(ResumenDiarioHijo).filter(
+        ResumenDiarioHijo.hijo_id == 1,
+        ResumenDiarioHijo.fecha == FECHA
+    ).all()
+
+
+def test_refrescar_un_dia_existente_actualiza_la_fila(db):
+    confirmada(db, 300)
+    EstadisticaService.refrescar_dias(db, [(1, FECHA)])
+    
+    confirmada(db, 200)
+    EstadisticaService.refrescar_dias(db, [(1, FECHA)])
+    EstadisticaService.refrescar_dias(db, [(1, FECHA)])
+    db.expire_all()
+    
+    (resumen,) = resumenes(db)
+    assert resumen.num_loncheras == 2
+    assert resumen.total_calorias == pytest.approx(500)
+
+
+def test_dia_sin_loncheras_confirmadas_queda_sin_resumen(db):
+    lonchera = confirmada(db, 300)
+    EstadisticaService.refrescar_dias(db, [(1, FECHA)])
+    
+    lonchera.confirmada_en = None
+    db.commit()
+    EstadisticaService.refrescar_dias(db, [(1, FECHA)])
+    
+    assert resumenes(db) == []
+
+
+def test_lonchera_que_deja_de_estar_confirmada_sale_del_resumen(db):
+    db.add(Hijo(id=1, nombre="Ana", apellido="Pérez", fecha_nacimiento=date(2016, 5, 1), padre_id=1))
+    lonchera = Lonchera(nombre="Lunes", fecha_asignacion=FECHA, hijo_id=1)
+    db.add(lonchera)
+    db.commit()
+    
+    LoncheraService.confirmar(db, lonchera.id, usuario_id=1)
+    assert lonchera.confirmada_en is not None
+    assert len(resumenes(db)) == 1
+    
+    LoncheraService.update(
+        db, lonchera.id, LoncheraUpdate(estado=EstadoLoncheraEnum.BORRADOR.value), usuario_id=1
+    )
+    
+    assert lonchera.confirmada_en is None
+    assert resumenes(db) == []
@@ -0,0 +1,39 @@
+"""
+Pruebas del control de admisión del pool de hashing
+"""
+import asyncio
+import threading
+
+from backend.app.core import hashing
+
+
+def test_peticion_cancelada_libera_el_lugar_al_terminar_el_hilo():
+    en_curso = threading.Event()
+    continuar = threading.Event()
+    
+    def lenta():
+        en_curso.set()
+        continuar.wait(5)
+        return True
+    
+    async def escenario():
+        peticion = asyncio.create_task(hashing._ejecutar(lenta))
+        await asyncio.to_thread(en_curso.wait, 5)
+        
+        peticion.cancel()
+        await asyncio.gather(peticion, return_exceptions=True)
+        # El hilo sigue ejecutando la operación: el lugar sigue ocupado
+        assert hashing.metricas.pendientes == 1
+        
+        continuar.set()
+        for _ in range(100):
+            if hashing.metricas.pendientes == 0:
+                break
+            await asyncio.sleep(0.01)
+        assert hashing.metricas.pendientes == 0
+    
+    try:
+        asyncio.run(escenario())
+    finally:
+        continuar.set()
+        hashing.cerrar_pool()
@@ -0,0 +1,39 @@
+"""
+Pruebas de la importación del catálogo de alimentos
+"""
+import asyncio
+import io
+
+import pytest
+from fastapi import HTTPException, UploadFile
+
+from backend.app.models.models import Alimento, HistorialAlimento
+from backend.app.routers.alimentos import importar_alimentos
+from backend.app.services.importacion_service import ImportacionService
+
+CSV = (
+    "nombre,tipo,calorias,proteinas,carbohidratos\n"
+    "Pera,Fruta,57,0.4,15\n"
+    "pera,Fruta,57,0.4,15\n"
+    "Kiwi,Fruta,no-es-numero,1.1,15\n"
+)
+
+
+def test_importar_csv_omite_duplicados_y_reporta_errores(db):
+    resultado = ImportacionService.importar(db, ImportacionService.leer(CSV.encode(), "csv"), usuario_id=1)
+    
+    assert resultado.creados == 1
+    assert resultado.filas_duplicadas == [3]
+    assert [error.fila for error in resultado.errores] == [4]
+    assert db.query(Alimento).filter(Alimento.nombre == "Pera").count() == 1
+    assert db.query(HistorialAlimento).count() == 1
+
+
+def test_csv_malformado_es_400(db):
+    contenido = b'nombre,tipo\n"' + b"x" * 200000 + b'",Fruta\n'
+    archivo = UploadFile(io.BytesIO(contenido), filename="catalogo.csv")
+    
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(importar_alimentos(archivo=archivo, formato=None, db=db, current_user=None))
+    
+    assert error.value.status_code == 400
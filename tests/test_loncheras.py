@@ -0,0 +1,228 @@
+"""
+Pruebas de los totales nutricionales materializados de las loncheras
+"""
+import asyncio
+from datetime import date
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException, Response
+from sqlalchemy import update
+
+from backend.app.models.models import (
+    Alimento, Hijo, Lonchera, LoncheraAlimento, Restriccion, Rol, TipoMembresia, Usuario
+)
+from backend.app.schemas.lonchera import (
+    AsignacionMasivaRequest, LoncheraAlimentoCreate, LoncheraUpdate, OperacionAlimento
+)
+from backend.app.services.catalogo_alimentos import obtener_catalogo
+from backend.app.routers import loncheras as router_loncheras
+from backend.app.services.lonchera_service import LoncheraService
+
+
+@pytest.fixture
+def lonchera(db, alimentos):
+    hijo = Hijo(nombre="Ana", apellido="Pérez", fecha_nacimiento=date(2016, 5, 1), padre_id=1)
+    db.add(hijo)
+    db.flush()
+    
+    lonchera = Lonchera(nombre="Lunes", fecha_asignacion=date(2025, 3, 10), hijo_id=hijo.id)
+    db.add(lonchera)
+    db.commit()
+    
+    return lonchera
+
+
+def test_agregar_alimento_usa_los_valores_de_la_base_de_datos(db, alimentos, lonchera):
+    manzana = alimentos["Manzana"]
+    
+    # La instantánea se construye y luego otro worker edita el alimento
+    obtener_catalogo(db)
+    db.execute(update(Alimento).where(Alimento.id == manzana.id).values(calorias=60))
+    db.commit()
+    
+    LoncheraService.agregar_alimento(
+        db, lonchera.id, LoncheraAlimentoCreate(alimento_id=manzana.id, cantidad=2)
+    )
+    db.refresh(lonchera)
+    
+    assert lonchera.total_calorias == pytest.approx(120)
+    assert lonchera.num_alimentos == 2
+
+
+def test_eliminar_alimento_resta_su_aporte(db, alimentos, lonchera):
+    manzana = alimentos["Manzana"]
+    queso = alimentos["Queso fresco"]
+    
+    for alimento in (manzana, queso):
+        LoncheraService.agregar_alimento(
+            db, lonchera.id, LoncheraAlimentoCreate(alimento_id=alimento.id, cantidad=1)
+        )
+    LoncheraService.eliminar_alimento(db, lonchera.id, queso.id)
+    db.refresh(lonchera)
+    
+    assert lonchera.total_calorias == pytest.approx(52)
+    assert lonchera.total_grasas == pytest.approx(0.2)
+    assert lonchera.num_alimentos == 1
+
+
+def test_asignar_plantilla_copia_alimentos_solo_a_sus_loncheras(db, alimentos):
+    db.add_all([Rol(id=1, nombre="Usuario Principal"), TipoMembresia(id=1, nombre="Básico")])
+    db.add(Usuario(
+        id=1, email="padre@ejemplo.com", password_hash="x", nombre="Luis", apellido="Pérez",
+        rol_id=1, tipo_membresia_id=1
+    ))
+    hijos = [
+        Hijo(nombre=nombre, apellido="Pérez", fecha_nacimiento=date(2016, 5, 1), padre_id=1, colegio="Andes")
+        for nombre in ("Ana", "Beto", "Carla")
+    ]
+    db.add_all(hijos)
+    db.flush()
+    db.add(Restriccion(tipo="Alergia", descripcion="Alergia al huevo", severidad="Alta", hijo_id=hijos[1].id))
+    
+    plantilla = Lonchera(nombre="Menú", fecha_asignacion=date(2025, 3, 7), hijo_id=hijos[0].id)
+    db.add(plantilla)
+    db.commit()
+    for nombre in ("Manzana", "Huevo duro"):
+        LoncheraService.agregar_alimento(
+            db, plantilla.id, LoncheraAlimentoCreate(alimento_id=alimentos[nombre].id, cantidad=1)
+        )
+    
+    resultado = LoncheraService.asignar_plantilla(db, plantilla.id, AsignacionMasivaRequest(
+        fecha_inicio=date(2025, 3, 10), fecha_fin=date(2025, 3, 11), colegio="Andes"
+    ))
+    
+    assert resultado.asignadas == 4
+    assert resultado.omitidas_por_restriccion == 2
+    
+    copias = db.query(Lonchera).filter(Lonchera.plantilla_id == plantilla.id).all()
+    assert {c.hijo_id for c in copias} == {hijos[0].id, hijos[2].id}
+    for copia in copias:
+        items = db.query(LoncheraAlimento).filter(LoncheraAlimento.lonchera_id == copia.id).count()
+        assert items == 2
+
+
+def test_detalle_de_lonchera_borrada_durante_la_peticion_es_404(db, monkeypatch):
+    # La verificación de acceso la encuentra; al cargar el detalle ya no existe
+    monkeypatch.setattr(
+        router_loncheras, "verificar_acceso_lonchera",
+        lambda db, lonchera_id, usuario: SimpleNamespace(version=3)
+    )
+    monkeypatch.setattr(LoncheraService, "get_detalle", staticmethod(lambda db, lonchera_id: None))
+    
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(router_loncheras.obtener_lonchera(
+            lonchera_id=999, if_none_match=None, db=db, current_user=None
+        ))
+    
+    assert error.value.status_code == 404
+
+
+def test_resumen_de_lonchera_borrada_durante_la_peticion_es_404(db, monkeypatch):
+    monkeypatch.setattr(
+        router_loncheras, "verificar_acceso_lonchera",
+        lambda db, lonchera_id, usuario: SimpleNamespace(version=3)
+    )
+    monkeypatch.setattr(LoncheraService, "get_by_id", staticmethod(lambda db, lonchera_id: None))
+    
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(router_loncheras.obtener_resumen_nutricional(
+            lonchera_id=999, response=Response(), if_none_match=None, db=db, current_user=None
+        ))
+    
+    assert error.value.status_code == 404
+
+
+def totales(lonchera) -> tuple:
+    return (
+        lonchera.total_calorias,
+        lonchera.total_proteinas,
+        lonchera.total_grasas,
+        lonchera.num_alimentos
+    )
+
+
+def test_agregar_alimento_repetido_suma_la_cantidad_en_la_misma_fila(db, alimentos, lonchera):
+    manzana = alimentos["Manzana"]
+    
+    for cantidad in (1, 2):
+        LoncheraService.agregar_alimento(
+            db, lonchera.id, LoncheraAlimentoCreate(alimento_id=manzana.id, cantidad=cantidad)
+        )
+    db.refresh(lonchera)
+    
+    (item,) = db.query(LoncheraAlimento).filter(LoncheraAlimento.lonchera_id == lonchera.id).all()
+    assert item.cantidad == 3
+    assert lonchera.total_calorias == pytest.approx(3 * 52)
+    assert lonchera.num_alimentos == 3
+    assert lonchera.version == 3
+
+
+def test_operaciones_en_lote_dejan_los_mismos_totales_que_recalcular(db, alimentos, lonchera):
+    manzana, queso, pan = (alimentos[n] for n in ("Manzana", "Queso fresco", "Pan integral"))
+    for alimento in (manzana, queso):
+        LoncheraService.agregar_alimento(
+            db, lonchera.id, LoncheraAlimentoCreate(alimento_id=alimento.id, cantidad=1)
+        )
+    
+    LoncheraService.aplicar_operaciones(db, lonchera.id, [
+        OperacionAlimento(accion="agregar", alimento_id=manzana.id, cantidad=2),
+        OperacionAlimento(accion="establecer", alimento_id=pan.id, cantidad=2),
+        OperacionAlimento(accion="eliminar", alimento_id=queso.id)
+    ], usuario_id=1)
+    db.refresh(lonchera)
+    
+    assert lonchera.total_calorias == pytest.approx(3 * 52 + 2 * 69)
+    assert lonchera.num_alimentos == 5
+    assert lonchera.version == 4
+    
+    incrementales = totales(lonchera)
+    LoncheraService.recalcular_totales(db, [lonchera.id])
+    db.refresh(lonchera)
+    assert totales(lonchera) == pytest.approx(incrementales)
+
+
+def test_operacion_sobre_alimento_ausente_no_aplica_ninguna(db, alimentos, lonchera):
+    manzana = alimentos["Manzana"]
+    
+    with pytest.raises(HTTPException) as error:
+        LoncheraService.aplicar_operaciones(db, lonchera.id, [
+            OperacionAlimento(accion="agregar", alimento_id=manzana.id, cantidad=1),
+            OperacionAlimento(accion="eliminar", alimento_id=alimentos["Agua"].id)
+        ], usuario_id=1)
+    db.refresh(lonchera)
+    
+    assert error.value.status_code == 404
+    assert db.query(LoncheraAlimento).count() == 0
+    assert (lonchera.total_calorias, lonchera.num_alimentos, lonchera.version) == (0, 0, 1)
+
+
+def test_etag_del_resumen_cambia_con_cada_modificacion(db, alimentos, lonchera):
+    usuario = SimpleNamespace(id=1)
+    
+    def resumen(if_none_match=None):
+        response = Response()
+        resultado = asyncio.run(router_loncheras.obtener_resumen_nutricional(
+            lonchera_id=lonchera.id, response=response, if_none_match=if_none_match,
+            db=db, current_user=usuario
+        ))
+        return resultado, response.headers.get("ETag")
+    
+    _, etag = resumen()
+    no_modificado, _ = resumen(if_none_match=etag)
+    assert no_modificado.status_code == 304
+    
+    LoncheraService.agregar_alimento(
+        db, lonchera.id, LoncheraAlimentoCreate(alimento_id=alimentos["Manzana"].id, cantidad=1)
+    )
+    cuerpo, etag_tras_agregar = resumen(if_none_match=etag)
+    assert etag_tras_agregar != etag
+    assert cuerpo.total_calorias == pytest.approx(52)
+    
+    LoncheraService.update(db, lonchera.id, LoncheraUpdate(nombre="Lunes feriado"), usuario_id=1)
+    _, etag_tras_editar = resumen(if_none_match=etag_tras_agregar)
+    assert etag_tras_editar not in (etag, etag_tras_agregar)
+    
+    LoncheraService.delete(db, lonchera.id, usuario_id=1)
+    db.refresh(lonchera)
+    assert lonchera.version == 4
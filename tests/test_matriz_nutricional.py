@@ -0,0 +1,29 @@
+"""
+Pruebas de la matriz nutricional del catálogo
+"""
+import pytest
+from sqlalchemy import update
+
+from backend.app.core.config import settings
+from backend.app.models.models import Alimento
+from backend.app.services.matriz_nutricional import NUTRIENTES, obtener_matriz
+
+CALORIAS = NUTRIENTES.index("calorias")
+
+
+def calorias(db, alimento_id: int) -> float:
+    matriz = obtener_matriz(db)
+    return matriz.valores[matriz.filas_de([alimento_id])[0], CALORIAS]
+
+
+def test_la_matriz_expira_con_la_instantanea_del_catalogo(db, alimentos, monkeypatch):
+    manzana = alimentos["Manzana"]
+    assert calorias(db, manzana.id) == pytest.approx(52)
+    
+    # Otro worker edita el alimento: este proceso no recibe la invalidación
+    db.execute(update(Alimento).where(Alimento.id == manzana.id).values(calorias=60))
+    db.commit()
+    assert calorias(db, manzana.id) == pytest.approx(52)
+    
+    monkeypatch.setattr(settings, "CATALOGO_TTL_SEGUNDOS", 0)
+    assert calorias(db, manzana.id) == pytest.approx(60)
@@ -0,0 +1,75 @@
+"""
+Pruebas de las migraciones sobre una base de datos con el esquema anterior
+"""
+import pytest
+from alembic import command
+from sqlalchemy import create_engine, inspect, text
+
+from backend.app.database.migraciones import configuracion, migrar
+
+
+def test_migrar_base_anterior_agrega_columnas_y_calcula_totales(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'anterior.db'}")
+    config = configuracion()
+    
+    # Esquema anterior a las migraciones, sin la tabla alembic_version
+    with engine.begin() as conexion:
+        config.attributes["connection"] = conexion
+        command.upgrade(config, "0001")
+        conexion.execute(text("DROP TABLE alembic_version"))
+        conexion.execute(text("""
+            INSERT INTO alimentos (id, nombre, tipo, calorias, proteinas, carbohidratos, grasas, fibra, estado)
+            VALUES (1, 'Manzana', 'Fruta', 52, 0.3, 14, 0.2, 2.4, 'Activo'),
+                   (2, 'Queso fresco', 'Lácteo', 98, 7, 1.4, 7, NULL, 'Activo')
+        """))
+        conexion.execute(text("""
+            INSERT INTO loncheras (id, nombre, fecha_asignacion, estado, hijo_id)
+            VALUES (1, 'Lunes', '2025-03-10', 'Confirmada', 1),
+                   (2, 'Martes', '2025-03-11', 'Borrador', 1)
+        """))
+        # Alimento repetido en la lonchera 1 (antes no había restricción única)
+        conexion.execute(text("""
+            INSERT INTO lonchera_alimento (lonchera_id, alimento_id, cantidad)
+            VALUES (1, 1, 1), (1, 1, 2), (1, 2, 1), (2, 2, 3)
+        """))
+    
+    migrar(engine)
+    
+    unicas = inspect(engine).get_unique_constraints("lonchera_alimento")
+    assert {"name": "uq_lonchera_alimento", "column_names": ["lonchera_id", "alimento_id"]} in unicas
+    assert "ix_loncheras_hijo_fecha" in {i["name"] for i in inspect(engine).get_indexes("loncheras")}
+    
+    with engine.connect() as conexion:
+        assert conexion.execute(text(
+            "SELECT cantidad FROM lonchera_alimento WHERE lonchera_id = 1 AND alimento_id = 1"
+        )).scalars().all() == [3]
+        
+        lunes, martes = conexion.execute(text(
+            "SELECT total_calorias, total_fibra, num_alimentos, version, confirmada_en "
+            "FROM loncheras ORDER BY id"
+        )).all()
+        assert lunes[:4] == (3 * 52 + 98, pytest.approx(3 * 2.4), 4, 1)
+        assert lunes.confirmada_en is not None
+        assert martes[:4] == (3 * 98, 0, 3, 1)
+        assert martes.confirmada_en is None
+        
+        resumenes = conexion.execute(text(
+            "SELECT hijo_id, fecha, num_loncheras, total_calorias FROM resumenes_diarios_hijo"
+        )).all()
+        assert resumenes == [(1, "2025-03-10", 1, 3 * 52 + 98)]
+        
+        assert conexion.execute(text("SELECT version_num FROM alembic_version")).scalar() == "0002"
+    
+    engine.dispose()
+
+
+def test_migrar_base_vacia_crea_el_esquema_actual(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'nueva.db'}")
+    
+    migrar(engine)
+    migrar(engine)
+    
+    columnas = {c["name"] for c in inspect(engine).get_columns("loncheras")}
+    assert {"total_calorias", "version", "confirmada_en", "plantilla_id"} <= columnas
+    
+    engine.dispose()
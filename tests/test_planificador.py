@@ -0,0 +1,26 @@
+"""
+Pruebas del planificador de loncheras
+"""
+from datetime import date
+
+from sqlalchemy import event
+
+from backend.app.services.planificador_service import PlanificadorService
+
+FECHA = date(2025, 3, 10)
+
+
+def test_alimentos_permitidos_salen_de_la_instantanea_sin_consultas(db, alimentos):
+    PlanificadorService._alimentos_permitidos(db, 1, FECHA, FECHA)
+    
+    consultas = []
+    event.listen(db.get_bind(), "before_cursor_execute", lambda *args: consultas.append(args[2]))
+    
+    ids, valores, tipos = PlanificadorService._alimentos_permitidos(db, 1, FECHA, FECHA)
+    
+    assert consultas == []
+    assert list(ids) == sorted(a.id for a in alimentos.values())
+    assert valores[list(ids).index(alimentos["Manzana"].id)][0] == 52
+    # Un código por tipo, en el orden en que aparecen
+    assert tipos[list(ids).index(alimentos["Banana"].id)] == tipos[list(ids).index(alimentos["Manzana"].id)]
+    assert len(set(tipos)) == 7
@@ -0,0 +1,80 @@
+"""
+Pruebas del límite de peticiones
+"""
+import asyncio
+
+import pytest
+from starlette.requests import Request
+
+from backend.app.core.config import settings
+from backend.app.core.rate_limit import BackendMemoria
+from backend.app.routers.auth import ip_cliente
+
+
+def peticion(*reenviadas: str) -> Request:
+    cabeceras = [(b"x-forwarded-for", valor.encode()) for valor in reenviadas]
+    return Request({
+        "type": "http",
+        "method": "POST",
+        "path": "/api/auth/login",
+        "headers": cabeceras,
+        "client": ("10.0.0.5", 40000)
+    })
+
+
+@pytest.fixture
+def proxies(monkeypatch):
+    def configurar(cantidad: int):
+        monkeypatch.setattr(settings, "RATE_LIMIT_PROXIES_CONFIABLES", cantidad)
+    return configurar
+
+
+def test_sin_proxies_ignora_x_forwarded_for(proxies):
+    proxies(0)
+    
+    assert ip_cliente(peticion("1.2.3.4")) == "10.0.0.5"
+
+
+def test_toma_la_entrada_que_agrego_el_proxy(proxies):
+    proxies(1)
+    
+    # La primera entrada la inventa el cliente; la última la agregó el proxy
+    assert ip_cliente(peticion("6.6.6.6, 203.0.113.7")) == "203.0.113.7"
+    assert ip_cliente(peticion("6.6.6.6", "203.0.113.7")) == "203.0.113.7"
+
+
+def test_varios_proxies_cuenta_desde_la_derecha(proxies):
+    proxies(2)
+    
+    assert ip_cliente(peticion("6.6.6.6, 203.0.113.7, 10.0.0.2")) == "203.0.113.7"
+
+
+def test_menos_entradas_que_proxies_usa_la_conexion(proxies):
+    proxies(2)
+    
+    assert ip_cliente(peticion("203.0.113.7")) == "10.0.0.5"
+
+
+def test_backend_memoria_rechaza_al_superar_el_limite():
+    backend = BackendMemoria()
+    
+    resultados = [asyncio.run(backend.registrar("login-email:a@b.c", 5, 60)) for _ in range(7)]
+    
+    assert resultados[:5] == [0.0] * 5
+    assert all(0 < reintentar <= 60 for reintentar in resultados[5:])
+
+
+def test_backend_memoria_descarta_las_claves_menos_recientes():
+    backend = BackendMemoria(max_claves=100)
+    
+    async def registrar_muchas():
+        await backend.registrar("login-ip:203.0.113.7", 5, 60)
+        for numero in range(1000):
+            await backend.registrar(f"login-email:{numero}@ejemplo.com", 5, 60)
+            await backend.registrar("login-ip:203.0.113.7", 1000, 60)
+    
+    asyncio.run(registrar_muchas())
+    
+    assert len(backend) == 100
+    assert "login-ip:203.0.113.7" in backend._contadores
+    assert "login-email:0@ejemplo.com" not in backend._contadores
@@ -0,0 +1,125 @@
+"""
+Pruebas de la verificación de loncheras contra restricciones alimentarias
+"""
+from datetime import date
+
+import pytest
+from sqlalchemy import insert
+
+from backend.app.models.models import Excepcion, Restriccion
+from backend.app.services.planificador_service import PlanificadorService
+from backend.app.services.restriccion_service import RestriccionService, cache_reglas
+
+HIJO_ID = 1
+FECHA = date(2025, 3, 10)
+
+
+def restringir(db, descripcion: str, tipo: str = "Alergia"):
+    db.add(Restriccion(tipo=tipo, descripcion=descripcion, severidad="Alta", hijo_id=HIJO_ID))
+    db.commit()
+
+
+def prohibidos(db, alimentos) -> set:
+    """Nombres de los alimentos del catálogo que el hijo no puede recibir"""
+    ids = {alimento.id: nombre for nombre, alimento in alimentos.items()}
+    return {
+        ids[alimento_id]
+        for alimento_id, _, _ in RestriccionService.conflictos(db, HIJO_ID, ids, FECHA)
+    }
+
+
+@pytest.mark.parametrize("descripcion", [
+    "Alergia a la leche",
+    "Intolerancia a la lactosa",
+    "Alergia a los lácteos",
+    "No puede comer queso",
+])
+def test_alergia_a_lacteos_prohibe_yogurt_y_queso(db, alimentos, descripcion):
+    restringir(db, descripcion)
+    
+    assert prohibidos(db, alimentos) == {"Yogurt natural", "Queso fresco"}
+
+
+def test_sin_en_el_alimento_no_cuenta_como_ingrediente(db, alimentos):
+    restringir(db, "Evitar azúcar", tipo="Preferencia")
+    
+    assert "Yogurt natural" not in prohibidos(db, alimentos)
+    assert "Jugo natural" not in prohibidos(db, alimentos)
+
+
+def test_sin_en_la_restriccion_prohibe_el_ingrediente(db, alimentos):
+    restringir(db, "Dieta sin gluten", tipo="Intolerancia")
+    
+    assert prohibidos(db, alimentos) == {
+        "Sandwich de pollo", "Pan integral", "Galletas integrales", "Granola"
+    }
+
+
+def test_alergia_a_frutos_secos_usa_nombre_y_descripcion(db, alimentos):
+    restringir(db, "Alergia a las nueces")
+    
+    assert prohibidos(db, alimentos) == {"Frutos secos"}
+
+
+def test_alergia_al_huevo(db, alimentos):
+    restringir(db, "Alergia al huevo")
+    
+    assert prohibidos(db, alimentos) == {"Huevo duro"}
+
+
+def test_planificador_excluye_lacteos_con_alergia_a_la_leche(db, alimentos):
+    restringir(db, "Alergia a la leche")
+    
+    ids, _, _ = PlanificadorService._alimentos_permitidos(db, HIJO_ID, FECHA, FECHA)
+    
+    assert alimentos["Yogurt natural"].id not in ids
+    assert alimentos["Queso fresco"].id not in ids
+    assert alimentos["Manzana"].id in ids
+
+
+def test_restriccion_de_otro_worker_se_ve_al_expirar_el_cache(db, alimentos, monkeypatch):
+    assert prohibidos(db, alimentos) == set()
+    
+    # Sin eventos del ORM, como si la escribiera otro proceso
+    db.execute(insert(Restriccion).values(
+        tipo="Alergia", descripcion="Alergia al huevo", severidad="Alta", activa=True, hijo_id=HIJO_ID
+    ))
+    db.commit()
+    assert prohibidos(db, alimentos) == set()
+    
+    monkeypatch.setattr(cache_reglas, "ttl_segundos", 0)
+    cache_reglas.limpiar()
+    assert prohibidos(db, alimentos) == {"Huevo duro"}
+
+
+def test_excepcion_invalida_solo_las_reglas_de_su_hijo(db, alimentos):
+    restringir(db, "Alergia al huevo")
+    db.add(Restriccion(tipo="Alergia", descripcion="Alergia al maní", severidad="Alta", hijo_id=2))
+    db.commit()
+    RestriccionService.obtener_reglas(db, [HIJO_ID, 2])
+    
+    restriccion = db.query(Restriccion).filter(Restriccion.hijo_id == HIJO_ID).one()
+    db.add(Excepcion(
+        motivo="Paseo escolar",
+        fecha_inicio=FECHA,
+        fecha_fin=FECHA,
+        restriccion_id=restriccion.id
+    ))
+    db.commit()
+    
+    assert cache_reglas.obtener(HIJO_ID) is None
+    assert cache_reglas.obtener(2) is not None
+    assert prohibidos(db, alimentos) == set()
+
+
+def test_reglas_cargadas_entre_el_flush_y_el_commit_se_descartan(db, alimentos):
+    reglas = RestriccionService.obtener_reglas(db, [HIJO_ID])[HIJO_ID]
+    
+    db.add(Restriccion(tipo="Alergia", descripcion="Alergia al huevo", severidad="Alta", hijo_id=HIJO_ID))
+    db.flush()
+    # Una petición concurrente compila las reglas antes del commit
+    cache_reglas.guardar(HIJO_ID, reglas)
+    db.commit()
+    
+    assert cache_reglas.obtener(HIJO_ID) is None
+    assert prohibidos(db, alimentos) == {"Huevo duro"}
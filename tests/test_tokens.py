@@ -0,0 +1,66 @@
+"""
+Pruebas de la revocación de tokens de acceso
+"""
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+from backend.app.core.revocacion import indice_revocacion
+from backend.app.models.models import TokenRevocado
+from backend.app.services.token_service import TokenService
+
+
+@pytest.fixture(autouse=True)
+def sin_revocaciones_cargadas(monkeypatch):
+    """Cada prueba sincroniza desde su propia base de datos"""
+    monkeypatch.setattr(indice_revocacion, "ultimo_id", 0)
+
+
+def revocado(db, id_fila: int) -> str:
+    jti = uuid.uuid4().hex
+    db.add(TokenRevocado(id=id_fila, jti=jti, expira_en=datetime.utcnow() + timedelta(minutes=5)))
+    db.commit()
+    return jti
+
+
+def test_revocacion_confirmada_con_id_menor_se_carga(db):
+    posterior = revocado(db, 10)
+    assert TokenService.sincronizar_revocaciones(db) == 1
+    
+    # Otra transacción obtuvo un id menor de la secuencia pero confirmó después
+    tardia = revocado(db, 5)
+    assert TokenService.sincronizar_revocaciones(db) == 1
+    
+    assert indice_revocacion.esta_revocado(posterior)
+    assert indice_revocacion.esta_revocado(tardia)
+
+
+def test_sincronizacion_solo_relee_las_revocaciones_recientes(db):
+    revocado(db, 10)
+    TokenService.sincronizar_revocaciones(db)
+    
+    # Id menor al último cargado y creada fuera de la ventana de tardías
+    antigua = uuid.uuid4().hex
+    db.add(TokenRevocado(
+        id=5,
+        jti=antigua,
+        expira_en=datetime.utcnow() + timedelta(minutes=5),
+        created_at=datetime.utcnow() - timedelta(minutes=10)
+    ))
+    db.commit()
+    
+    assert TokenService.sincronizar_revocaciones(db) == 0
+    assert not indice_revocacion.esta_revocado(antigua)
+
+
+def test_sincronizacion_no_borra_y_la_purga_si(db):
+    db.add(TokenRevocado(jti=uuid.uuid4().hex, expira_en=datetime.utcnow() - timedelta(minutes=1)))
+    db.commit()
+    
+    assert TokenService.sincronizar_revocaciones(db) == 0
+    assert db.query(TokenRevocado).count() == 1
+    
+    assert TokenService.purgar_expirados(db) == 1
+    assert db.query(TokenRevocado).count() == 0
+    assert TokenService.purgar_expirados(db) == 0